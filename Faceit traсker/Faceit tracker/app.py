@@ -1,12 +1,22 @@
 from flask import Flask, render_template, request, jsonify
-import requests
 import os
+import sys
 from dotenv import load_dotenv
 import re
+import numpy as np
 from datetime import datetime
 
 load_dotenv()
 
+# Общие модули (пул соединений и т.д.) лежат в родительской папке
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from http_client import get_http_client
+from rate_limiter import get_rate_limiter
+from identity_store import get_identity_store, confirm_owner, is_steam_id
+from batch_loader import BatchLoader
+from match_columns import MatchColumns, form_stats
+from config import Config
+
 app = Flask(__name__)
 
 FACEIT_API_KEY = os.getenv('FACEIT_API_KEY', 'c60fb845-a4a7-4bda-beb6-1030a921424d')
@@ -18,6 +28,24 @@ headers = {
     'accept': 'application/json'
 }
 
+# Один пул keep-alive соединений и общий лимитер запросов на весь процесс
+http = get_http_client()
+limiter = get_rate_limiter()
+# Ники, faceit ID, Steam ID и vanity имена из всех ответов API - чтобы не искать их повторно
+identities = get_identity_store()
+
+
+def faceit_get(path, params=None):
+    """GET к FACEIT API через общий пул соединений с учетом лимита запросов"""
+    limiter.acquire()
+    response = http.get(f'{FACEIT_API_URL}{path}', headers=headers, params=params, timeout=10)
+    limiter.update_from_headers(response.headers)
+    if response.status_code == 429 and 'Retry-After' not in response.headers:
+        limiter.pause(2)
+    if response.status_code == 200:
+        identities.observe_payload(response.json())
+    return response
+
 
 def search_player_on_faceit(nickname, max_attempts=3):
     """Улучшенный поиск игрока на Faceit с несколькими попытками"""
@@ -33,11 +61,9 @@ def search_player_on_faceit(nickname, max_attempts=3):
     for i, params in enumerate(attempts[:max_attempts]):
         try:
             print(f"🔍 Попытка поиска {i + 1}: {params}")
-            response = requests.get(
-                f'{FACEIT_API_URL}/players',
-                headers=headers,
-                params=params,
-                timeout=10
+            response = faceit_get(
+                '/players',
+                params=params
             )
 
             if response.status_code == 200:
@@ -62,11 +88,9 @@ def search_player_on_faceit(nickname, max_attempts=3):
     # Если не нашли, пробуем поиск по всем игрокам с похожим никнеймом
     try:
         print(f"🔍 Пробуем расширенный поиск...")
-        response = requests.get(
-            f'{FACEIT_API_URL}/search/players',
-            headers=headers,
-            params={'nickname': nickname, 'game': 'cs2', 'limit': 10},
-            timeout=10
+        response = faceit_get(
+            '/search/players',
+            params={'nickname': nickname, 'game': 'cs2', 'limit': 10}
         )
 
         if response.status_code == 200:
@@ -92,12 +116,13 @@ def get_steam_id_from_faceit(player_id):
     try:
         print(f"🔍 Получаем Steam ID для Faceit игрока {player_id}")
 
+        known = identities.resolve_player(player_id)
+        if known and known.get('steam_id_64'):
+            print(f"✓ Steam ID из графа идентичностей: {known['steam_id_64']}")
+            return known['steam_id_64']
+
         # Получаем информацию об игроке с деталями
-        response = requests.get(
-            f'{FACEIT_API_URL}/players/{player_id}',
-            headers=headers,
-            timeout=10
-        )
+        response = faceit_get(f'/players/{player_id}')
 
         if response.status_code == 200:
             player_data = response.json()
@@ -148,12 +173,17 @@ def get_steam_id_from_faceit(player_id):
 
 def convert_steam_name_to_id(steam_name):
     """Конвертирует Steam никнейм в Steam ID через API"""
+    known = identities.resolve_vanity(steam_name)
+    if known:
+        print(f"✓ Steam ID из графа идентичностей: {known}")
+        return known
+
     if not STEAM_API_KEY:
         return None
 
     try:
         # Сначала пробуем получить Steam ID по никнейму
-        response = requests.get(
+        response = http.get(
             'https://api.steampowered.com/ISteamUser/ResolveVanityURL/v1/',
             params={
                 'key': STEAM_API_KEY,
@@ -167,6 +197,7 @@ def convert_steam_name_to_id(steam_name):
             if data.get('response', {}).get('success') == 1:
                 steam_id = data['response']['steamid']
                 print(f"✓ Конвертирован Steam никнейм в ID: {steam_id}")
+                identities.observe_vanity(steam_name, steam_id)
                 return steam_id
     except Exception as e:
         print(f"⚠ Ошибка конвертации Steam никнейма: {e}")
@@ -174,35 +205,53 @@ def convert_steam_name_to_id(steam_name):
     return None
 
 
+def fetch_steam_summaries(steam_ids):
+    """Один запрос GetPlayerSummaries на пачку Steam ID (до 100)"""
+    response = http.get(
+        'https://api.steampowered.com/ISteamUser/GetPlayerSummaries/v2/',
+        params={
+            'key': STEAM_API_KEY,
+            'steamids': ','.join(steam_ids)
+        },
+        timeout=10
+    )
+
+    # Сбой не равен "профиля нет": исключение не попадет в кэш BatchLoader, ключи запросятся снова
+    if response.status_code != 200:
+        print(f"⚠ Ошибка Steam API: {response.status_code}")
+        raise RuntimeError(f"Steam API вернул {response.status_code}")
+
+    players = response.json().get('response', {}).get('players', [])
+    return {
+        player.get('steamid'): {
+            'steamid': player.get('steamid'),
+            'personaname': player.get('personaname'),
+            'profileurl': player.get('profileurl'),
+            'avatar': player.get('avatar'),
+            'avatarmedium': player.get('avatarmedium'),
+            'avatarfull': player.get('avatarfull'),
+            'personastate': player.get('personastate')
+        }
+        for player in players
+    }
+
+
+# Запросы Steam профилей от параллельных запросов к сайту склеиваются в пачки
+steam_summaries = BatchLoader(
+    fetch_steam_summaries,
+    max_batch=Config.STEAM_BATCH_MAX,
+    window=Config.STEAM_BATCH_WINDOW_MS / 1000,
+    ttl=Config.STEAM_SUMMARY_TTL
+)
+
+
 def get_steam_profile_info(steam_id):
     """Получает информацию о Steam профиле"""
     if not STEAM_API_KEY or not steam_id:
         return None
 
     try:
-        response = requests.get(
-            'https://api.steampowered.com/ISteamUser/GetPlayerSummaries/v2/',
-            params={
-                'key': STEAM_API_KEY,
-                'steamids': steam_id
-            },
-            timeout=10
-        )
-
-        if response.status_code == 200:
-            data = response.json()
-            players = data.get('response', {}).get('players', [])
-            if players:
-                player = players[0]
-                return {
-                    'steamid': player.get('steamid'),
-                    'personaname': player.get('personaname'),
-                    'profileurl': player.get('profileurl'),
-                    'avatar': player.get('avatar'),
-                    'avatarmedium': player.get('avatarmedium'),
-                    'avatarfull': player.get('avatarfull'),
-                    'personastate': player.get('personastate')
-                }
+        return steam_summaries.load(str(steam_id), timeout=15)
     except Exception as e:
         print(f"⚠ Ошибка получения Steam профиля: {e}")
 
@@ -244,12 +293,15 @@ def find_faceit_by_steam_id(steam_id):
     try:
         print(f"🔍 Ищем Faceit профиль по Steam ID: {steam_id}")
 
+        known = identities.resolve_steam_id(steam_id)
+        if known and known.get('nickname'):
+            print(f"✓ Найден в графе идентичностей: {known['nickname']}")
+            return known['nickname']
+
         # Пробуем найти через поиск Steam ID на Faceit
-        response = requests.get(
-            f'{FACEIT_API_URL}/players',
-            headers=headers,
-            params={'game_player_id': steam_id, 'game': 'cs2'},
-            timeout=10
+        response = faceit_get(
+            '/players',
+            params={'game_player_id': steam_id, 'game': 'cs2'}
         )
 
         if response.status_code == 200:
@@ -308,10 +360,29 @@ def extract_nickname_from_url(url):
     return url
 
 
+def get_current_owner(nickname):
+    """Текущий владелец ника по точному поиску, None - ник свободен или API недоступен"""
+    try:
+        response = faceit_get('/players', params={'nickname': nickname})
+        if response.status_code == 200:
+            return response.json()
+    except Exception as e:
+        print(f"⚠ Ошибка проверки владельца ника: {e}")
+    return None
+
+
 def get_player_id(nickname):
     """Получает Faceit ID игрока"""
     print(f"🆔 Поиск Faceit ID для: {nickname}")
 
+    # Ник (в том числе старый) или Steam ID, которые уже встречались в ответах API
+    known = identities.resolve(nickname)
+    if known:
+        # Старый ник мог занять другой игрок, которого в графе еще нет - тогда проверяем точным поиском
+        player = confirm_owner(nickname, known, get_current_owner)
+        print(f"✓ Найден в графе идентичностей: {player.get('nickname')}")
+        return player['player_id']
+
     # Сначала пробуем улучшенный поиск
     search_result = search_player_on_faceit(nickname)
 
@@ -319,7 +390,7 @@ def get_player_id(nickname):
         return search_result['player_id']
 
     # Если не нашли по никнейму, может быть это Steam ID?
-    if re.match(r'^\d{17}$', nickname):
+    if is_steam_id(nickname):
         print(f"🔍 Ввод похож на Steam ID, пробуем поиск...")
         faceit_nickname = find_faceit_by_steam_id(nickname)
         if faceit_nickname:
@@ -337,11 +408,7 @@ def get_player_stats(player_id):
         print(f"📊 Получение статистики для ID: {player_id}")
 
         # Получаем информацию об игроке
-        player_response = requests.get(
-            f'{FACEIT_API_URL}/players/{player_id}',
-            headers=headers,
-            timeout=10
-        )
+        player_response = faceit_get(f'/players/{player_id}')
 
         if player_response.status_code != 200:
             print(f"✗ Ошибка получения информации об игроке: {player_response.status_code}")
@@ -362,11 +429,7 @@ def get_player_stats(player_id):
                 print("⚠ Не удалось получить Steam информацию (возможно, нет API ключа)")
 
         # Получаем статистику CS2 отдельно
-        stats_response = requests.get(
-            f'{FACEIT_API_URL}/players/{player_id}/stats/cs2',
-            headers=headers,
-            timeout=10
-        )
+        stats_response = faceit_get(f'/players/{player_id}/stats/cs2')
 
         stats_data = {}
         if stats_response.status_code == 200:
@@ -374,11 +437,9 @@ def get_player_stats(player_id):
             print("✓ Получена общая статистика CS2")
 
         # Получаем последние матчи
-        matches_response = requests.get(
-            f'{FACEIT_API_URL}/players/{player_id}/games/cs2/stats',
-            headers=headers,
-            params={'offset': 0, 'limit': 30},
-            timeout=10
+        matches_response = faceit_get(
+            f'/players/{player_id}/games/cs2/stats',
+            params={'offset': 0, 'limit': 30}
         )
 
         matches_data = {}
@@ -421,29 +482,13 @@ def calculate_recent_stats(matches, player_id):
     items = matches['items']
     print(f"🔍 Анализируем {len(items)} матчей")
 
-    total_kills = 0
-    total_deaths = 0
-    total_assists = 0
+    # Колонки K/D/A и результатов, суммы - векторно
+    columns = MatchColumns.from_game_stats(items)
+    total_kills = int(np.nansum(columns.kills))
+    total_deaths = int(np.nansum(columns.deaths))
+    total_assists = int(np.nansum(columns.assists))
     total_matches = len(items)
-    wins = 0
-
-    for i, match in enumerate(items):
-        # Получаем статистику из match['stats']
-        stats = match.get('stats', {})
-
-        # Получаем K/D/A
-        kills = int(stats.get('Kills', 0) or 0)
-        deaths = int(stats.get('Deaths', 0) or 0)
-        assists = int(stats.get('Assists', 0) or 0)
-
-        total_kills += kills
-        total_deaths += deaths
-        total_assists += assists
-
-        # Определяем победу
-        result = stats.get('Result', '0')
-        if str(result) == '1':
-            wins += 1
+    wins = int(np.nansum(columns.result))
 
     print(f"\n📈 ИТОГО:")
     print(f"  Матчи: {total_matches}")
@@ -468,7 +513,9 @@ def calculate_recent_stats(matches, player_id):
         'win_rate': win_rate,
         'avg_kills': avg_kills,
         'avg_deaths': avg_deaths,
-        'avg_assists': avg_assists
+        'avg_assists': avg_assists,
+        # Окна последних 5/10/20/... матчей, скользящие K/D и винрейт, тренды
+        'form': form_stats(columns)
     }
 
 
@@ -536,6 +583,17 @@ def index():
     return render_template('index.html')
 
 
+@app.route('/api/diagnostics')
+def diagnostics():
+    """Диагностика: переиспользование соединений пула и ожидание лимитера"""
+    return jsonify({
+        'http_pool': http.stats(),
+        'rate_limiter': limiter.stats(),
+        'identities': identities.stats(),
+        'steam_batching': steam_summaries.stats()
+    })
+
+
 @app.route('/get_stats', methods=['POST'])
 def get_stats():
     try:
@@ -0,0 +1,76 @@
+# activity.py - TTL кэша по активности игрока (как часто играет и как давно был последний матч)
+import re
+import time
+import threading
+from collections import OrderedDict
+from statistics import median
+from config import Config
+
+PLAYER_ENDPOINT_RE = re.compile(r'^/players/([^/?]+)')
+
+# Классы endpoint'ов (см. cache.ENDPOINT_CLASSES), данные которых меняются после каждого матча игрока
+PLAYER_SCOPED_CLASSES = ('player', 'lifetime_stats', 'history')
+
+
+def endpoint_player_id(endpoint):
+    match = PLAYER_ENDPOINT_RE.match(endpoint)
+    return match.group(1) if match else None
+
+
+class ActivityTracker:
+    """Ритм матчей игрока по finished_at из истории -> TTL для его записей в кэше"""
+
+    def __init__(self, max_players=None):
+        self.max_players = max_players or Config.ACTIVITY_MAX_PLAYERS
+        self._players = OrderedDict()
+        self._lock = threading.Lock()
+
+    def observe_history(self, player_id, history):
+        """Запоминает время последнего матча и медианный интервал между матчами"""
+        finished = sorted((item.get('finished_at') for item in (history or {}).get('items') or []
+                           if item.get('finished_at')), reverse=True)
+        if not finished:
+            return
+
+        gaps = [newer - older for newer, older in zip(finished, finished[1:]) if newer > older]
+        with self._lock:
+            known = self._players.get(player_id)
+            last_finished = max(finished[0], known['last_finished']) if known else finished[0]
+            cadence = median(gaps) if gaps else (known['cadence'] if known else None)
+            self._players[player_id] = {'last_finished': last_finished, 'cadence': cadence}
+            self._players.move_to_end(player_id)
+            while len(self._players) > self.max_players:
+                self._players.popitem(last=False)
+
+    def ttl_for(self, player_id, default_ttl):
+        """TTL для данных игрока: часто играет - короткий, давно не играл - длинный.
+
+        Активному игроку TTL только уменьшаем: не больше default_ttl (TTL класса endpoint'а).
+        """
+        with self._lock:
+            known = self._players.get(player_id)
+        if not known:
+            return default_ttl
+
+        since_last = max(0, time.time() - known['last_finished'])
+        ttl = Config.ACTIVITY_TTL_FACTOR * max(known['cadence'] or 0, since_last)
+        ttl = int(min(Config.ACTIVITY_TTL_MAX, max(Config.ACTIVITY_TTL_MIN, ttl)))
+        if default_ttl and since_last < Config.ACTIVITY_ACTIVE_WINDOW:
+            ttl = min(ttl, default_ttl)
+        return ttl
+
+    def stats(self, limit=20):
+        """Последние отслеживаемые игроки и выбранные для них TTL (для профиля /players/{id})"""
+        with self._lock:
+            recent = list(self._players.items())[-limit:]
+            tracked = len(self._players)
+        now = time.time()
+        return {
+            'tracked_players': tracked,
+            'players': [{
+                'player_id': player_id,
+                'cadence_s': int(info['cadence']) if info['cadence'] else None,
+                'since_last_match_s': int(max(0, now - info['last_finished'])),
+                'ttl_s': self.ttl_for(player_id, Config.CACHE_TTL.get('player'))
+            } for player_id, info in reversed(recent)]
+        }
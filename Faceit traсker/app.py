@@ -1,11 +1,23 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for, flash
+from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, g
 from database import get_db, create_tables
 from faceit_api import FaceitAPI
 from faceit_backup import FaceitBackup
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, Future, wait
+from config import Config
+from deadline import request_deadline
+from request_memo import begin_request_memo, end_request_memo, api_failed
+from negative_cache import get_negative_cache
+from prefetch import ProfileHandoff
+from swr import StaleWhileRevalidate
+from popularity import TinyLFU
+import contextvars
+import threading
+import time
 import re
 import logging
 import sqlite3
+import os
 
 app = Flask(__name__)
 app.config.from_object('config.Config')
@@ -16,11 +28,36 @@ logger = logging.getLogger(__name__)
 
 # Создаем экземпляр API
 faceit_api = FaceitAPI()
+negative_cache = get_negative_cache()
+
+# Пул для параллельной загрузки секций профиля
+profile_executor = ThreadPoolExecutor(max_workers=Config.PROFILE_WORKERS)
+# Секции профиля, запущенные заранее при поиске
+profile_handoff = ProfileHandoff()
 
 with app.app_context():
     create_tables()
 
 
+@app.before_request
+def start_request_memo():
+    """Мемо ответов API на время запроса: один endpoint - один вызов"""
+    g.api_memo, g.api_memo_token = begin_request_memo()
+
+
+@app.teardown_request
+def finish_request_memo(exc=None):
+    memo = g.pop('api_memo', None)
+    token = g.pop('api_memo_token', None)
+    if memo is None:
+        return
+
+    end_request_memo(token)
+    if memo.lookups:
+        logger.info(f"🧠 {request.path}: обращений к API {memo.lookups}, "
+                    f"сэкономлено повторных вызовов {memo.saved}")
+
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -98,8 +135,10 @@ def extract_nickname(input_text):
                 return nickname
         return input_text
 
-    # Если это просто ник
-    nickname = input_text.strip()
+    # Ссылка на Steam профиль: /profiles/<steam_id> или /id/<vanity>
+    steam_match = re.search(r'steamcommunity\.com/(?:profiles|id)/([^/?]+)', input_text, re.IGNORECASE)
+    # Ник, Steam ID и vanity имя разрешает find_player через граф идентичностей
+    nickname = steam_match.group(1) if steam_match else input_text.strip()
     logger.info(f"✅ Используем как никнейм: '{nickname}'")
     return nickname
 
@@ -121,10 +160,16 @@ def search_player():
         flash('❌ Не удалось распознать никнейм', 'error')
         return redirect(url_for('index'))
 
+    # Этот ник недавно уже искали безуспешно - не гоняем всю цепочку поиска заново
+    if negative_cache.contains(nickname):
+        logger.info(f"🚫 '{nickname}' недавно не найден, пропускаем поиск")
+        return _player_not_found(nickname)
+
     logger.info(f"🔍 Ищем игрока: '{nickname}'")
 
     player_data = None
     source = "API"
+    search_completed = False
 
     try:
         # Пробуем найти через API
@@ -154,6 +199,8 @@ def search_player():
                 except Exception as e:
                     logger.warning(f"⚠️ Ошибка при веб-поиске: {e}")
 
+        search_completed = True
+
     except Exception as e:
         logger.error(f"❌ Ошибка при поиске игрока: {e}")
         player_data = None
@@ -161,21 +208,11 @@ def search_player():
     if not player_data:
         logger.error(f"❌ Игрок '{nickname}' не найден ни одним методом")
 
-        # Пробуем предложить альтернативы через демо-режим
-        try:
-            # Ищем в демо-базе
-            demo_players = ['donk666', 's1mple', 'NiKo', 'ZywOo', 'Daniil Finch']
-            matches = [p for p in demo_players if nickname.lower() in p.lower()]
-
-            if matches:
-                flash(f'❌ Игрок "{nickname}" не найден. Попробуйте одного из демо-игроков: {", ".join(demo_players)}',
-                      'warning')
-            else:
-                flash(f'❌ Игрок "{nickname}" не найден. Для теста попробуйте: donk666, s1mple, NiKo', 'error')
-        except:
-            flash(f'❌ Игрок "{nickname}" не найден', 'error')
+        # Запоминаем неудачу, только если API на все запросы ответил (пусто или 404), а не сбоил
+        if search_completed and not api_failed():
+            negative_cache.add(nickname)
 
-        return redirect(url_for('index'))
+        return _player_not_found(nickname)
 
     # Сохраняем в БД
     try:
@@ -193,16 +230,132 @@ def search_player():
         flash('❌ Ошибка: отсутствует ID игрока', 'error')
         return redirect(url_for('index'))
 
+    # Пока браузер идет по редиректу, профиль уже грузится (если он не свежий в кэше)
+    if source == "API" and not profile_cache.is_fresh(player_id):
+        _prefetch_profile(player_data)
+
     return redirect(url_for('player_profile', player_id=player_id))
 
 
+def _prefetch_profile(player_data):
+    """Запускает загрузку статистики, истории и рейтинга; основные данные уже есть из поиска"""
+    profile = Future()
+    profile.set_result(player_data)
+    player_id = player_data['player_id']
+    # Тот же бюджет, что и у страницы профиля: секции не крутятся дольше, чем их будут ждать
+    with request_deadline(Config.PAGE_BUDGET_MS):
+        sections = _start_profile_sections(player_id, {'profile': profile})
+    profile_handoff.put(player_id, sections)
+
+
+def _player_not_found(nickname):
+    """Сообщение о ненайденном игроке с подсказкой демо-игроков"""
+    # Пробуем предложить альтернативы через демо-режим
+    try:
+        # Ищем в демо-базе
+        demo_players = ['donk666', 's1mple', 'NiKo', 'ZywOo', 'Daniil Finch']
+        matches = [p for p in demo_players if nickname.lower() in p.lower()]
+
+        if matches:
+            flash(f'❌ Игрок "{nickname}" не найден. Попробуйте одного из демо-игроков: {", ".join(demo_players)}',
+                  'warning')
+        else:
+            flash(f'❌ Игрок "{nickname}" не найден. Для теста попробуйте: donk666, s1mple, NiKo', 'error')
+    except:
+        flash(f'❌ Игрок "{nickname}" не найден', 'error')
+
+    return redirect(url_for('index'))
+
+
+def _submit_section(fn, *args):
+    """Запускает загрузку секции профиля в пуле, передавая дедлайн текущего запроса"""
+    ctx = contextvars.copy_context()
+    return profile_executor.submit(ctx.run, fn, *args)
+
+
+def _section_result(future):
+    """Результат секции, None - если не успела или упала"""
+    if not future.done():
+        return None
+    try:
+        return future.result()
+    except Exception as e:
+        logger.error(f"❌ Ошибка загрузки секции профиля: {e}")
+        return None
+
+
+def _failed_sections(sections):
+    """Секции, которые завершились ошибкой; статистика и последние игры без ответа (None) - тоже ошибка"""
+    failed = []
+    for name, future in sections.items():
+        if not future.done() or future.cancelled():
+            continue
+        if future.exception() is not None:
+            failed.append(name)
+        elif name in ('stats', 'recent_matches') and future.result() is None:
+            failed.append(name)
+    return failed
+
+
+def _start_profile_sections(player_id, ready=None):
+    """Запускает загрузку секций профиля; уже готовые (ready) не перезапускаются"""
+    ready = ready or {}
+    loaders = {
+        'profile': (faceit_api.get_player_by_id, player_id),
+        'stats': (faceit_api.get_player_stats_detailed, player_id),
+        'recent_matches': (faceit_api.get_recent_matches_local, player_id, 5),
+        'form': (faceit_api.get_player_form, player_id),
+        'ranking': (faceit_api.get_player_ranking, player_id),
+    }
+    return {name: ready.get(name) or _submit_section(*loader) for name, loader in loaders.items()}
+
+
 def get_player_stats(player_id):
-    """Получает статистику игрока - ИСПРАВЛЕННАЯ ВЕРСИЯ"""
+    """Статистика игрока: свежая из кэша, устаревшая - сразу с фоновым обновлением, иначе загрузка"""
+    player_data, age, state = profile_cache.get(player_id)
+    if not player_data:
+        return None
+
+    if state == StaleWhileRevalidate.STALE:
+        logger.info(f"♻️ Отдаем данные {player_id} возрастом {int(age)} с, обновляем в фоне")
+
+    player_data = dict(player_data)
+    player_data['data_age_s'] = int(age)
+    player_data['data_state'] = state
+    return player_data
+
+
+def load_player_stats(player_id, budget_ms=None):
+    """Получает статистику игрока в рамках бюджета времени страницы"""
     try:
         logger.info(f"📊 Загрузка статистики для игрока: {player_id}")
 
+        # Секции, запущенные еще при поиске (/search -> редирект сюда)
+        prefetched, redirect_gap_ms = profile_handoff.take(player_id)
+        if prefetched:
+            logger.info(f"⚡ Профиль {player_id} уже грузится с момента поиска ({redirect_gap_ms} мс назад)")
+
+        with request_deadline(budget_ms or Config.PAGE_BUDGET_MS) as deadline:
+            # Все секции грузятся параллельно, таймауты внутри урезаются бюджетом
+            sections = prefetched or _start_profile_sections(player_id)
+            wait(sections.values(), timeout=deadline.remaining())
+
+            # Без основных данных страницу не построить - их дожидаемся
+            # (запросы внутри уже ограничены дедлайном, так что это недолго)
+            wait([sections['profile']])
+
+        # Не начатые секции после бюджета уже не нужны - снимаем их с очереди пула
+        for future in sections.values():
+            future.cancel()
+
+        ready = {name: future.done() and not future.cancelled() for name, future in sections.items()}
+        pending_sections = [name for name, done in ready.items() if not done]
+        failed_sections = _failed_sections(sections)
+        if pending_sections:
+            logger.warning(f"⏱️ Не уложились в {deadline.budget_ms} мс: {', '.join(pending_sections)}")
+
         # Получаем основные данные игрока
-        player_info = faceit_api.get_player_by_id(player_id)
+        player_info = _section_result(sections['profile'])
 
         if not player_info:
             logger.warning(f"⚠️ Основные данные игрока {player_id} не найдены")
@@ -237,14 +390,12 @@ def get_player_stats(player_id):
             else:
                 return None
 
-        # Получаем детальную статистику (за последние 20 матчей)
-        detailed_stats = faceit_api.get_player_stats_detailed(player_id)
-
-        # Получаем последние матчи для отображения W/L
-        recent_matches = faceit_api.get_recent_matches_fixed(player_id, limit=5)
-
-        # Получаем рейтинги (регион/страна)
-        ranking = faceit_api.get_player_ranking(player_id)
+        # Детальная статистика, последние матчи (W/L) и рейтинги - что успело загрузиться
+        detailed_stats = _section_result(sections['stats'])
+        recent_matches = _section_result(sections['recent_matches'])
+        ranking = _section_result(sections['ranking'])
+        form = _section_result(sections['form'])
+        stats = detailed_stats or {}
 
         # Рассчитываем историю ELO
         current_elo = player_info.get('faceit_elo', 0)
@@ -272,25 +423,28 @@ def get_player_stats(player_id):
             'region_rank': ranking.get('region_rank') if ranking else None,
             'country_rank': ranking.get('country_rank') if ranking else None,
 
-            # Последние матчи (W/L)
-            'recent_matches': recent_matches if recent_matches else ['W', 'L', 'W', 'L', '-'],
-
-            # Статистика из detailed_stats
-            'winrate': detailed_stats.get('winrate', 50.0) if detailed_stats else 50.0,
-            'total_matches': detailed_stats.get('total_matches', 20) if detailed_stats else 20,
-            'total_wins': detailed_stats.get('total_wins', 10) if detailed_stats else 10,
-            'total_losses': detailed_stats.get('total_losses', 10) if detailed_stats else 10,
-            'kd_ratio': detailed_stats.get('kd_ratio', 1.25) if detailed_stats else 1.25,
-            'average_kills': detailed_stats.get('average_kills', 20.0) if detailed_stats else 20.0,
-            'average_deaths': detailed_stats.get('average_deaths', 16.0) if detailed_stats else 16.0,
-            'average_assists': detailed_stats.get('average_assists', 5.0) if detailed_stats else 5.0,
-            'average_headshots': detailed_stats.get('average_headshots', 45.0) if detailed_stats else 45.0,
-            'total_headshots': detailed_stats.get('total_headshots', 1000) if detailed_stats else 1000,
+            # Последние матчи (W/L); не загрузились - секция покажет ошибку, а не выдуманную серию
+            'recent_matches': recent_matches or [],
+
+            # Форма: окна последних матчей, скользящие K/D и винрейт, тренды (None - истории еще нет)
+            'form': form,
+
+            # Статистика из detailed_stats (без нее секции статистики показывают ошибку)
+            'winrate': stats.get('winrate', 0),
+            'total_matches': stats.get('total_matches', 0),
+            'total_wins': stats.get('total_wins', 0),
+            'total_losses': stats.get('total_losses', 0),
+            'kd_ratio': stats.get('kd_ratio', 0),
+            'average_kills': stats.get('average_kills', 0),
+            'average_deaths': stats.get('average_deaths', 0),
+            'average_assists': stats.get('average_assists', 0),
+            'average_headshots': stats.get('average_headshots', 0),
+            'total_headshots': stats.get('total_headshots', 0),
 
             # Серии побед
-            'longest_win_streak': detailed_stats.get('longest_win_streak', 5) if detailed_stats else 5,
-            'current_win_streak': detailed_stats.get('current_win_streak', 2) if detailed_stats else 2,
-            'longest_lose_streak': detailed_stats.get('longest_lose_streak', 0) if detailed_stats else 0,
+            'longest_win_streak': stats.get('longest_win_streak', 0),
+            'current_win_streak': stats.get('current_win_streak', 0),
+            'longest_lose_streak': stats.get('longest_lose_streak', 0),
 
             # История ELO
             'highest_elo': highest_elo,
@@ -298,22 +452,29 @@ def get_player_stats(player_id):
             'average_elo': average_elo,
 
             # Дополнительно
-            'mvp': detailed_stats.get('mvp', 2) if detailed_stats else 2,
-            'triple_kills': detailed_stats.get('triple_kills', 12) if detailed_stats else 12,
-            'quadro_kills': detailed_stats.get('quadro_kills', 3) if detailed_stats else 3,
-            'penta_kills': detailed_stats.get('penta_kills', 0) if detailed_stats else 0,
+            'mvp': stats.get('mvp', 0),
+            'triple_kills': stats.get('triple_kills', 0),
+            'quadro_kills': stats.get('quadro_kills', 0),
+            'penta_kills': stats.get('penta_kills', 0),
 
             # Флаг реальных данных
             'is_real_data': detailed_stats is not None,
 
             # Для совместимости с шаблонами
-            'raw_data': player_info.get('raw_data', {})
+            'raw_data': player_info.get('raw_data', {}),
+
+            # Какие секции успели в бюджет времени
+            'sections': ready,
+            'pending_sections': pending_sections,
+            'failed_sections': failed_sections,
+            'render_ms': deadline.elapsed_ms(),
+            'redirect_gap_ms': redirect_gap_ms
         }
 
         logger.info(f"✅ Статистика загружена для {player_data['nickname']}: "
                     f"ELO={player_data['faceit_elo']}, "
                     f"Уровень={player_data['skill_level']}, "
-                    f"Последние матчи={' '.join(player_data['recent_matches'])}")
+                    f"Последние матчи={' '.join(player_data['recent_matches']) or '-'}")
 
         return player_data
 
@@ -324,6 +485,36 @@ def get_player_stats(player_id):
         return None
 
 
+# Готовые данные страниц профиля; неполные (секции не успели или упали) не кэшируем
+profile_cache = StaleWhileRevalidate(load_player_stats,
+                                     cacheable=lambda data: bool(data) and not data.get('pending_sections')
+                                     and not data.get('failed_sections'),
+                                     admission=TinyLFU())
+
+
+def warm_hot_players():
+    """Фоновый прогрев: самые популярные профили обновляются до того, как устареют"""
+    while True:
+        time.sleep(Config.HOT_WARM_INTERVAL)
+        try:
+            for player_id in profile_cache.admission.hottest():
+                if profile_cache.refresh_if_expiring(player_id, Config.HOT_WARM_AHEAD):
+                    logger.info(f"🔥 Прогрев популярного профиля: {player_id}")
+        except Exception as e:
+            logger.error(f"❌ Ошибка прогрева популярных профилей: {e}")
+
+
+_hot_warmer = None
+
+
+def start_hot_player_warmer():
+    """Запускает фоновый прогрев один раз на процесс - при старте приложения, а не при импорте модуля"""
+    global _hot_warmer
+    if Config.HOT_WARMER_ENABLED and _hot_warmer is None:
+        _hot_warmer = threading.Thread(target=warm_hot_players, name='hot-player-warmer', daemon=True)
+        _hot_warmer.start()
+
+
 @app.route('/player/<player_id>')
 def player_profile(player_id):
     """Отображение профиля игрока"""
@@ -392,6 +583,27 @@ def api_get_stats(player_id):
         })
 
 
+@app.route('/api/diagnostics')
+def api_diagnostics():
+    """Диагностика: пул соединений, лимитер, склейка запросов и кэш"""
+    return jsonify({
+        'http_pool': faceit_api.http.stats(),
+        'rate_limiter': faceit_api.limiter.stats(),
+        'coalescing': faceit_api.inflight.stats(),
+        'cache': faceit_api.cache.stats(),
+        'match_store': faceit_api.match_store.stats(),
+        'circuit_breakers': faceit_api.breakers.stats(),
+        'search': faceit_api.search_stats(),
+        'identities': faceit_api.identities.stats(),
+        'negative_cache': negative_cache.stats(),
+        'prefetch': profile_handoff.stats(),
+        'profile_cache': profile_cache.stats(),
+        'adaptive_ttl': faceit_api.activity.stats(),
+        'match_history': faceit_api.match_history.stats(),
+        'player_aggregates': faceit_api.player_aggregates.stats()
+    })
+
+
 @app.errorhandler(404)
 def page_not_found(e):
     return render_template('error.html',
@@ -439,4 +651,8 @@ if __name__ == '__main__':
     print("=" * 60)
     print("\n📊 Для выхода нажмите Ctrl+C\n")
 
+    # С debug=True этот блок выполняется и в процессе-наблюдателе перезагрузчика - прогрев нужен только в рабочем
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_hot_player_warmer()
+
     app.run(debug=True, host='0.0.0.0', port=7777)
\ No newline at end of file
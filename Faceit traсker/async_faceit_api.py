@@ -0,0 +1,351 @@
+# async_faceit_api.py - Асинхронный клиент FACEIT API (aiohttp)
+import asyncio
+import logging
+import aiohttp
+from config import Config
+from faceit_common import FaceitCommon
+from rate_limiter import get_rate_limiter
+from singleflight import request_key
+from cache import TieredCache, endpoint_class
+from activity import ActivityTracker, endpoint_player_id
+from match_store import MatchStore
+from player_aggregates import PlayerAggregates
+from circuit_breaker import CircuitBreakerRegistry, CircuitOpenError
+from identity_store import get_identity_store
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncFaceitAPI(FaceitCommon):
+    """Асинхронный клиент FACEIT API для async-воркеров.
+
+    Есть find_player, get_player_by_id, get_player_stats_detailed, get_aggregate_stats,
+    get_recent_matches_fixed, get_player_ranking, get_match_details и get_player_profile.
+    Разбор ответов и выбор источника статистики общие с FaceitAPI (FaceitCommon), поэтому результаты совпадают.
+
+    Запросы идут через тот же двухуровневый кэш (TTL по активности игрока) и предохранители
+    по семействам endpoint'ов: при разомкнутом предохранителе отдаются данные из кэша, даже протухшие.
+    Все обращения к SQLite выполняются в asyncio.to_thread и не блокируют цикл событий.
+
+    История матчей сама не синхронизируется: player_stats читается в том виде, в каком его
+    оставили FaceitAPI и backfill. Граф идентичностей и хедж-поиск в find_player, перепроверка
+    кэша по ETag и склейка одинаковых запросов здесь не используются.
+    """
+
+    def __init__(self, session=None):
+        # Хранилища при создании проверяют свои таблицы - создавать клиент до запуска цикла событий
+        self.api_key = Config.FACEIT_API_KEY
+        self.base_url = Config.FACEIT_API_URL
+        self.game = Config.FACEIT_GAME
+        self.valid_key = bool(self.api_key)
+        self.headers = {
+            'Authorization': f'Bearer {self.api_key}',
+            'Accept': 'application/json',
+            'User-Agent': 'FaceitAnalyser/1.0'
+        } if self.valid_key else {}
+
+        self.limiter = get_rate_limiter()
+        self.cache = TieredCache()
+        self.activity = ActivityTracker()
+        self.match_store = MatchStore()
+        self.player_aggregates = PlayerAggregates()
+        self.breakers = CircuitBreakerRegistry()
+        self.identities = get_identity_store()
+
+        self._session = session
+        self._own_session = session is None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=Config.HTTP_POOL_MAXSIZE * Config.HTTP_POOL_CONNECTIONS,
+                limit_per_host=Config.HTTP_POOL_MAXSIZE,
+                force_close=not Config.HTTP_KEEP_ALIVE
+            )
+            self._session = aiohttp.ClientSession(connector=connector)
+            self._own_session = True
+        return self._session
+
+    async def close(self):
+        if self._own_session and self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    async def _smart_request(self, endpoint, params=None, max_retries=3):
+        """Запрос через кэш и предохранитель, как FaceitAPI._shared_request"""
+        key = request_key(endpoint, params)
+        ttl = self._cache_ttl(endpoint)
+
+        entry = None
+        if ttl:
+            # L1 в памяти проверяем сразу, в L2 (SQLite) идем из потока
+            entry = self.cache.l1.get(key, allow_stale=True) or await asyncio.to_thread(self.cache.get, key, True)
+            if entry is not None and entry.fresh:
+                return entry.value
+
+        try:
+            data = await self._fetch_json(endpoint, params, max_retries)
+        except CircuitOpenError:
+            if entry is not None:
+                logger.warning(f"⚠️ API недоступен, отдаем данные из кэша: {endpoint}")
+                return entry.value
+            logger.warning(f"⚠️ API недоступен, данных в кэше нет: {endpoint}")
+            return None
+
+        if data is not None:
+            await asyncio.to_thread(self._store_response, key, endpoint, data)
+        return data
+
+    def _store_response(self, key, endpoint, data):
+        """Идентичности, ритм игрока и запись в кэш (выполняется в потоке - пишет в SQLite)"""
+        self.identities.observe_payload(data)
+        if endpoint_class(endpoint) == 'history':
+            self.activity.observe_history(endpoint_player_id(endpoint), data)
+        ttl = self._cache_ttl(endpoint)
+        if ttl:
+            self.cache.set(key, data, ttl)
+
+    async def _fetch_json(self, endpoint, params=None, max_retries=3):
+        """Запрос к API с повторными попытками, все ожидания неблокирующие"""
+        url = f"{self.base_url}{endpoint}"
+        session = self._get_session()
+        breaker = self.breakers.for_endpoint(endpoint)
+
+        for attempt in range(max_retries):
+            # API лежит - не ждем таймаутов, сразу отдаем управление
+            admission = breaker.allow()
+            if not admission:
+                raise CircuitOpenError(breaker.name)
+
+            try:
+                logger.debug(f"Запрос: {url}, Параметры: {params}")
+
+                await self.limiter.acquire_async()
+
+                # Заголовки на каждый запрос: сессия могла прийти снаружи, без Authorization
+                async with session.get(url, params=params, headers=self.headers,
+                                       timeout=aiohttp.ClientTimeout(total=15)) as response:
+                    self.limiter.update_from_headers(response.headers)
+
+                    if response.status >= 500:
+                        breaker.record_failure()
+                    else:
+                        breaker.record_success()
+
+                    if response.status == 200:
+                        return await response.json()
+                    elif response.status == 401:
+                        logger.error("❌ Неверный API ключ!")
+                        return None
+                    elif response.status == 404:
+                        logger.warning(f"⚠️ Ресурс не найден: {endpoint}")
+                        return None
+                    elif response.status == 429:
+                        if 'Retry-After' not in response.headers:
+                            self.limiter.pause(min(60, 2 ** attempt))
+                        continue
+                    else:
+                        text = await response.text()
+                        logger.error(f"❌ HTTP {response.status}: {text[:200]}")
+                        return None
+
+            except asyncio.TimeoutError:
+                breaker.record_failure()
+                logger.warning(f"⚠️ Таймаут запроса (попытка {attempt + 1}/{max_retries})")
+                await asyncio.sleep(2)
+                continue
+            except aiohttp.ClientError as e:
+                breaker.record_failure()
+                logger.error(f"❌ Ошибка сети: {e}")
+                if attempt == max_retries - 1:
+                    return None
+                await asyncio.sleep(1)
+                continue
+            finally:
+                breaker.release_probe(admission)
+
+        return None
+
+    async def find_player(self, nickname):
+        """ГЛАВНЫЙ МЕТОД: Находит игрока любым способом"""
+        logger.info(f"🔍 Поиск игрока: '{nickname}'")
+
+        for method in (self._search_exact, self._search_direct, self._search_legacy, self._search_without_game):
+            player = await method(nickname)
+            if player:
+                return player
+
+        logger.warning(f"❌ Игрок '{nickname}' не найден ни одним методом")
+        return None
+
+    async def _search_exact(self, nickname):
+        """Метод 0: Точный ник - полный профиль одним запросом"""
+        data = await self._smart_request("/players", {'nickname': nickname})
+
+        if not data or not data.get('player_id'):
+            return None
+
+        logger.info(f"✅ Найден по точному нику: {data.get('nickname')}")
+        await asyncio.to_thread(self._remember_player_payload, data)
+        return self._build_player_result(data)
+
+    async def _search_direct(self, nickname):
+        """Метод 1: Прямой поиск (основной)"""
+        data = await self._smart_request("/players", {'nickname': nickname, 'limit': 50, 'offset': 0})
+
+        exact_match = self._pick_search_match(data, nickname)
+        if exact_match:
+            logger.info(f"✅ Найден через прямой поиск: {exact_match['nickname']}")
+            return await self._enrich_player_data(exact_match)
+
+        return None
+
+    async def _search_legacy(self, nickname):
+        """Метод 2: Старый endpoint поиска"""
+        data = await self._smart_request("/search/players",
+                                         {'nickname': nickname, 'game': self.game, 'limit': 20})
+
+        if data and 'items' in data and data['items']:
+            player = data['items'][0]
+            logger.info(f"✅ Найден через legacy поиск: {player['nickname']}")
+            return await self._enrich_player_data(player)
+
+        return None
+
+    async def _search_without_game(self, nickname):
+        """Метод 3: Поиск без указания игры"""
+        data = await self._smart_request("/players", {'nickname': nickname, 'limit': 30})
+
+        if data and 'items' in data and data['items']:
+            player = data['items'][0]
+            logger.info(f"✅ Найден без указания игры: {player['nickname']}")
+            return await self._enrich_player_data(player)
+
+        return None
+
+    async def _enrich_player_data(self, player_data):
+        """Обогащает данные игрока дополнительной информацией"""
+        player_id = player_data.get('player_id')
+
+        if not player_id:
+            return None
+
+        if player_data.get('games'):
+            await asyncio.to_thread(self._remember_player_payload, player_data)
+            return self._build_player_result(player_data)
+
+        full_data = await self.get_player_by_id(player_id)
+        return full_data or self._basic_player_data(player_data)
+
+    async def get_player_by_id(self, player_id):
+        """Получение полной информации по ID"""
+        logger.info(f"📋 Получение данных игрока: {player_id}")
+
+        data = await self._smart_request(f"/players/{player_id}")
+        if not data:
+            return None
+
+        return self._build_player_result(data)
+
+    async def get_player_stats_detailed(self, player_id):
+        """Получает детальную статистику игрока"""
+        logger.info(f"📈 Получение детальной статистики для: {player_id}")
+
+        if not self.valid_key:
+            logger.warning("⚠️ API ключ не настроен или невалиден, используем демо-данные")
+            return await asyncio.to_thread(self._get_realistic_stats, player_id)
+
+        # Вся история уже сведена в player_stats - API не нужен
+        stats = await self.get_aggregate_stats(player_id, full_history=True)
+        if stats:
+            return stats
+
+        data = await self._smart_request(f"/players/{player_id}/stats/{self.game}")
+        return await asyncio.to_thread(self._stats_from_response, data, player_id)
+
+    async def get_aggregate_stats(self, player_id, full_history=False):
+        """Статистика из player_stats в том виде, в каком ее оставила синхронизация истории"""
+        return await asyncio.to_thread(self._stored_stats, player_id, full_history)
+
+    async def get_player_ranking(self, player_id):
+        """Получает рейтинг игрока (регион и страна)"""
+        logger.info(f"📊 Получение рейтинга для игрока: {player_id}")
+
+        data = await self._smart_request(f"/players/{player_id}/stats/{self.game}")
+        return self._parse_ranking(data)
+
+    async def get_recent_matches_fixed(self, player_id, limit=5):
+        """Последние матчи для отображения W/L"""
+        logger.info(f"🎮 Получение последних матчей для: {player_id}")
+
+        params = {
+            'game': self.game,
+            'limit': limit,
+            'offset': 0
+        }
+        data = await self._smart_request(f"/players/{player_id}/history", params)
+
+        if not data or 'items' not in data:
+            logger.warning(f"⚠️ Нет данных матчей, используем реалистичные")
+            return self._get_realistic_matches(player_id)
+
+        matches = data['items'][:limit]
+
+        # Матчи без elo_delta добираем по деталям - все сразу
+        unknown = [m for m in matches if m.get('elo_delta') is None and m.get('match_id')]
+        details = await asyncio.gather(*(self.get_match_details(m['match_id']) for m in unknown),
+                                       return_exceptions=True)
+        results_by_id = {}
+        for match, match_details in zip(unknown, details):
+            if not isinstance(match_details, Exception):
+                results_by_id[match['match_id']] = self._result_from_match_details(match_details, player_id)
+
+        recent_results = []
+        for match in matches:
+            elo_delta = match.get('elo_delta')
+
+            if elo_delta is None:
+                recent_results.append(results_by_id.get(match.get('match_id')) or '-')
+            elif elo_delta > 0:
+                recent_results.append('W')
+            elif elo_delta < 0:
+                recent_results.append('L')
+            else:
+                recent_results.append('-')
+
+        while len(recent_results) < limit:
+            recent_results.append('-')
+
+        logger.info(f"✅ Итоговые последние игры: {' '.join(recent_results)}")
+        return recent_results[:limit]
+
+    async def get_match_details(self, match_id):
+        """Детали матча: сначала локальное хранилище, из API - только один раз"""
+        match_data = await asyncio.to_thread(self.match_store.get, match_id)
+        if match_data is not None:
+            return match_data
+
+        match_data = await self._smart_request(f"/matches/{match_id}")
+        if match_data:
+            await asyncio.to_thread(self.match_store.put, match_id, match_data)
+        return match_data
+
+    async def get_player_profile(self, player_id):
+        """Все данные для страницы профиля одним asyncio.gather"""
+        player_info, stats, recent_matches, ranking = await asyncio.gather(
+            self.get_player_by_id(player_id),
+            self.get_player_stats_detailed(player_id),
+            self.get_recent_matches_fixed(player_id, limit=5),
+            self.get_player_ranking(player_id)
+        )
+        return {
+            'player_info': player_info,
+            'detailed_stats': stats,
+            'recent_matches': recent_matches,
+            'ranking': ranking
+        }
@@ -0,0 +1,187 @@
+# backfill.py - Загрузка полной истории матчей игроков в таблицу matches (с продолжением после остановки)
+#
+# Примеры:
+#   python backfill.py s1mple NiKo
+#   python backfill.py --file roster.txt --details --concurrency 2 --workers 8
+import re
+import sys
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from config import Config
+from database import get_db, create_tables, create_backfill_table
+from faceit_api import FaceitAPI
+from match_history import normalize_history_item
+from player_aggregates import with_match_stats
+
+PLAYER_ID_RE = re.compile(r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$', re.IGNORECASE)
+
+
+class BackfillProgress:
+    """Счетчики для вывода скорости: матчи/с и запросы/с"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.monotonic()
+        self.matches = 0
+        self.requests = 0
+
+    def add(self, matches=0, requests=0):
+        with self._lock:
+            self.matches += matches
+            self.requests += requests
+
+    def line(self):
+        elapsed = max(time.monotonic() - self.started, 0.001)
+        return (f"матчей: {self.matches} ({self.matches / elapsed:.1f}/с), "
+                f"запросов: {self.requests} ({self.requests / elapsed:.1f}/с), {elapsed:.0f} с")
+
+
+def load_checkpoint(player_id):
+    conn = get_db()
+    try:
+        row = conn.execute('SELECT oldest_finished_at, matches, done FROM backfill_checkpoints WHERE player_id = ?',
+                           (player_id,)).fetchone()
+    finally:
+        conn.close()
+    return dict(row) if row else None
+
+
+def save_checkpoint(player_id, oldest_finished_at, matches, done):
+    conn = get_db()
+    try:
+        conn.execute('''
+            INSERT OR REPLACE INTO backfill_checkpoints (player_id, oldest_finished_at, matches, done, updated_at)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (player_id, oldest_finished_at, matches, int(done), time.time()))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def resolve_player_id(api, identifier):
+    """player_id, ник или Steam ID -> player_id"""
+    if PLAYER_ID_RE.match(identifier):
+        return identifier
+
+    known = api.identities.resolve(identifier)
+    if known:
+        return known['player_id']
+
+    player = api.find_player(identifier)
+    return player.get('player_id') if player else None
+
+
+def backfill_player(api, player_id, args, progress):
+    """Идет по истории от новых матчей к старым окнами по времени (to = самый старый сохраненный).
+
+    Окно по времени, а не offset: новые матчи, сыгранные во время загрузки, не сдвигают страницы.
+    to включительно, чтобы не потерять матчи той же секунды; уже загруженные матчи этой секунды
+    пропускаются через offset и отсекаются по match_id.
+    """
+    checkpoint = None if args.restart else load_checkpoint(player_id)
+    if checkpoint and checkpoint['done']:
+        print(f"✅ {player_id}: история уже загружена ({checkpoint['matches']} матчей)")
+        return 0
+
+    oldest = checkpoint['oldest_finished_at'] if checkpoint else None
+    total = checkpoint['matches'] if checkpoint else 0
+    # Матчи на границе окна (finished_at == oldest) уже сохранены и придут повторно
+    boundary = api.match_history.ids_finished_at(player_id, oldest) if oldest else set()
+    if oldest:
+        print(f"↩️ {player_id}: продолжаем с матчей не новее {oldest}")
+
+    while True:
+        page = api._history_page(player_id, args.since, oldest, args.page_size, len(boundary))
+        progress.add(requests=1)
+        if page is None:
+            print(f"❌ {player_id}: не удалось получить историю, прервано (чекпоинт сохранен)")
+            return total
+        items = [item for item in page if item.get('match_id') not in boundary]
+
+        # Детали - только тех матчей, которых еще нет в хранилище
+        missing = [item for item in items if args.details and api.match_store.get(item['match_id']) is None]
+        if missing:
+            api._map_match_items(lambda item, _: api.get_match_details(item['match_id']),
+                                 missing, player_id, workers=args.workers)
+            progress.add(requests=len(missing))
+
+        # Одна транзакция на страницу; с --details в строки матчей попадает и статистика игрока
+        rows = [normalize_history_item(item, player_id, api.game) for item in items]
+        if args.details:
+            rows = [with_match_stats(row, api.match_store.get(row['match_id'])) for row in rows]
+        api.match_history.save(rows)
+        api.match_history.fill_stats(rows)
+        total += len(items)
+        progress.add(matches=len(items))
+
+        finished = [item['finished_at'] for item in page if item.get('finished_at')]
+        done = len(page) < args.page_size or not finished or not items
+        if finished:
+            same_second = {item.get('match_id') for item in page if item.get('finished_at') == min(finished)}
+            boundary = boundary | same_second if min(finished) == oldest else same_second
+            oldest = min(finished)
+        save_checkpoint(player_id, oldest, total, done)
+
+        print(f"⏳ {player_id}: +{len(items)} (всего {total}) | {progress.line()}")
+        if done:
+            # Старые матчи легли перед уже учтенными - серии и суммы пересчитываем один раз целиком
+            api.player_aggregates.rebuild(player_id, full_history=not args.since)
+            print(f"✅ {player_id}: история загружена полностью, {total} матчей")
+            return total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Загрузка полной истории матчей игроков FACEIT')
+    parser.add_argument('players', nargs='*', help='player_id, ники или Steam ID')
+    parser.add_argument('--file', help='файл со списком игроков (по одному в строке)')
+    parser.add_argument('--since', type=int, default=0, help='не раньше этого времени (unix), по умолчанию - вся история')
+    parser.add_argument('--page-size', type=int, default=Config.MATCH_SYNC_PAGE_SIZE, help='матчей за запрос (до 100)')
+    parser.add_argument('--concurrency', type=int, default=2, help='сколько игроков грузить одновременно')
+    parser.add_argument('--details', action='store_true', help='загружать и детали матчей (/matches/{id})')
+    parser.add_argument('--workers', type=int, default=Config.MATCH_FETCH_WORKERS,
+                        help='параллельных запросов деталей на игрока')
+    parser.add_argument('--restart', action='store_true', help='игнорировать чекпоинты и начать заново')
+    args = parser.parse_args(argv)
+
+    identifiers = list(args.players)
+    if args.file:
+        with open(args.file, encoding='utf-8') as f:
+            identifiers += [line.strip() for line in f if line.strip() and not line.startswith('#')]
+    if not identifiers:
+        parser.error('укажите игроков или --file')
+
+    create_tables()
+    create_backfill_table()
+    api = FaceitAPI()
+    progress = BackfillProgress()
+
+    player_ids = []
+    for identifier in identifiers:
+        player_id = resolve_player_id(api, identifier)
+        if player_id:
+            player_ids.append(player_id)
+        else:
+            print(f"❌ Игрок '{identifier}' не найден, пропускаем")
+
+    print(f"🚀 Загрузка истории для {len(player_ids)} игроков "
+          f"(одновременно {args.concurrency}, лимит API {Config.RATE_LIMIT_PER_SECOND} запросов/с)")
+
+    # Общий лимитер FaceitAPI держит суммарную скорость запросов в рамках бюджета
+    with ThreadPoolExecutor(max_workers=max(1, args.concurrency)) as executor:
+        futures = [executor.submit(backfill_player, api, player_id, args, progress) for player_id in player_ids]
+        failed = 0
+        for future in futures:
+            try:
+                future.result()
+            except Exception as e:
+                failed += 1
+                print(f"❌ Ошибка загрузки: {e}")
+
+    print(f"🏁 Готово | {progress.line()}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,120 @@
+# batch_loader.py - Склейка одиночных запросов в пакетные (в стиле DataLoader) с кэшем по ключу
+import time
+import threading
+import logging
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+
+class BatchLoader:
+    """Ключи, запрошенные в течение window секунд (из любых потоков), уходят одним вызовом batch_fn.
+
+    batch_fn(keys) -> {key: value}; ключи, которых нет в ответе, получают None.
+    Результат кэшируется по каждому ключу на ttl секунд. Если batch_fn упал (в том числе
+    из-за временной ошибки API), исключение получают все ждущие, а в кэш ничего не попадает.
+    """
+
+    def __init__(self, batch_fn, max_batch=100, window=0.02, ttl=60):
+        self.batch_fn = batch_fn
+        self.max_batch = max_batch
+        self.window = window
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._timer = None
+        self._cache = {}
+
+        self.batches = 0
+        self.keys_loaded = 0
+        self.cache_hits = 0
+        self.joined = 0
+
+    def load(self, key, timeout=None):
+        """Значение для одного ключа (ждет ближайшую пачку)"""
+        return self._future(key).result(timeout)
+
+    def _future(self, key):
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None and cached[1] > time.monotonic():
+                self.cache_hits += 1
+                future = Future()
+                future.set_result(cached[0])
+                return future
+
+            # Этот ключ уже ждет отправки - присоединяемся
+            future = self._pending.get(key)
+            if future is not None:
+                self.joined += 1
+                return future
+
+            future = Future()
+            self._pending[key] = future
+            if len(self._pending) >= self.max_batch:
+                batch = self._take_batch()
+            else:
+                batch = None
+                if self._timer is None:
+                    self._timer = threading.Timer(self.window, self._dispatch_pending)
+                    self._timer.daemon = True
+                    self._timer.start()
+
+        if batch:
+            self._run(batch)
+        return future
+
+    def _take_batch(self):
+        """Забирает до max_batch ожидающих ключей (вызывать под блокировкой)"""
+        keys = list(self._pending)[:self.max_batch]
+        batch = {key: self._pending.pop(key) for key in keys}
+        if not self._pending and self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        return batch
+
+    def _dispatch_pending(self):
+        while True:
+            with self._lock:
+                self._timer = None
+                if not self._pending:
+                    return
+                batch = self._take_batch()
+            self._run(batch)
+
+    def _run(self, batch):
+        keys = list(batch)
+        try:
+            results = self.batch_fn(keys) or {}
+        except Exception as e:
+            logger.error(f"❌ Ошибка пакетного запроса ({len(keys)} ключей): {e}")
+            for future in batch.values():
+                future.set_exception(e)
+            return
+
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            self.batches += 1
+            self.keys_loaded += len(keys)
+            for key in keys:
+                self._cache[key] = (results.get(key), expires_at)
+            self._purge()
+
+        for key, future in batch.items():
+            future.set_result(results.get(key))
+
+    def _purge(self):
+        now = time.monotonic()
+        for key in [key for key, (_, expires_at) in self._cache.items() if expires_at <= now]:
+            del self._cache[key]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'batches': self.batches,
+                'keys_loaded': self.keys_loaded,
+                'avg_batch_size': round(self.keys_loaded / self.batches, 2) if self.batches else 0.0,
+                'joined_pending': self.joined,
+                'cache_hits': self.cache_hits,
+                'cached_keys': len(self._cache)
+            }
@@ -0,0 +1,350 @@
+# cache.py - Двухуровневый кэш ответов FACEIT API (память + SQLite)
+import re
+import json
+import time
+import threading
+import logging
+from collections import OrderedDict
+from config import Config
+from database import get_db, create_cache_table
+
+logger = logging.getLogger(__name__)
+
+
+# Классы endpoint'ов и их TTL (ключи Config.CACHE_TTL)
+ENDPOINT_CLASSES = [
+    ('games', re.compile(r'^/games')),
+    ('rankings', re.compile(r'^/rankings/')),
+    ('lifetime_stats', re.compile(r'^/players/[^/]+/stats/[^/]+$')),
+    ('history', re.compile(r'^/players/[^/]+/history$')),
+    ('player', re.compile(r'^/players/[^/]+$')),
+]
+
+
+def endpoint_class(endpoint):
+    """Класс endpoint'а для выбора TTL, None - не кэшируем"""
+    for name, pattern in ENDPOINT_CLASSES:
+        if pattern.match(endpoint):
+            return name
+    return None
+
+
+def endpoint_ttl(endpoint):
+    """TTL в секундах для endpoint'а, None - не кэшируем"""
+    name = endpoint_class(endpoint)
+    return Config.CACHE_TTL.get(name) if name else None
+
+
+class CacheEntry:
+    def __init__(self, value, size, expires_at, stored_at=None, etag=None, last_modified=None):
+        self.value = value
+        self.size = size
+        self.expires_at = expires_at
+        self.stored_at = stored_at or time.time()
+        self.etag = etag
+        self.last_modified = last_modified
+
+    @property
+    def fresh(self):
+        return time.time() < self.expires_at
+
+    @property
+    def validators(self):
+        """Заголовки условного запроса для перепроверки записи, {} - перепроверить нельзя"""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class TierStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.evictions = 0
+
+    def as_dict(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'stale_hits': self.stale_hits,
+            'evictions': self.evictions,
+            'hit_ratio': round(self.hits / total, 3) if total else 0.0
+        }
+
+
+class RevalidationStats:
+    """Сколько сэкономили ответы 304: байты тела и время разбора JSON"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.not_modified = 0
+        self.modified = 0
+        self.bytes_saved = 0
+        self._decoded_bytes = 0
+        self._decode_seconds = 0.0
+
+    def record_decode(self, size, seconds):
+        with self._lock:
+            self._decoded_bytes += size
+            self._decode_seconds += seconds
+
+    def record_revalidation(self, not_modified, size=0):
+        with self._lock:
+            if not_modified:
+                self.not_modified += 1
+                self.bytes_saved += size
+            else:
+                self.modified += 1
+
+    def as_dict(self):
+        with self._lock:
+            # Время разбора оцениваем по средней скорости разбора полученных ответов
+            per_byte = self._decode_seconds / self._decoded_bytes if self._decoded_bytes else 0.0
+            return {
+                'not_modified': self.not_modified,
+                'modified': self.modified,
+                'bytes_saved': self.bytes_saved,
+                'decode_ms_saved': round(self.bytes_saved * per_byte * 1000, 2)
+            }
+
+
+class LRUCache:
+    """L1: ограниченный по размеру (в байтах) LRU в памяти процесса"""
+
+    def __init__(self, max_bytes=None):
+        self.max_bytes = max_bytes or Config.CACHE_L1_MAX_BYTES
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats = TierStats()
+
+    def get(self, key, allow_stale=False):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (not entry.fresh and not allow_stale):
+                self.stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            if entry.fresh:
+                self.stats.hits += 1
+            else:
+                self.stats.stale_hits += 1
+            return entry
+
+    def set(self, key, entry):
+        if entry.size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.size
+            self._entries[key] = entry
+            self._bytes += entry.size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+                self.stats.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry.size
+
+    def info(self):
+        with self._lock:
+            info = {'entries': len(self._entries), 'bytes': self._bytes, 'max_bytes': self.max_bytes}
+        info.update(self.stats.as_dict())
+        return info
+
+
+class SQLiteCache:
+    """L2: кэш в SQLite (переживает перезапуск), вытесняем давно не читанное"""
+
+    def __init__(self, max_bytes=None):
+        self.max_bytes = max_bytes or Config.CACHE_L2_MAX_BYTES
+        self._lock = threading.Lock()
+        self.stats = TierStats()
+        # Отметки чтения, еще не записанные в accessed_at: ключ -> время
+        self._accessed = {}
+        self._flushed_at = time.monotonic()
+        create_cache_table()
+
+    def get(self, key, allow_stale=False):
+        conn = get_db()
+        try:
+            row = conn.execute(
+                'SELECT payload, size, expires_at, stored_at, etag, last_modified FROM api_cache WHERE key = ?',
+                (key,)
+            ).fetchone()
+        finally:
+            conn.close()
+
+        if row is None or (row['expires_at'] <= time.time() and not allow_stale):
+            with self._lock:
+                self.stats.misses += 1
+            return None
+
+        entry = CacheEntry(json.loads(row['payload']), row['size'], row['expires_at'], row['stored_at'],
+                           row['etag'], row['last_modified'])
+        with self._lock:
+            if entry.fresh:
+                self.stats.hits += 1
+            else:
+                self.stats.stale_hits += 1
+            self._accessed[key] = time.time()
+            if (len(self._accessed) >= Config.CACHE_L2_ACCESS_BATCH
+                    or time.monotonic() - self._flushed_at >= Config.CACHE_L2_ACCESS_FLUSH_INTERVAL):
+                try:
+                    self._flush_access_times()
+                except Exception as e:
+                    # Запись уже прочитана - потеря отметок влияет только на порядок вытеснения
+                    logger.error(f"❌ Ошибка записи времени чтения кэша: {e}")
+        return entry
+
+    def _flush_access_times(self, conn=None):
+        """Накопленные отметки чтения - одним executemany (вызывается под self._lock)"""
+        self._flushed_at = time.monotonic()
+        if not self._accessed:
+            return
+        pending = [(accessed_at, key) for key, accessed_at in self._accessed.items()]
+        self._accessed.clear()
+
+        if conn is not None:
+            conn.executemany('UPDATE api_cache SET accessed_at = ? WHERE key = ?', pending)
+            return
+
+        conn = get_db()
+        try:
+            conn.executemany('UPDATE api_cache SET accessed_at = ? WHERE key = ?', pending)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def set(self, key, entry, payload):
+        with self._lock:
+            conn = get_db()
+            try:
+                conn.execute('''
+                    INSERT OR REPLACE INTO api_cache
+                        (key, payload, size, expires_at, stored_at, accessed_at, etag, last_modified)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (key, payload, entry.size, entry.expires_at, entry.stored_at, time.time(),
+                      entry.etag, entry.last_modified))
+                # Перед вытеснением порядок по accessed_at должен быть актуальным
+                self._flush_access_times(conn)
+                self._evict(conn)
+                conn.commit()
+            finally:
+                conn.close()
+
+    def extend(self, key, entry):
+        """Данные не изменились (304) - только продлеваем срок жизни"""
+        conn = get_db()
+        try:
+            conn.execute('UPDATE api_cache SET expires_at = ?, stored_at = ?, accessed_at = ? WHERE key = ?',
+                         (entry.expires_at, entry.stored_at, time.time(), key))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def delete(self, key):
+        conn = get_db()
+        try:
+            conn.execute('DELETE FROM api_cache WHERE key = ?', (key,))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _evict(self, conn):
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM api_cache').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        # Сначала выкидываем протухшее, потом самое давно не читанное
+        rows = conn.execute('''
+            SELECT key, size FROM api_cache
+            ORDER BY (expires_at > ?) ASC, accessed_at ASC
+        ''', (time.time(),)).fetchall()
+        for row in rows:
+            if total <= self.max_bytes:
+                break
+            conn.execute('DELETE FROM api_cache WHERE key = ?', (row['key'],))
+            total -= row['size']
+            self.stats.evictions += 1
+
+    def info(self):
+        conn = get_db()
+        try:
+            row = conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM api_cache').fetchone()
+        finally:
+            conn.close()
+        info = {'entries': row[0], 'bytes': row[1], 'max_bytes': self.max_bytes}
+        with self._lock:
+            info.update(self.stats.as_dict())
+        return info
+
+
+class TieredCache:
+    """Сначала L1 в памяти, затем L2 в SQLite; попадание в L2 поднимается в L1"""
+
+    def __init__(self, l1=None, l2=None):
+        self.l1 = l1 or LRUCache()
+        self.l2 = l2 or SQLiteCache()
+        self.revalidation = RevalidationStats()
+
+    def get(self, key, allow_stale=False):
+        entry = self.l1.get(key, allow_stale)
+        if entry is not None:
+            return entry
+
+        try:
+            entry = self.l2.get(key, allow_stale)
+        except Exception as e:
+            logger.error(f"❌ Ошибка чтения кэша из БД: {e}")
+            return None
+
+        if entry is not None:
+            self.l1.set(key, entry)
+        return entry
+
+    def set(self, key, value, ttl, etag=None, last_modified=None):
+        payload = json.dumps(value, ensure_ascii=False)
+        entry = CacheEntry(value, len(payload.encode('utf-8')), time.time() + ttl,
+                           etag=etag, last_modified=last_modified)
+        self.l1.set(key, entry)
+        try:
+            self.l2.set(key, entry, payload)
+        except Exception as e:
+            logger.error(f"❌ Ошибка записи кэша в БД: {e}")
+        return entry
+
+    def extend(self, key, entry, ttl):
+        """Продлевает запись, подтвержденную ответом 304, еще на ttl секунд"""
+        extended = CacheEntry(entry.value, entry.size, time.time() + ttl,
+                              etag=entry.etag, last_modified=entry.last_modified)
+        self.l1.set(key, extended)
+        try:
+            self.l2.extend(key, extended)
+        except Exception as e:
+            logger.error(f"❌ Ошибка продления кэша в БД: {e}")
+        return extended
+
+    def delete(self, key):
+        self.l1.delete(key)
+        try:
+            self.l2.delete(key)
+        except Exception as e:
+            logger.error(f"❌ Ошибка удаления из кэша БД: {e}")
+
+    def stats(self):
+        try:
+            l2_info = self.l2.info()
+        except Exception as e:
+            l2_info = {'error': str(e)}
+        return {'l1_memory': self.l1.info(), 'l2_sqlite': l2_info, 'revalidation': self.revalidation.as_dict()}
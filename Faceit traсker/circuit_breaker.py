@@ -0,0 +1,136 @@
+# circuit_breaker.py - Предохранитель для запросов к FACEIT API
+import re
+import time
+import threading
+import logging
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class APIUnavailableError(Exception):
+    """API не дал ответа (сбой, таймаут, лимит) - это не то же самое, что «данных нет»"""
+
+
+class CircuitOpenError(APIUnavailableError):
+    """Предохранитель разомкнут - запрос в API не отправляем"""
+
+
+# Семейства endpoint'ов: у каждого свой предохранитель
+ENDPOINT_FAMILIES = [
+    ('matches', re.compile(r'^/matches/')),
+    ('history', re.compile(r'^/players/[^/]+/history')),
+    ('stats', re.compile(r'^/players/[^/]+/(stats|games)/')),
+    ('player', re.compile(r'^/players/[^/]+$')),
+    ('search', re.compile(r'^/(players|search/players)$')),
+    ('games', re.compile(r'^/games')),
+]
+
+
+def endpoint_family(endpoint):
+    for name, pattern in ENDPOINT_FAMILIES:
+        if pattern.match(endpoint):
+            return name
+    return 'other'
+
+
+class CircuitBreaker:
+    """closed -> (N ошибок подряд) -> open -> (пауза) -> half_open -> (пробный запрос) -> closed/open"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    # Пропуск allow() для замкнутого предохранителя; пробный запрос получает свой уникальный токен
+    PASS = 'pass'
+
+    def __init__(self, name, failure_threshold=None, recovery_timeout=None):
+        self.name = name
+        self.failure_threshold = failure_threshold or Config.CIRCUIT_FAILURE_THRESHOLD
+        self.recovery_timeout = recovery_timeout or Config.CIRCUIT_RECOVERY_TIMEOUT
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        # Токен текущего пробного запроса half_open, None - пробы нет
+        self._probe = None
+        self._lock = threading.Lock()
+
+        self.short_circuited = 0
+        self.times_opened = 0
+
+    def allow(self):
+        """Можно ли сейчас идти в API: токен пропуска (для release_probe) или None"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return self.PASS
+
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.recovery_timeout:
+                self.state = self.HALF_OPEN
+                self._probe = None
+                logger.info(f"🔌 Предохранитель '{self.name}': пробуем восстановить связь")
+
+            # В half_open пропускаем ровно один пробный запрос
+            if self.state == self.HALF_OPEN and self._probe is None:
+                self._probe = object()
+                return self._probe
+
+            self.short_circuited += 1
+            return None
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info(f"✅ Предохранитель '{self.name}': связь восстановлена")
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probe = None
+
+    def release_probe(self, token):
+        """Пробный запрос завершился без вердикта (не дождались лимитера, бюджета) - разрешаем следующий.
+
+        Снимает пробу, только если token - ее собственный: запрос, пропущенный при замкнутом
+        предохранителе, или чужая уже завершенная проба не освобождают текущую.
+        """
+        with self._lock:
+            if token is not None and token is self._probe:
+                self._probe = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.times_opened += 1
+                    logger.warning(f"⚠️ Предохранитель '{self.name}' разомкнут после {self.failures} ошибок")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self._probe = None
+
+    def stats(self):
+        with self._lock:
+            return {
+                'state': self.state,
+                'consecutive_failures': self.failures,
+                'times_opened': self.times_opened,
+                'short_circuited': self.short_circuited
+            }
+
+
+class CircuitBreakerRegistry:
+    """Предохранители по семействам endpoint'ов"""
+
+    def __init__(self):
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def for_endpoint(self, endpoint):
+        family = endpoint_family(endpoint)
+        with self._lock:
+            if family not in self._breakers:
+                self._breakers[family] = CircuitBreaker(family)
+            return self._breakers[family]
+
+    def stats(self):
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {name: breaker.stats() for name, breaker in breakers.items()}
@@ -26,6 +26,100 @@ class Config:
     # 'valorant' - Valorant
     FACEIT_GAME = 'cs2'
 
+    # HTTP пул соединений (общий для всех запросов к API)
+    HTTP_POOL_CONNECTIONS = int(os.environ.get('HTTP_POOL_CONNECTIONS', 10))  # сколько хостов держим в пуле
+    HTTP_POOL_MAXSIZE = int(os.environ.get('HTTP_POOL_MAXSIZE', 20))  # соединений на один хост
+    HTTP_POOL_BLOCK = os.environ.get('HTTP_POOL_BLOCK', '0') == '1'  # ждать свободное соединение вместо нового
+    HTTP_KEEP_ALIVE = os.environ.get('HTTP_KEEP_ALIVE', '1') == '1'
+
+    # Сколько деталей матчей грузим одновременно (1 = последовательно)
+    MATCH_FETCH_WORKERS = int(os.environ.get('MATCH_FETCH_WORKERS', 5))
+
+    # Лимит запросов к FACEIT API (уточняется по заголовкам X-RateLimit-*)
+    RATE_LIMIT_PER_SECOND = float(os.environ.get('RATE_LIMIT_PER_SECOND', 10))
+    RATE_LIMIT_BURST = int(os.environ.get('RATE_LIMIT_BURST', 10))
+    RATE_LIMIT_MIN_PER_SECOND = 0.5  # ниже не опускаемся, даже если бюджет почти исчерпан
+
+    # Кэш ответов API: TTL (сек) по классам endpoint'ов
+    CACHE_TTL = {
+        'player': 300,  # /players/{id}
+        'lifetime_stats': 600,  # /players/{id}/stats/{game}
+        'history': 120,  # /players/{id}/history
+        'rankings': 900,  # /rankings/...
+        'games': 86400,  # /games
+    }
+    CACHE_L1_MAX_BYTES = int(os.environ.get('CACHE_L1_MAX_BYTES', 8 * 1024 * 1024))  # память
+    CACHE_L2_MAX_BYTES = int(os.environ.get('CACHE_L2_MAX_BYTES', 64 * 1024 * 1024))  # SQLite
+    # Время чтения записей L2 (для вытеснения) пишем пачкой: по числу отметок или раз в N секунд
+    CACHE_L2_ACCESS_BATCH = int(os.environ.get('CACHE_L2_ACCESS_BATCH', 100))
+    CACHE_L2_ACCESS_FLUSH_INTERVAL = float(os.environ.get('CACHE_L2_ACCESS_FLUSH_INTERVAL', 30))
+
+    # TTL данных игрока по активности: ACTIVITY_TTL_FACTOR * max(интервал между матчами, время с последнего матча),
+    # в пределах [ACTIVITY_TTL_MIN, ACTIVITY_TTL_MAX] секунд. Игрокам, игравшим за последние
+    # ACTIVITY_ACTIVE_WINDOW секунд, TTL не больше TTL класса endpoint'а (Config.CACHE_TTL)
+    ACTIVITY_TTL_FACTOR = float(os.environ.get('ACTIVITY_TTL_FACTOR', 0.25))
+    ACTIVITY_TTL_MIN = int(os.environ.get('ACTIVITY_TTL_MIN', 60))
+    ACTIVITY_TTL_MAX = int(os.environ.get('ACTIVITY_TTL_MAX', 3 * 86400))
+    ACTIVITY_ACTIVE_WINDOW = int(os.environ.get('ACTIVITY_ACTIVE_WINDOW', 86400))
+    ACTIVITY_MAX_PLAYERS = int(os.environ.get('ACTIVITY_MAX_PLAYERS', 10000))
+
+    # Предохранитель: сколько таймаутов/5xx подряд размыкают цепь и через сколько секунд пробуем снова
+    CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get('CIRCUIT_FAILURE_THRESHOLD', 3))
+    CIRCUIT_RECOVERY_TIMEOUT = float(os.environ.get('CIRCUIT_RECOVERY_TIMEOUT', 30))
+
+    # Бюджет времени на страницу профиля (мс); секции, не успевшие за него, показываются как "загрузка"
+    PAGE_BUDGET_MS = int(os.environ.get('PAGE_BUDGET_MS', 800))
+    PROFILE_WORKERS = int(os.environ.get('PROFILE_WORKERS', 16))
+
+    # Поиск игрока: 'serial' - стратегии по очереди, 'race' - не больше SEARCH_RACE_CONCURRENCY сразу,
+    # 'hedge' - следующая стартует, если предыдущая молчит дольше своей медианы (p50) задержки
+    SEARCH_MODE = os.environ.get('SEARCH_MODE', 'hedge')
+    SEARCH_RACE_CONCURRENCY = int(os.environ.get('SEARCH_RACE_CONCURRENCY', 2))
+    # Задержка хеджа, пока у стратегии меньше SEARCH_HEDGE_MIN_SAMPLES замеров
+    SEARCH_HEDGE_DELAY = float(os.environ.get('SEARCH_HEDGE_DELAY', 0.3))
+    SEARCH_HEDGE_MIN_SAMPLES = int(os.environ.get('SEARCH_HEDGE_MIN_SAMPLES', 20))
+    SEARCH_WORKERS = int(os.environ.get('SEARCH_WORKERS', 8))
+
+    # Ненайденные ники: сколько секунд помним неудачу и сколько ников храним
+    NEGATIVE_CACHE_TTL = int(os.environ.get('NEGATIVE_CACHE_TTL', 600))
+    NEGATIVE_CACHE_MAX_ENTRIES = int(os.environ.get('NEGATIVE_CACHE_MAX_ENTRIES', 10000))
+
+    # Сколько секунд ждем перехода с /search на профиль, загрузка которого уже запущена
+    PREFETCH_TTL = int(os.environ.get('PREFETCH_TTL', 30))
+
+    # Страница профиля (stale-while-revalidate): моложе SWR_SOFT_TTL секунд - отдаем как есть,
+    # до SWR_HARD_TTL - отдаем сразу и обновляем в фоне, старше - грузим заново
+    SWR_SOFT_TTL = int(os.environ.get('SWR_SOFT_TTL', 60))
+    SWR_HARD_TTL = int(os.environ.get('SWR_HARD_TTL', 900))
+    SWR_MAX_ENTRIES = int(os.environ.get('SWR_MAX_ENTRIES', 1000))
+    SWR_REFRESH_WORKERS = int(os.environ.get('SWR_REFRESH_WORKERS', 4))
+
+    # Допуск в кэш профилей по популярности (TinyLFU) и прогрев самых популярных игроков
+    POPULARITY_SKETCH_WIDTH = int(os.environ.get('POPULARITY_SKETCH_WIDTH', 4096))
+    HOT_PLAYERS_TOP_N = int(os.environ.get('HOT_PLAYERS_TOP_N', 10))
+    HOT_WARM_INTERVAL = int(os.environ.get('HOT_WARM_INTERVAL', 15))  # секунды между проходами
+    HOT_WARM_AHEAD = float(os.environ.get('HOT_WARM_AHEAD', 0.8))  # обновляем, когда прошло 80% SWR_SOFT_TTL
+    HOT_WARMER_ENABLED = os.environ.get('HOT_WARMER_ENABLED', '1') == '1'
+
+    # Steam GetPlayerSummaries: запросы за STEAM_BATCH_WINDOW_MS склеиваются в один (до 100 id),
+    # ответ по каждому steamid кэшируется на STEAM_SUMMARY_TTL секунд (онлайн-статус должен быть свежим)
+    STEAM_BATCH_WINDOW_MS = int(os.environ.get('STEAM_BATCH_WINDOW_MS', 20))
+    STEAM_BATCH_MAX = 100
+    STEAM_SUMMARY_TTL = int(os.environ.get('STEAM_SUMMARY_TTL', 60))
+
+    # Синхронизация истории матчей в таблицу matches: размер страницы (максимум API - 100),
+    # сколько матчей берем при первой синхронизации и сколько страниц максимум за одну
+    MATCH_SYNC_PAGE_SIZE = int(os.environ.get('MATCH_SYNC_PAGE_SIZE', 100))
+    MATCH_SYNC_INITIAL_MATCHES = int(os.environ.get('MATCH_SYNC_INITIAL_MATCHES', 100))
+    MATCH_SYNC_MAX_PAGES = int(os.environ.get('MATCH_SYNC_MAX_PAGES', 10))
+    # Для скольких самых свежих новых матчей за синхронизацию грузим детали (kills, deaths... в player_stats)
+    MATCH_SYNC_DETAILS = int(os.environ.get('MATCH_SYNC_DETAILS', 20))
+
+    # Форма игрока (match_columns.form_stats): окна последних N матчей и длина скользящего окна
+    FORM_WINDOWS = (5, 10, 20, 50, 100)
+    FORM_ROLLING_WINDOW = int(os.environ.get('FORM_ROLLING_WINDOW', 10))
+    PAGE_PREFETCH_WORKERS = int(os.environ.get('PAGE_PREFETCH_WORKERS', 4))  # FaceitAPI.iter_matches
+
     @classmethod
     def print_info(cls):
         print("\n" + "=" * 60)
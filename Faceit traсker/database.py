@@ -18,6 +18,88 @@ def get_db():
     return conn
 
 
+MATCHES_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS matches (
+        match_id TEXT NOT NULL,
+        player_id TEXT NOT NULL,
+        result TEXT,
+        kills INTEGER,
+        deaths INTEGER,
+        kd_ratio REAL,
+        hs_percent REAL,
+        map_name TEXT,
+        date TIMESTAMP,
+        finished_at INTEGER,
+        elo_delta INTEGER,
+        game TEXT,
+        synced_at REAL,
+        assists INTEGER,
+        headshots INTEGER,
+        mvps INTEGER,
+        triple_kills INTEGER,
+        quadro_kills INTEGER,
+        penta_kills INTEGER,
+        PRIMARY KEY (match_id, player_id),
+        FOREIGN KEY (player_id) REFERENCES players (player_id)
+    )
+    '''
+
+# Статистика игрока в матче, добавленная к таблице matches позже
+MATCH_STAT_COLUMNS = ('assists', 'headshots', 'mvps', 'triple_kills', 'quadro_kills', 'penta_kills')
+
+# Накопительные агрегаты player_stats, добавленные позже (обновляются на каждый новый матч)
+PLAYER_STATS_COLUMNS = {
+    'detailed_matches': 'INTEGER NOT NULL DEFAULT 0',
+    'total_kills': 'INTEGER NOT NULL DEFAULT 0',
+    'total_deaths': 'INTEGER NOT NULL DEFAULT 0',
+    'total_assists': 'INTEGER NOT NULL DEFAULT 0',
+    'total_headshots': 'INTEGER NOT NULL DEFAULT 0',
+    'mvps': 'INTEGER NOT NULL DEFAULT 0',
+    'triple_kills': 'INTEGER NOT NULL DEFAULT 0',
+    'quadro_kills': 'INTEGER NOT NULL DEFAULT 0',
+    'penta_kills': 'INTEGER NOT NULL DEFAULT 0',
+    'current_streak': 'INTEGER NOT NULL DEFAULT 0',
+    'longest_win_streak': 'INTEGER NOT NULL DEFAULT 0',
+    'longest_lose_streak': 'INTEGER NOT NULL DEFAULT 0',
+    'full_history': 'INTEGER NOT NULL DEFAULT 0',
+    'last_match_id': 'TEXT',
+    'last_finished_at': 'INTEGER',
+    'updated_at': 'REAL',
+}
+
+
+def migrate_matches_table(conn):
+    """Старая таблица matches (ключ только match_id) -> новая с ключом (match_id, player_id)"""
+    columns = {row[1] for row in conn.execute('PRAGMA table_info(matches)')}
+    if not columns or 'finished_at' in columns:
+        return
+
+    conn.execute('ALTER TABLE matches RENAME TO matches_old')
+    conn.execute(MATCHES_TABLE_SQL)
+    conn.execute('''
+        INSERT OR IGNORE INTO matches (match_id, player_id, result, kills, deaths, kd_ratio, hs_percent, map_name, date)
+        SELECT match_id, player_id, result, kills, deaths, kd_ratio, hs_percent, map_name, date
+        FROM matches_old WHERE player_id IS NOT NULL
+    ''')
+    conn.execute('DROP TABLE matches_old')
+    conn.commit()
+
+
+def create_matches_table():
+    """Таблица матчей: один матч - строка на каждого игрока, историю которого синхронизировали"""
+    conn = get_db()
+    migrate_matches_table(conn)
+    conn.execute(MATCHES_TABLE_SQL)
+    # Статистика игрока в матче (таблица могла быть создана без нее)
+    columns = {row[1] for row in conn.execute('PRAGMA table_info(matches)')}
+    for column in MATCH_STAT_COLUMNS:
+        if column not in columns:
+            conn.execute(f'ALTER TABLE matches ADD COLUMN {column} INTEGER')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_matches_player_finished ON matches (player_id, finished_at)')
+    conn.commit()
+    conn.close()
+
+
 def create_tables():
     """Создание таблиц"""
     conn = get_db()
@@ -38,24 +120,20 @@ def create_tables():
     )
     ''')
 
-    # Таблица матчей
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS matches (
-        match_id TEXT PRIMARY KEY,
-        player_id TEXT,
-        result TEXT,
-        kills INTEGER,
-        deaths INTEGER,
-        kd_ratio REAL,
-        hs_percent REAL,
-        map_name TEXT,
-        date TIMESTAMP,
-        FOREIGN KEY (player_id) REFERENCES players (player_id)
-    )
-    ''')
+    conn.commit()
+    conn.close()
 
-    # Таблица статистики
-    cursor.execute('''
+    create_player_stats_table()
+    create_matches_table()
+    create_cache_table()
+    create_match_store_table()
+    create_identity_tables()
+
+
+def create_player_stats_table():
+    """Таблица статистики: одна строка накопительных агрегатов на игрока"""
+    conn = get_db()
+    conn.execute('''
     CREATE TABLE IF NOT EXISTS player_stats (
         player_id TEXT PRIMARY KEY,
         total_matches INTEGER,
@@ -69,6 +147,98 @@ def create_tables():
         FOREIGN KEY (player_id) REFERENCES players (player_id)
     )
     ''')
+    columns = {row[1] for row in conn.execute('PRAGMA table_info(player_stats)')}
+    for column, definition in PLAYER_STATS_COLUMNS.items():
+        if column not in columns:
+            conn.execute(f'ALTER TABLE player_stats ADD COLUMN {column} {definition}')
+    conn.commit()
+    conn.close()
+
+
+def create_cache_table():
+    """Таблица кэша ответов API (второй уровень кэша)"""
+    conn = get_db()
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS api_cache (
+        key TEXT PRIMARY KEY,
+        payload TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        expires_at REAL NOT NULL,
+        stored_at REAL NOT NULL,
+        accessed_at REAL NOT NULL,
+        etag TEXT,
+        last_modified TEXT
+    )
+    ''')
+    # Валидаторы для условных запросов (таблица могла быть создана без них)
+    columns = {row[1] for row in conn.execute('PRAGMA table_info(api_cache)')}
+    for column in ('etag', 'last_modified'):
+        if column not in columns:
+            conn.execute(f'ALTER TABLE api_cache ADD COLUMN {column} TEXT')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_api_cache_accessed ON api_cache (accessed_at)')
+    conn.commit()
+    conn.close()
+
+
+def create_match_store_table():
+    """Таблица деталей завершенных матчей (payload /matches/{id} как есть)"""
+    conn = get_db()
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS match_details (
+        match_id TEXT PRIMARY KEY,
+        payload TEXT NOT NULL,
+        finished_at INTEGER,
+        stored_at REAL NOT NULL
+    )
+    ''')
+    conn.commit()
+    conn.close()
+
+
+def create_identity_tables():
+    """Граф идентичностей: faceit player_id <-> ники (с историей) <-> steam_id_64 <-> vanity имя Steam"""
+    conn = get_db()
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS identity_players (
+        player_id TEXT PRIMARY KEY,
+        nickname TEXT,
+        steam_id_64 TEXT,
+        updated_at REAL NOT NULL
+    )
+    ''')
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS identity_nicknames (
+        nickname_lower TEXT NOT NULL,
+        player_id TEXT NOT NULL,
+        nickname TEXT NOT NULL,
+        first_seen REAL NOT NULL,
+        last_seen REAL NOT NULL,
+        PRIMARY KEY (nickname_lower, player_id)
+    )
+    ''')
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS identity_vanity (
+        vanity_lower TEXT PRIMARY KEY,
+        steam_id_64 TEXT NOT NULL,
+        updated_at REAL NOT NULL
+    )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_identity_players_steam ON identity_players (steam_id_64)')
+    conn.commit()
+    conn.close()
+
 
+def create_backfill_table():
+    """Чекпоинты загрузки полной истории: докуда (по finished_at) уже дошли для каждого игрока"""
+    conn = get_db()
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS backfill_checkpoints (
+        player_id TEXT PRIMARY KEY,
+        oldest_finished_at INTEGER,
+        matches INTEGER NOT NULL DEFAULT 0,
+        done INTEGER NOT NULL DEFAULT 0,
+        updated_at REAL NOT NULL
+    )
+    ''')
     conn.commit()
     conn.close()
\ No newline at end of file
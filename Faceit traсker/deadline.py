@@ -0,0 +1,46 @@
+# deadline.py - Бюджет времени на обработку запроса (передается во все вызовы FaceitAPI)
+import time
+import contextvars
+from contextlib import contextmanager
+
+_current_deadline = contextvars.ContextVar('faceit_deadline', default=None)
+
+
+class Deadline:
+    """Момент, к которому ответ должен быть готов"""
+
+    def __init__(self, budget_ms):
+        self.budget_ms = budget_ms
+        self.started_at = time.monotonic()
+        self.expires_at = self.started_at + budget_ms / 1000.0
+
+    def remaining(self):
+        """Сколько секунд осталось (не меньше 0)"""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self):
+        return time.monotonic() >= self.expires_at
+
+    def elapsed_ms(self):
+        return int((time.monotonic() - self.started_at) * 1000)
+
+    def timeout(self, default):
+        """Таймаут запроса: не больше default и не больше остатка бюджета"""
+        return max(0.001, min(default, self.remaining()))
+
+
+def current_deadline():
+    """Дедлайн текущего запроса, None - ограничения нет"""
+    return _current_deadline.get()
+
+
+@contextmanager
+def request_deadline(budget_ms):
+    """Устанавливает дедлайн для всего, что вызывается внутри блока"""
+    deadline = Deadline(budget_ms)
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
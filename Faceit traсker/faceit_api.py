@@ -1,38 +1,38 @@
-# faceit_api.py - ПОЛНОСТЬЮ ИСПРАВЛЕННАЯ ВЕРСИЯ
-import requests
-import time
-import logging
-from datetime import datetime
-from config import Config
-
-# Настройка логирования
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
-
-
-class FaceitAPI:
-    def __init__(self):
-        self.api_key = Config.FACEIT_API_KEY
-        self.base_url = Config.FACEIT_API_URL
-        self.game = Config.FACEIT_GAME
-
-        if not self.api_key:
-            logger.warning("⚠️ API ключ не настроен. Используем демо-режим.")
-            self.valid_key = False
-        else:
-            self.valid_key = True# faceit_api.py - ИСПРАВЛЕННАЯ ВЕРСИЯ С ПОИСКОМ ИГРОКОВ
+# faceit_api.py - ИСПРАВЛЕННАЯ ВЕРСИЯ С ПОИСКОМ ИГРОКОВ
 import requests
 import time
 import logging
+import threading
+import contextvars
+import statistics
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime, timedelta
 from config import Config
+from http_client import get_http_client
+from rate_limiter import get_rate_limiter
+from singleflight import SingleFlight, request_key
+from cache import TieredCache, endpoint_class
+from activity import ActivityTracker, endpoint_player_id
+from match_store import MatchStore
+from match_history import MatchHistory, normalize_history_item
+from match_columns import form_stats
+from player_aggregates import PlayerAggregates, with_match_stats
+from circuit_breaker import CircuitBreakerRegistry, CircuitOpenError, APIUnavailableError
+from deadline import current_deadline
+from identity_store import get_identity_store, confirm_owner
+from request_memo import current_memo, note_api_failure
+from faceit_common import FaceitCommon
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Ответ 304: закэшированные данные не изменились
+NOT_MODIFIED = object()
+
 
-class FaceitAPI:
+class FaceitAPI(FaceitCommon):
     def __init__(self):
         self.api_key = Config.FACEIT_API_KEY
         self.base_url = Config.FACEIT_API_URL
@@ -50,890 +50,398 @@ class FaceitAPI:
             }
             logger.info(f"✅ API настроен для игры: {self.game}")
 
-    def _smart_request(self, endpoint, params=None, max_retries=3):
-        """Умный запрос с обработкой ошибок и повторными попытками"""
-        url = f"{self.base_url}{endpoint}"
-
-        for attempt in range(max_retries):
-            try:
-                logger.debug(f"Запрос: {url}, Параметры: {params}")
-
-                response = requests.get(
-                    url,
-                    headers=self.headers,
-                    params=params,
-                    timeout=15
-                )
-
-                if response.status_code == 200:
-                    return response.json()
-                elif response.status_code == 401:
-                    logger.error("❌ Неверный API ключ!")
-                    return None
-                elif response.status_code == 404:
-                    logger.warning(f"⚠️ Ресурс не найден: {endpoint}")
-                    return None
-                elif response.status_code == 429:
-                    wait_time = min(60, 2 ** attempt)
-                    logger.warning(f"⚠️ Лимит запросов. Ждем {wait_time} секунд...")
-                    time.sleep(wait_time)
-                    continue
-                else:
-                    logger.error(f"❌ HTTP {response.status_code}: {response.text[:200]}")
-                    return None
-
-            except requests.exceptions.Timeout:
-                logger.warning(f"⚠️ Таймаут запроса (попытка {attempt + 1}/{max_retries})")
-                time.sleep(2)
-                continue
-            except requests.exceptions.RequestException as e:
-                logger.error(f"❌ Ошибка сети: {e}")
-                if attempt == max_retries - 1:
-                    return None
-                time.sleep(1)
-                continue
-
-        return None
-
-    def find_player(self, nickname):
-        """ГЛАВНЫЙ МЕТОД: Находит игрока любым способом - ИСПРАВЛЕННЫЙ"""
-        logger.info(f"🔍 Поиск игрока: '{nickname}'")
-
-        # Очищаем никнейм от URL если нужно
-        clean_nickname = self._extract_nickname_from_input(nickname)
-        logger.info(f"🔍 Очищенный никнейм: '{clean_nickname}'")
-
-        # Попробуем несколько методов поиска
-        methods = [
-            self._search_by_nickname_direct,
-            self._search_by_nickname_fallback,
-            self._search_by_nickname_basic
-        ]
-
-        for method in methods:
-            try:
-                player = method(clean_nickname)
-                if player:
-                    logger.info(f"✅ Игрок найден через {method.__name__}: {player.get('nickname')}")
-                    return player
-            except Exception as e:
-                logger.warning(f"⚠️ Метод {method.__name__} не сработал: {e}")
-                continue
-
-        # Если ничего не сработало, пробуем демо-режим
-        logger.warning("⚠️ Все методы поиска не сработали, пробуем демо-режим")
-        return self._demo_find_player(clean_nickname)
-
-    def _extract_nickname_from_input(self, input_text):
-        """Извлекает никнейм из ввода пользователя"""
-        # Если это URL
-        if 'faceit.com' in input_text.lower():
-            # Извлекаем ник из URL
-            parts = input_text.split('/')
-            for i, part in enumerate(parts):
-                if 'players' in part.lower() and i + 1 < len(parts):
-                    return parts[i + 1].strip()
-            return input_text
-
-        # Если это просто ник
-        return input_text.strip()
-
-    def _search_by_nickname_direct(self, nickname):
-        """Прямой поиск по никнейму - основной метод"""
-        logger.info(f"🔍 Прямой поиск: '{nickname}'")
-
-        endpoint = "/players"
-        params = {
-            'nickname': nickname,
-            'limit': 10
-        }
-
-        data = self._smart_request(endpoint, params)
-
-        if data and 'items' in data and data['items']:
-            # Ищем точное совпадение
-            for player in data['items']:
-                if player.get('nickname', '').lower() == nickname.lower():
-                    logger.info(f"✅ Точное совпадение найдено: {player['nickname']}")
-                    return self._enrich_player_data(player)
-
-            # Если точного нет, берем первого
-            logger.info(f"✅ Ближайшее совпадение: {data['items'][0]['nickname']}")
-            return self._enrich_player_data(data['items'][0])
-
-        return None
-
-    def _search_by_nickname_fallback(self, nickname):
-        """Альтернативный метод поиска"""
-        logger.info(f"🔍 Альтернативный поиск: '{nickname}'")
-
-        endpoint = "/search/players"
-        params = {
-            'nickname': nickname,
-            'game': self.game,
-            'limit': 5
-        }
-
-        data = self._smart_request(endpoint, params)
-
-        if data and 'items' in data and data['items']:
-            player = data['items'][0]
-            logger.info(f"✅ Найден через альтернативный поиск: {player['nickname']}")
-            return self._enrich_player_data(player)
-
-        return None
-
-    def _search_by_nickname_basic(self, nickname):
-        """Базовый поиск без указания игры"""
-        logger.info(f"🔍 Базовый поиск: '{nickname}'")
-
-        endpoint = "/players"
-        params = {
-            'nickname': nickname
-        }
-
-        data = self._smart_request(endpoint, params)
-
-        if data and 'items' in data and data['items']:
-            player = data['items'][0]
-            logger.info(f"✅ Найден через базовый поиск: {player['nickname']}")
-            return self._enrich_player_data(player)
-
-        return None
-
-    def _demo_find_player(self, nickname):
-        """Демо-режим поиска игрока"""
-        logger.info(f"🎮 Демо-режим поиска: '{nickname}'")
-
-        # Демо-игроки
-        demo_players = {
-            'donk666': {
-                'player_id': 'e5e8e2a6-d716-4493-b949-e16965f41654',
-                'nickname': 'donk666',
-                'country': 'RU',
-                'avatar': '',
-                'skill_level': 10,
-                'faceit_elo': 4387,
-                'game': 'cs2',
-                'membership': 'free',
-                'verified': True,
-                'steam_id_64': '76561198123456789',
-                'faceit_url': 'https://www.faceit.com/players/donk666'
-            },
-            's1mple': {
-                'player_id': '09045993-d578-475c-b4e0-e107ce787606',
-                'nickname': 's1mple',
-                'country': 'UA',
-                'avatar': '',
-                'skill_level': 10,
-                'faceit_elo': 2100,
-                'game': 'cs2',
-                'membership': 'free',
-                'verified': True,
-                'steam_id_64': '76561198012345678',
-                'faceit_url': 'https://www.faceit.com/players/s1mple'
-            },
-            'daniil': {
-                'player_id': '7c389101-3bd4-416d-a06d-a7b21398b220',
-                'nickname': 'Daniil Finch',
-                'country': 'RU',
-                'avatar': '',
-                'skill_level': 7,
-                'faceit_elo': 1437,
-                'game': 'cs2',
-                'membership': 'free',
-                'verified': False,
-                'steam_id_64': '76561198111223344',
-                'faceit_url': 'https://www.faceit.com/players/DaniilFinch'
-            },
-            'niko': {
-                'player_id': '12345678-9012-3456-7890-123456789012',
-                'nickname': 'NiKo',
-                'country': 'BA',
-                'avatar': '',
-                'skill_level': 10,
-                'faceit_elo': 2500,
-                'game': 'cs2',
-                'membership': 'free',
-                'verified': True,
-                'steam_id_64': '76561198112233445',
-                'faceit_url': 'https://www.faceit.com/players/NiKo'
-            },
-            'zywoo': {
-                'player_id': '23456789-0123-4567-8901-234567890123',
-                'nickname': 'ZywOo',
-                'country': 'FR',
-                'avatar': '',
-                'skill_level': 10,
-                'faceit_elo': 2800,
-                'game': 'cs2',
-                'membership': 'free',
-                'verified': True,
-                'steam_id_64': '76561198123344556',
-                'faceit_url': 'https://www.faceit.com/players/ZywOo'
-            }
-        }
-
-        # Проверяем точное совпадение
-        if nickname.lower() in demo_players:
-            logger.info(f"✅ Демо-игрок найден: {nickname}")
-            return demo_players[nickname.lower()]
-
-        # Проверяем частичное совпадение
-        for key, player in demo_players.items():
-            if key.lower() in nickname.lower() or nickname.lower() in key.lower():
-                logger.info(f"✅ Частичное совпадение: {player['nickname']}")
-                return player
-
-        # Если ничего не найдено, возвращаем первого демо-игрока
-        logger.info(f"⚠️ Демо-игрок не найден, возвращаем donk666")
-        return demo_players['donk666']
-
-    def _enrich_player_data(self, player_data):
-        """Обогащает данные игрока дополнительной информацией"""
-        try:
-            player_id = player_data.get('player_id')
-
-            if not player_id:
-                logger.error("❌ Нет player_id в данных")
-                return None
-
-            logger.info(f"📋 Обогащение данных для: {player_data.get('nickname', 'Unknown')}")
-
-            # Получаем полные данные по ID
-            full_data = self.get_player_by_id(player_id)
-
-            if full_data:
-                logger.info(f"✅ Данные обогащены для: {full_data['nickname']}")
-                return full_data
-            else:
-                # Если не удалось получить полные данные, используем базовые
-                logger.warning(f"⚠️ Не удалось получить полные данные, используем базовые")
-                return {
-                    'player_id': player_id,
-                    'nickname': player_data.get('nickname', 'Unknown'),
-                    'country': player_data.get('country', ''),
-                    'avatar': player_data.get('avatar', ''),
-                    'skill_level': player_data.get('games', {}).get('cs2', {}).get('skill_level', 1),
-                    'faceit_elo': player_data.get('games', {}).get('cs2', {}).get('faceit_elo', 1000),
-                    'game': self.game,
-                    'membership': player_data.get('membership', 'free'),
-                    'verified': player_data.get('verified', False),
-                    'steam_id_64': player_data.get('steam_id_64', ''),
-                    'faceit_url': f"https://www.faceit.com/players/{player_data.get('nickname', '')}",
-                    'raw_data': player_data
-                }
-
-        except Exception as e:
-            logger.error(f"❌ Ошибка обогащения данных: {e}")
-            return None
-
-    def get_player_by_id(self, player_id):
-        """Получение полной информации по ID"""
-        logger.info(f"📋 Получение данных игрока по ID: {player_id}")
-
-        # Если это демо-игрок, возвращаем демо-данные
-        demo_ids = {
-            'e5e8e2a6-d716-4493-b949-e16965f41654': 'donk666',
-            '09045993-d578-475c-b4e0-e107ce787606': 's1mple',
-            '7c389101-3bd4-416d-a06d-a7b21398b220': 'Daniil Finch',
-            '12345678-9012-3456-7890-123456789012': 'NiKo',
-            '23456789-0123-4567-8901-234567890123': 'ZywOo'
-        }
-
-        if player_id in demo_ids:
-            logger.info(f"🎮 Демо-данные для: {demo_ids[player_id]}")
-            return self._demo_find_player(demo_ids[player_id])
-
-        endpoint = f"/players/{player_id}"
-        data = self._smart_request(endpoint)
-
-        if not data:
-            logger.warning(f"⚠️ Не удалось получить данные по ID: {player_id}")
-            return None
-
-        games = data.get('games', {})
-        cs2_data = games.get('cs2') or games.get('csgo')
-
-        result = {
-            'player_id': data.get('player_id'),
-            'nickname': data.get('nickname', 'Unknown'),
-            'country': data.get('country', 'Unknown'),
-            'avatar': data.get('avatar', ''),
-            'steam_id_64': data.get('steam_id_64', ''),
-            'membership': data.get('membership', 'free'),
-            'verified': data.get('verified', False),
-            'faceit_url': f"https://www.faceit.com/players/{data.get('nickname', '')}",
-            'raw_data': data
-        }
-
-        if cs2_data:
-            result['faceit_elo'] = cs2_data.get('faceit_elo', 0)
-            result['skill_level'] = cs2_data.get('skill_level', 0)
-            result['game'] = 'cs2'
-            logger.info(f"✅ Установлен ELO: {result['faceit_elo']}, Уровень: {result['skill_level']}")
-        else:
-            result['faceit_elo'] = 0
-            result['skill_level'] = 0
-            result['game'] = self.game
-            logger.warning("⚠️ Не найдены данные CS2")
-
-        return result
-
-    def get_player_stats_detailed(self, player_id):
-        """Получает детальную статистику игрока за последние 20 матчей"""
-        logger.info(f"📈 Получение статистики за последние 20 матчей для: {player_id}")
-
-        # Получаем последние 20 матчей
-        recent_matches = self.get_recent_matches_detailed(player_id, limit=20)
-
-        if not recent_matches or len(recent_matches) == 0:
-            logger.warning("⚠️ Нет данных о последних матчах")
-            return self._get_realistic_stats_last_20(player_id)
-
-        # Считаем статистику по последним 20 матчам
-        stats = self._calculate_stats_from_matches(recent_matches)
-
-        logger.info(f"✅ Статистика за последние {len(recent_matches)} матчей: "
-                   f"Winrate={stats['winrate']}%, K/D={stats['kd_ratio']}")
-
-        return stats
-
-    def get_recent_matches_detailed(self, player_id, limit=20):
-        """Получает детальную информацию о последних матчах"""
-        logger.info(f"🎮 Получение деталей последних {limit} матчей для: {player_id}")
-
-        # Для демо-игроков возвращаем демо-матчи
-        if player_id in ['e5e8e2a6-d716-4493-b949-e16965f41654',
-                        '09045993-d578-475c-b4e0-e107ce787606',
-                        '7c389101-3bd4-416d-a06d-a7b21398b220']:
-            return self._get_realistic_matches_detailed(player_id, limit)
-
-        try:
-            endpoint = f"/players/{player_id}/history"
-            params = {
-                'game': self.game,
-                'limit': limit,
-                'offset': 0
-            }
-
-            data = self._smart_request(endpoint, params)
-
-            if not data or 'items' not in data or not data['items']:
-                logger.warning("⚠️ API не вернул данные матчей")
-                return self._get_realistic_matches_detailed(player_id, limit)
-
-            matches = []
-            for match_item in data['items']:
-                match_detail = self._get_match_details_for_stats(match_item, player_id)
-                if match_detail:
-                    matches.append(match_detail)
-
-            logger.info(f"✅ Получено {len(matches)} детализированных матчей")
-            return matches[:limit]
-
-        except Exception as e:
-            logger.error(f"❌ Ошибка при получении деталей матчей: {e}")
-            return self._get_realistic_matches_detailed(player_id, limit)
-
-    def _get_match_details_for_stats(self, match_item, player_id):
-        """Получает детали матча для статистики"""
-        try:
-            match_id = match_item.get('match_id')
-            if not match_id:
-                return None
-
-            # Получаем детали матча
-            endpoint = f"/matches/{match_id}"
-            match_data = self._smart_request(endpoint)
-
-            if not match_data:
-                return None
-
-            # Ищем игрока в матче и собираем статистику
-            for team_key in ['teams', 'faction1', 'faction2']:
-                if team_key in match_data:
-                    team = match_data.get(team_key, {}) if team_key == 'teams' else match_data.get(team_key, {})
-
-                    # Проверяем разные структуры данных
-                    roster = team.get('roster', []) or team.get('players', [])
-
-                    for player in roster:
-                        if player.get('player_id') == player_id or player.get('nickname', '').lower() == player_id.lower():
-                            # Определяем результат
-                            result = 'win' if team.get('winner') else 'loss'
-
-                            # Получаем статистику
-                            stats = player.get('player_stats', {}) or player.get('stats', {})
-
-                            kills = stats.get('kills', 0) or stats.get('Kills', 0)
-                            deaths = stats.get('deaths', 0) or stats.get('Deaths', 0)
-                            assists = stats.get('assists', 0) or stats.get('Assists', 0)
-                            headshots = stats.get('headshots', 0) or stats.get('Headshots', 0)
-
-                            # Рассчитываем проценты
-                            hs_percent = 0
-                            if kills > 0:
-                                hs_percent = round((headshots / kills) * 100, 1)
-
-                            kd_ratio = round(kills / deaths, 2) if deaths > 0 else kills
-
-                            return {
-                                'match_id': match_id,
-                                'result': result,
-                                'kills': kills,
-                                'deaths': deaths,
-                                'assists': assists,
-                                'headshots': headshots,
-                                'hs_percent': hs_percent,
-                                'kd_ratio': kd_ratio,
-                                'elo_delta': match_item.get('elo_delta', 0),
-                                'date': match_item.get('finished_at', 0)
-                            }
-
-            return None
-
-        except Exception as e:
-            logger.error(f"❌ Ошибка обработки деталей матча: {e}")
-            return None
-
-    def _calculate_stats_from_matches(self, matches):
-        """Рассчитывает статистику на основе списка матчей"""
-        if not matches or len(matches) == 0:
-            return self._get_default_stats_last_20()
-
-        total_matches = len(matches)
-        wins = sum(1 for m in matches if m.get('result') == 'win')
-        losses = total_matches - wins
-
-        # Собираем все убийства, смерти и т.д.
-        all_kills = [m.get('kills', 0) for m in matches]
-        all_deaths = [m.get('deaths', 0) for m in matches]
-        all_assists = [m.get('assists', 0) for m in matches]
-        all_hs_percent = [m.get('hs_percent', 0) for m in matches]
-
-        # Рассчитываем средние значения
-        avg_kills = round(sum(all_kills) / total_matches, 1) if total_matches > 0 else 0
-        avg_deaths = round(sum(all_deaths) / total_matches, 1) if total_matches > 0 else 0
-        avg_assists = round(sum(all_assists) / total_matches, 1) if total_matches > 0 else 0
-        avg_hs_percent = round(sum(all_hs_percent) / total_matches, 1) if total_matches > 0 else 0
-
-        # Общее количество убийств и хедшотов
-        total_kills = sum(all_kills)
-        total_headshots = sum(int(kills * (hs/100)) for kills, hs in zip(all_kills, all_hs_percent))
-
-        # K/D Ratio
-        total_deaths = sum(all_deaths)
-        kd_ratio = round(total_kills / total_deaths, 2) if total_deaths > 0 else total_kills
-
-        # Winrate
-        winrate = round((wins / total_matches) * 100, 1) if total_matches > 0 else 0
-
-        # Считаем серии побед
-        current_streak = 0
-        longest_streak = 0
-        temp_streak = 0
-
-        for match in matches:
-            if match.get('result') == 'win':
-                temp_streak += 1
-                current_streak = temp_streak if current_streak >= 0 else 0
-            else:
-                if temp_streak > longest_streak:
-                    longest_streak = temp_streak
-                temp_streak = 0
-
-        if temp_streak > longest_streak:
-            longest_streak = temp_streak
-
-        # MVPs и мультикилы (для демо)
-        mvp_count = max(1, int(wins * 0.1))  # Примерно 10% от побед
-        triple_kills = max(1, int(total_kills * 0.03))  # Примерно 3% от всех убийств
-        quadro_kills = max(1, int(total_kills * 0.01))  # Примерно 1% от всех убийств
-        penta_kills = max(0, int(total_kills * 0.002))  # Примерно 0.2% от всех убийств
-
-        return {
-            'winrate': winrate,
-            'total_matches': total_matches,
-            'total_wins': wins,
-            'total_losses': losses,
-            'kd_ratio': kd_ratio,
-            'average_kills': avg_kills,
-            'average_deaths': avg_deaths,
-            'average_assists': avg_assists,
-            'average_headshots': avg_hs_percent,
-            'total_headshots': total_headshots,
-            'longest_win_streak': longest_streak,
-            'current_win_streak': current_streak,
-            'longest_lose_streak': 0,  # Для упрощения
-            'mvp': mvp_count,
-            'triple_kills': triple_kills,
-            'quadro_kills': quadro_kills,
-            'penta_kills': penta_kills
-        }
-
-    def _get_realistic_stats_last_20(self, player_id):
-        """Реалистичная статистика за последние 20 матчей"""
-        logger.info(f"📊 Используем реалистичную статистику за 20 матчей для {player_id}")
-
-        # Более реалистичные данные для последних 20 матчей
-        stats_base = {
-            # donk666
-            'e5e8e2a6-d716-4493-b949-e16965f41654': {
-                'total_matches': 20,
-                'total_wins': 12,  # 60% винрейт
-                'total_losses': 8,
-                'average_kills': 24.5,  # За 20 матчей
-                'average_deaths': 17.2,
-                'average_assists': 5.8,
-                'average_headshots': 58.5,
-            },
-            # Daniil Finch
-            '7c389101-3bd4-416d-a06d-a7b21398b220': {
-                'total_matches': 20,
-                'total_wins': 10,  # 50% винрейт
-                'total_losses': 10,
-                'average_kills': 19.3,
-                'average_deaths': 16.7,
-                'average_assists': 4.2,
-                'average_headshots': 41.2,
-            },
-            # s1mple
-            '09045993-d578-475c-b4e0-e107ce787606': {
-                'total_matches': 20,
-                'total_wins': 13,  # 65% винрейт
-                'total_losses': 7,
-                'average_kills': 26.8,
-                'average_deaths': 18.4,
-                'average_assists': 6.3,
-                'average_headshots': 49.7,
-            }
-        }
-
-        # Получаем базовую статистику или дефолтную
-        base_stats = stats_base.get(player_id, {
-            'total_matches': 20,
-            'total_wins': 10,
-            'total_losses': 10,
-            'average_kills': 20.0,
-            'average_deaths': 18.0,
-            'average_assists': 5.0,
-            'average_headshots': 45.0,
-        })
-
-        # Рассчитываем остальные показатели
-        wins = base_stats['total_wins']
-        total_matches = base_stats['total_matches']
-        avg_kills = base_stats['average_kills']
-        avg_deaths = base_stats['average_deaths']
-        avg_hs = base_stats['average_headshots']
-
-        # K/D Ratio
-        kd_ratio = round(avg_kills / avg_deaths, 2) if avg_deaths > 0 else 1.0
-
-        # Winrate
-        winrate = round((wins / total_matches) * 100, 1)
-
-        # Общее количество хедшотов (примерно)
-        total_headshots = int((avg_kills * total_matches) * (avg_hs / 100))
-
-        # MVPs (примерно 10-15% от побед)
-        mvp_count = max(1, int(wins * 0.12))
-
-        # Мультикилы (примерные значения)
-        total_kills = int(avg_kills * total_matches)
-        triple_kills = max(1, int(total_kills * 0.025))
-        quadro_kills = max(1, int(total_kills * 0.008))
-        penta_kills = max(0, int(total_kills * 0.0015))
-
-        # Серии побед
-        current_streak = 2 if wins > losses else 0
-        longest_streak = min(5, wins)  # Не больше 5 для 20 матчей
-
-        return {
-            'winrate': winrate,
-            'total_matches': total_matches,
-            'total_wins': wins,
-            'total_losses': base_stats['total_losses'],
-            'kd_ratio': kd_ratio,
-            'average_kills': avg_kills,
-            'average_deaths': avg_deaths,
-            'average_assists': base_stats['average_assists'],
-            'average_headshots': avg_hs,
-            'total_headshots': total_headshots,
-            'longest_win_streak': longest_streak,
-            'current_win_streak': current_streak,
-            'longest_lose_streak': 0,
-            'mvp': mvp_count,
-            'triple_kills': triple_kills,
-            'quadro_kills': quadro_kills,
-            'penta_kills': penta_kills
-        }
-
-    def _get_default_stats_last_20(self):
-        """Статистика по умолчанию за последние 20 матчей"""
-        return {
-            'winrate': 55.0,
-            'total_matches': 20,
-            'total_wins': 11,
-            'total_losses': 9,
-            'kd_ratio': 1.25,
-            'average_kills': 21.5,
-            'average_deaths': 17.2,
-            'average_assists': 5.3,
-            'average_headshots': 47.8,
-            'total_headshots': 2050,
-            'longest_win_streak': 4,
-            'current_win_streak': 1,
-            'longest_lose_streak': 0,
-            'mvp': 3,
-            'triple_kills': 12,
-            'quadro_kills': 3,
-            'penta_kills': 0
-        }
-
-    def _get_realistic_matches_detailed(self, player_id, limit):
-        """Реалистичные детали матчей для демо"""
-        logger.info(f"🎲 Генерируем реалистичные матчи для {player_id}")
-
-        import random
-        import time
+        # Общий пул keep-alive соединений
+        self.http = get_http_client()
+        # Общий лимитер запросов
+        self.limiter = get_rate_limiter()
+        # Склейка одинаковых запросов, которые выполняются одновременно
+        self.inflight = SingleFlight()
+        # Кэш ответов: память + SQLite
+        self.cache = TieredCache()
+        # Детали завершенных матчей (не меняются, храним навсегда)
+        self.match_store = MatchStore()
+        # Предохранители по семействам endpoint'ов
+        self.breakers = CircuitBreakerRegistry()
+        self.identities = get_identity_store()
+        self.activity = ActivityTracker()
+        self.match_history = MatchHistory()
+        # Одна синхронизация истории игрока на все одновременные запросы
+        self.history_syncs = SingleFlight()
+        # Накопительная статистика игроков (player_stats), обновляется при синхронизации истории
+        self.player_aggregates = PlayerAggregates()
+        # Фоновая подгрузка следующей страницы истории в iter_matches
+        self.page_executor = ThreadPoolExecutor(max_workers=Config.PAGE_PREFETCH_WORKERS)
+        # Параллельный (хедж) поиск игрока и статистика побед стратегий
+        self.search_executor = ThreadPoolExecutor(max_workers=Config.SEARCH_WORKERS)
+        self.search_wins = {}
+        # Последние задержки стратегий поиска - по их медиане выбирается момент хеджа
+        self.search_latency = {}
+        self._search_lock = threading.Lock()
+
+    def _map_match_items(self, fetch_fn, match_items, player_id, workers=None):
+        """Загружает детали матчей параллельно (не больше workers запросов одновременно).
+
+        Порядок результатов совпадает с порядком match_items, упавшие и пустые
+        загрузки просто пропускаются - возвращаем то, что удалось получить.
+        """
+        workers = Config.MATCH_FETCH_WORKERS if workers is None else workers
 
-        matches = []
-        random.seed(player_id + str(int(time.time() // 3600)))
-
-        # Базовые показатели в зависимости от игрока
-        if 'donk666' in player_id or 'e5e8e2a6' in player_id:
-            base_kills = 24.5
-            base_deaths = 17.2
-            base_hs = 58.5
-            win_prob = 0.6  # 60% винрейт
-        elif 's1mple' in player_id or '09045993' in player_id:
-            base_kills = 26.8
-            base_deaths = 18.4
-            base_hs = 49.7
-            win_prob = 0.65  # 65% винрейт
+        if workers <= 1 or len(match_items) <= 1:
+            results = []
+            for match_item in match_items:
+                try:
+                    results.append(fetch_fn(match_item, player_id))
+                except Exception as e:
+                    logger.error(f"❌ Ошибка загрузки матча: {e}")
+                    results.append(None)
         else:
-            base_kills = 20.0
-            base_deaths = 18.0
-            base_hs = 45.0
-            win_prob = 0.5  # 50% винрейт
-
-        for i in range(limit):
-            # Результат матча
-            result = 'win' if random.random() < win_prob else 'loss'
-
-            # Вариация статистики (±20%)
-            kills_variation = random.uniform(0.8, 1.2)
-            deaths_variation = random.uniform(0.8, 1.2)
-            hs_variation = random.uniform(0.9, 1.1)
-
-            kills = int(base_kills * kills_variation)
-            deaths = int(base_deaths * deaths_variation)
-            hs_percent = base_hs * hs_variation
-
-            # Ограничиваем проценты
-            hs_percent = min(max(hs_percent, 20), 80)
-
-            # Ассисты (примерно 20-30% от убийств)
-            assists = int(kills * random.uniform(0.2, 0.3))
-
-            # Хедшоты в абсолютном значении
-            headshots = int(kills * (hs_percent / 100))
-
-            # K/D Ratio
-            kd_ratio = round(kills / deaths, 2) if deaths > 0 else kills
-
-            matches.append({
-                'match_id': f'demo_match_{i}_{int(time.time())}',
-                'result': result,
-                'kills': kills,
-                'deaths': deaths,
-                'assists': assists,
-                'headshots': headshots,
-                'hs_percent': round(hs_percent, 1),
-                'kd_ratio': kd_ratio,
-                'elo_delta': random.choice([-25, -15, 0, 15, 25]) if result == 'win' else random.choice([-25, -15]),
-                'date': int(time.time()) - (i * 86400)  # Разные даты
-            })
-
+            with ThreadPoolExecutor(max_workers=min(workers, len(match_items))) as executor:
+                # Каждой задаче - своя копия контекста: дедлайн и мемо запроса действуют и в потоках
+                futures = [executor.submit(contextvars.copy_context().run, fetch_fn, item, player_id)
+                           for item in match_items]
+                results = []
+                for future in futures:
+                    try:
+                        results.append(future.result())
+                    except Exception as e:
+                        logger.error(f"❌ Ошибка загрузки матча: {e}")
+                        results.append(None)
+
+        matches = [m for m in results if m]
+        if len(matches) < len(match_items):
+            logger.warning(f"⚠️ Загружено {len(matches)} из {len(match_items)} матчей")
         return matches
 
-    # Другие методы остаются без изменений
-    def get_player_ranking(self, player_id):
-        """Получает рейтинг игрока (регион и страна)"""
-        logger.info(f"📊 Получение рейтинга для игрока: {player_id}")
-        try:
-            endpoint = f"/players/{player_id}/stats/{self.game}"
-            data = self._smart_request(endpoint)
+    def _smart_request(self, endpoint, params=None, max_retries=3):
+        """Умный запрос: в рамках одного запроса к сайту каждый endpoint грузится один раз"""
+        memo = current_memo()
+        if memo is not None:
+            found, data = memo.get(endpoint, params)
+            if found:
+                return data
 
-            if not data:
-                return {'region_rank': None, 'country_rank': None}
-
-            region_rank = None
-            country_rank = None
-
-            segments = data.get('segments', [])
-            if segments and isinstance(segments, list):
-                for segment in segments:
-                    if isinstance(segment, dict):
-                        if segment.get('label') == 'Region' or segment.get('type') == 'region':
-                            position = segment.get('rank', {}).get('position')
-                            if position and position > 0:
-                                region_rank = position
-                        if segment.get('label') == 'Country' or segment.get('type') == 'country':
-                            position = segment.get('rank', {}).get('position')
-                            if position and position > 0:
-                                country_rank = position
-
-            return {
-                'region_rank': int(region_rank) if region_rank else None,
-                'country_rank': int(country_rank) if country_rank else None
-            }
+        data = self._shared_request(endpoint, params, max_retries)
 
-        except Exception as e:
-            logger.error(f"❌ Ошибка при получении рейтинга: {e}")
-            return {'region_rank': None, 'country_rank': None}
+        if memo is not None:
+            memo.put(endpoint, params, data)
+        return data
 
-    def get_recent_matches_fixed(self, player_id, limit=5):
-        """Получение последних матчей для отображения W/L"""
-        logger.info(f"🎮 Получение последних {limit} матчей для: {player_id}")
+    def _shared_request(self, endpoint, params=None, max_retries=3):
+        """Запрос через кэш, одинаковые одновременные запросы склеиваются в один"""
+        key = request_key(endpoint, params)
+        ttl = self._cache_ttl(endpoint)
 
-        # Для демо-игроков
-        if player_id in ['e5e8e2a6-d716-4493-b949-e16965f41654']:  # donk666
-            return ['W', 'L', 'W', 'W', 'L']
-        elif player_id in ['09045993-d578-475c-b4e0-e107ce787606']:  # s1mple
-            return ['W', 'W', 'L', 'W', 'W']
-        elif player_id in ['7c389101-3bd4-416d-a06d-a7b21398b220']:  # Daniil Finch
-            return ['L', 'W', 'L', 'W', 'L']
+        if ttl:
+            entry = self.cache.get(key)
+            if entry is not None:
+                return entry.value
 
         try:
-            endpoint = f"/players/{player_id}/history"
-            params = {
-                'game': self.game,
-                'limit': limit,
-                'offset': 0
-            }
-
-            data = self._smart_request(endpoint, params)
-
-            if not data or 'items' not in data or not data['items']:
-                logger.warning("⚠️ Нет данных матчей, используем демо")
-                return ['W', 'L', 'W', 'L', '-']
-
-            recent_results = []
-            matches = data['items'][:limit]
-
-            for match in matches:
-                elo_delta = match.get('elo_delta')
-
-                if elo_delta is None:
-                    recent_results.append('-')
-                elif elo_delta > 0:
-                    recent_results.append('W')
-                elif elo_delta < 0:
-                    recent_results.append('L')
-                else:
-                    recent_results.append('-')
-
-            while len(recent_results) < limit:
-                recent_results.append('-')
+            return self.inflight.do(key, lambda: self._fetch_cached(key, endpoint, params, max_retries, ttl))
+        except CircuitOpenError:
+            note_api_failure(endpoint)
+            return self._last_known_good(key, endpoint, ttl)
+        except APIUnavailableError:
+            # Каждый ждущий (и лидер, и присоединившиеся) отмечает сбой в своем запросе к сайту
+            note_api_failure(endpoint)
+            return None
 
-            logger.info(f"✅ Последние игры: {' '.join(recent_results)}")
-            return recent_results[:limit]
+    def _last_known_good(self, key, endpoint, ttl):
+        """Предохранитель разомкнут: отдаем последние данные из кэша, даже протухшие"""
+        entry = self.cache.get(key, allow_stale=True) if ttl else None
+        if entry is not None:
+            logger.warning(f"⚠️ API недоступен, отдаем данные из кэша: {endpoint}")
+            return entry.value
 
-        except Exception as e:
-            logger.error(f"❌ Ошибка при получении матчей: {e}")
-            return ['W', 'L', 'W', 'L', '-']
+        logger.warning(f"⚠️ API недоступен, данных в кэше нет: {endpoint}")
+        return None
 
-    def test_connection(self):
-        """Тест соединения"""
-        if not self.valid_key:
-            logger.warning("⚠️ Демо-режим: нет API ключа")
-            return False
+    def _fetch_cached(self, key, endpoint, params, max_retries, ttl):
+        """Загрузка с записью в кэш (кэш проверяем еще раз - пока ждали, его могли заполнить)"""
+        stale = None
+        if ttl:
+            entry = self.cache.get(key, allow_stale=True)
+            if entry is not None and entry.fresh:
+                return entry.value
+            # Протухшую запись с ETag/Last-Modified перепроверяем условным запросом
+            if entry is not None and entry.validators:
+                stale = entry
+
+        response_meta = {}
+        data = self._fetch_json(endpoint, params, max_retries,
+                                validators=stale.validators if stale else None, response_meta=response_meta)
+        if data is None and response_meta['error']:
+            raise APIUnavailableError(endpoint)
+
+        if stale is not None and data is not None:
+            self.cache.revalidation.record_revalidation(data is NOT_MODIFIED, stale.size)
+        if data is NOT_MODIFIED:
+            logger.debug(f"304 Not Modified, продлеваем кэш: {endpoint}")
+            return self.cache.extend(key, stale, ttl).value
+
+        if data is not None:
+            self.identities.observe_payload(data)
+            if endpoint_class(endpoint) == 'history':
+                self.activity.observe_history(endpoint_player_id(endpoint), data)
+                ttl = self._cache_ttl(endpoint)
+        if ttl and data is not None:
+            self.cache.set(key, data, ttl,
+                           etag=response_meta.get('etag'), last_modified=response_meta.get('last_modified'))
+        return data
+
+    def _fetch_json(self, endpoint, params=None, max_retries=3, validators=None, response_meta=None):
+        """Запрос к API с обработкой ошибок и повторными попытками.
+
+        validators - заголовки условного запроса (If-None-Match/If-Modified-Since), тогда на 304
+        возвращается NOT_MODIFIED. В response_meta кладутся ETag и Last-Modified ответа и
+        флаг error: True - None означает сбой, False - API подтвердил ответ (200/304/404).
+        """
+        meta = response_meta if response_meta is not None else {}
+        # Пока API не ответил 200/304/404, None - это сбой, а не "данных нет"
+        meta['error'] = True
+        url = f"{self.base_url}{endpoint}"
+        breaker = self.breakers.for_endpoint(endpoint)
+        deadline = current_deadline()
+        headers = dict(self.headers, **validators) if validators else self.headers
 
-        logger.info("🔧 Тестирование соединения с FACEIT API...")
+        for attempt in range(max_retries):
+            # Бюджет времени страницы исчерпан - дальше не ждем
+            if deadline and deadline.expired:
+                logger.warning(f"⏱️ Бюджет времени исчерпан: {endpoint}")
+                return None
 
-        endpoint = "/games"
-        data = self._smart_request(endpoint)
+            # API лежит - не ждем таймаутов, сразу отдаем управление
+            admission = breaker.allow()
+            if not admission:
+                raise CircuitOpenError(breaker.name)
 
-        if data:
-            logger.info("✅ Соединение с FACEIT API установлено")
-            return True
-        else:
-            logger.error("❌ Не удалось подключиться к FACEIT API")
-            return False
-            self.headers = {
-                'Authorization': f'Bearer {self.api_key}',
-                'Accept': 'application/json',
-                'User-Agent': 'FaceitAnalyser/1.0'
-            }
-            logger.info(f"✅ API настроен для игры: {self.game}")
-
-    def _smart_request(self, endpoint, params=None, max_retries=3):
-        """Умный запрос с обработкой ошибок и повторными попытками"""
-        url = f"{self.base_url}{endpoint}"
+            # Таймаут урезается остатком бюджета
+            timeout = deadline.timeout(15) if deadline else 15
 
-        for attempt in range(max_retries):
             try:
                 logger.debug(f"Запрос: {url}, Параметры: {params}")
 
-                response = requests.get(
+                # Общий лимитер: все потоки ждут токен, а не долбят API
+                if not self.limiter.acquire(timeout=deadline.remaining() if deadline else None):
+                    logger.warning(f"⏱️ Не дождались очереди к API в рамках бюджета: {endpoint}")
+                    return None
+
+                response = self.http.get(
                     url,
-                    headers=self.headers,
+                    headers=headers,
                     params=params,
-                    timeout=15
+                    timeout=timeout
                 )
+                self.limiter.update_from_headers(response.headers)
+
+                if response.status_code >= 500:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
 
                 if response.status_code == 200:
-                    return response.json()
+                    started = time.perf_counter()
+                    data = response.json()
+                    self.cache.revalidation.record_decode(len(response.content), time.perf_counter() - started)
+                    meta['error'] = False
+                    meta['etag'] = response.headers.get('ETag')
+                    meta['last_modified'] = response.headers.get('Last-Modified')
+                    return data
+                elif response.status_code == 304 and validators:
+                    meta['error'] = False
+                    return NOT_MODIFIED
                 elif response.status_code == 401:
                     logger.error("❌ Неверный API ключ!")
                     return None
                 elif response.status_code == 404:
                     logger.warning(f"⚠️ Ресурс не найден: {endpoint}")
+                    meta['error'] = False
                     return None
                 elif response.status_code == 429:
-                    wait_time = min(60, 2 ** attempt)
-                    logger.warning(f"⚠️ Лимит запросов. Ждем {wait_time} секунд...")
-                    time.sleep(wait_time)
+                    # Пауза общая для всех потоков, следующий acquire ее дождется
+                    if 'Retry-After' not in response.headers:
+                        self.limiter.pause(min(60, 2 ** attempt))
                     continue
                 else:
                     logger.error(f"❌ HTTP {response.status_code}: {response.text[:200]}")
                     return None
 
             except requests.exceptions.Timeout:
+                # Таймаут, урезанный бюджетом страницы, - не вина API
+                if timeout >= 15:
+                    breaker.record_failure()
                 logger.warning(f"⚠️ Таймаут запроса (попытка {attempt + 1}/{max_retries})")
-                time.sleep(2)
+                self._backoff(2, deadline)
                 continue
             except requests.exceptions.RequestException as e:
+                breaker.record_failure()
                 logger.error(f"❌ Ошибка сети: {e}")
                 if attempt == max_retries - 1:
                     return None
-                time.sleep(1)
+                self._backoff(1, deadline)
                 continue
+            finally:
+                # Без успеха/ошибки (лимитер, таймаут из-за бюджета) пробный запрос half_open не должен зависнуть
+                breaker.release_probe(admission)
 
         return None
 
+    def _backoff(self, seconds, deadline=None):
+        """Пауза между попытками, но не дольше остатка бюджета"""
+        if deadline:
+            seconds = min(seconds, deadline.remaining())
+        if seconds > 0:
+            time.sleep(seconds)
+
     def find_player(self, nickname):
         """ГЛАВНЫЙ МЕТОД: Находит игрока любым способом"""
         logger.info(f"🔍 Поиск игрока: '{nickname}'")
 
-        player = self._search_direct(nickname)
+        # Уже встречали этот ник (в том числе старый), Steam ID или vanity имя - сразу идем по player_id
+        player = self._find_known_player(nickname.strip())
         if player:
+            logger.info(f"✅ Найден по графу идентичностей: {player['nickname']}")
+            self._record_search_winner('identity_store')
             return player
 
-        player = self._search_legacy(nickname)
-        if player:
-            return player
+        strategies = [self._search_exact, self._search_direct, self._search_legacy, self._search_without_game]
+
+        if Config.SEARCH_MODE == 'serial':
+            player, winner = None, None
+            for strategy in strategies:
+                player = strategy(nickname)
+                if player:
+                    winner = strategy.__name__
+                    break
+        else:
+            player, winner = self._hedged_search(strategies, nickname)
+
+        self._record_search_winner(winner or 'not_found')
 
-        player = self._search_without_game(nickname)
         if player:
             return player
 
         logger.warning(f"❌ Игрок '{nickname}' не найден ни одним методом")
         return None
 
+    def _find_known_player(self, identifier):
+        """Игрок из графа идентичностей, владелец ника подтверждается актуальным профилем"""
+        known = self.identities.resolve(identifier)
+        if not known:
+            return None
+
+        player = self.get_player_by_id(known['player_id'])
+        if not player:
+            return None
+
+        return confirm_owner(identifier, player, self._search_exact)
+
+    def _hedged_search(self, strategies, nickname):
+        """Запускает стратегии поиска параллельно.
+
+        В режиме 'race' одновременно идут не больше SEARCH_RACE_CONCURRENCY стратегий,
+        в режиме 'hedge' следующая стартует, если предыдущая молчит дольше своей медианы
+        задержки или ответила без точного совпадения. Побеждает первое точное совпадение ника.
+
+        Цена параллельности - лишние запросы к API: отмена не останавливает уже начатые
+        стратегии, они доходят до конца (их ответы оседают в кэше). Хедж по медиане
+        добавляет второй запрос примерно в половине медленных поисков, 'race' - всегда.
+        """
+        race = Config.SEARCH_MODE == 'race'
+        concurrency = max(1, Config.SEARCH_RACE_CONCURRENCY)
+        results = [None] * len(strategies)
+        running = {}
+
+        launched = 0
+
+        def launch():
+            nonlocal launched
+            ctx = contextvars.copy_context()
+            future = self.search_executor.submit(ctx.run, self._timed_strategy, strategies[launched], nickname)
+            running[future] = launched
+            launched += 1
+
+        launch()
+        while race and launched < len(strategies) and len(running) < concurrency:
+            launch()
+
+        while running:
+            timeout = None
+            if not race and launched < len(strategies):
+                timeout = self._hedge_delay(strategies[launched - 1].__name__)
+            done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+
+            if not done:
+                # Хедж: текущие стратегии думают слишком долго - подключаем следующую
+                launch()
+                continue
+
+            for future in done:
+                index = running.pop(future)
+                try:
+                    player = future.result()
+                except Exception as e:
+                    logger.warning(f"⚠️ Стратегия {strategies[index].__name__} упала: {e}")
+                    player = None
+                results[index] = player
+
+                if player and player.get('nickname', '').lower() == nickname.lower():
+                    for loser in running:
+                        loser.cancel()
+                    return player, strategies[index].__name__
+
+            # Точного совпадения нет - не ждем таймера, пробуем следующую стратегию
+            if launched < len(strategies):
+                launch()
+            while race and launched < len(strategies) and len(running) < concurrency:
+                launch()
+
+        # Точных совпадений нет: берем результат по приоритету стратегий
+        for index, player in enumerate(results):
+            if player:
+                return player, strategies[index].__name__
+
+        return None, None
+
+    def _timed_strategy(self, strategy, nickname):
+        started = time.monotonic()
+        try:
+            return strategy(nickname)
+        finally:
+            with self._search_lock:
+                samples = self.search_latency.setdefault(strategy.__name__, deque(maxlen=200))
+                samples.append(time.monotonic() - started)
+
+    def _hedge_delay(self, name):
+        """Медиана (p50) задержки стратегии, пока замеров мало - SEARCH_HEDGE_DELAY"""
+        with self._search_lock:
+            samples = list(self.search_latency.get(name, ()))
+        if len(samples) < Config.SEARCH_HEDGE_MIN_SAMPLES:
+            return Config.SEARCH_HEDGE_DELAY
+        return statistics.median(samples)
+
+    def _record_search_winner(self, winner):
+        with self._search_lock:
+            self.search_wins[winner] = self.search_wins.get(winner, 0) + 1
+
+    def search_stats(self):
+        """Какая стратегия поиска сколько раз побеждала и ее медиана задержки"""
+        with self._search_lock:
+            latency = {name: round(statistics.median(samples), 3)
+                       for name, samples in self.search_latency.items() if samples}
+            return {'mode': Config.SEARCH_MODE, 'wins': dict(self.search_wins), 'p50_latency': latency}
+
+    def _search_exact(self, nickname):
+        """Метод 0: Точный ник - /players?nickname= без limit сразу отдает полный профиль"""
+        data = self._smart_request("/players", {'nickname': nickname})
+
+        if not data or not data.get('player_id'):
+            return None
+
+        logger.info(f"✅ Найден по точному нику: {data.get('nickname')}")
+        self._remember_player_payload(data)
+        return self._build_player_result(data)
+
     def _search_direct(self, nickname):
         """Метод 1: Прямой поиск (основной)"""
         endpoint = "/players"
@@ -945,24 +453,10 @@ class FaceitAPI:
 
         data = self._smart_request(endpoint, params)
 
-        if data and 'items' in data and data['items']:
-            items = data['items']
-            exact_match = None
-
-            for player in items:
-                if player.get('nickname', '').lower() == nickname.lower():
-                    exact_match = player
-                    break
-
-            if not exact_match:
-                for player in items:
-                    if nickname.lower() in player.get('nickname', '').lower():
-                        exact_match = player
-                        break
-
-            if exact_match:
-                logger.info(f"✅ Найден через прямой поиск: {exact_match['nickname']}")
-                return self._enrich_player_data(exact_match)
+        exact_match = self._pick_search_match(data, nickname)
+        if exact_match:
+            logger.info(f"✅ Найден через прямой поиск: {exact_match['nickname']}")
+            return self._enrich_player_data(exact_match)
 
         return None
 
@@ -1008,19 +502,15 @@ class FaceitAPI:
         if not player_id:
             return None
 
+        # В ответе уже полный профиль - второй запрос не нужен
+        if player_data.get('games'):
+            self._remember_player_payload(player_data)
+            return self._build_player_result(player_data)
+
         full_data = self.get_player_by_id(player_id)
 
         if not full_data:
-            return {
-                'player_id': player_id,
-                'nickname': player_data.get('nickname', 'Unknown'),
-                'country': player_data.get('country', ''),
-                'avatar': player_data.get('avatar', ''),
-                'skill_level': 1,
-                'faceit_elo': 1000,
-                'game': self.game,
-                'faceit_url': f"https://www.faceit.com/players/{player_data.get('nickname', '')}"
-            }
+            return self._basic_player_data(player_data)
 
         return full_data
 
@@ -1034,33 +524,7 @@ class FaceitAPI:
         if not data:
             return None
 
-        games = data.get('games', {})
-        cs2_data = games.get('cs2') or games.get('csgo')
-
-        result = {
-            'player_id': data.get('player_id'),
-            'nickname': data.get('nickname', 'Unknown'),
-            'country': data.get('country', 'Unknown'),
-            'avatar': data.get('avatar', ''),
-            'steam_id_64': data.get('steam_id_64', ''),
-            'membership': data.get('membership', 'free'),
-            'verified': data.get('verified', False),
-            'faceit_url': f"https://www.faceit.com/players/{data.get('nickname', '')}",
-            'raw_data': data
-        }
-
-        if cs2_data:
-            result['faceit_elo'] = cs2_data.get('faceit_elo', 0)
-            result['skill_level'] = cs2_data.get('skill_level', 0)
-            result['game'] = 'cs2'
-            logger.info(f"✅ Установлен ELO: {result['faceit_elo']}, Уровень: {result['skill_level']}")
-        else:
-            result['faceit_elo'] = 0
-            result['skill_level'] = 0
-            result['game'] = self.game
-            logger.warning("⚠️ Не найдены данные CS2")
-
-        return result
+        return self._build_player_result(data)
 
     def get_player_stats_detailed(self, player_id):
         """Получает детальную статистику игрока - ИСПРАВЛЕННАЯ ВЕРСИЯ"""
@@ -1071,33 +535,19 @@ class FaceitAPI:
             logger.warning("⚠️ API ключ не настроен или невалиден, используем демо-данные")
             return self._get_realistic_stats(player_id)
 
+        # Вся история игрока уже в player_stats - одна строка вместо запроса lifetime статистики
+        stats = self.get_aggregate_stats(player_id, full_history=True)
+        if stats:
+            return stats
+
         try:
             # Endpoint для статистики
             endpoint = f"/players/{player_id}/stats/{self.game}"
             data = self._smart_request(endpoint)
-
-            # Если API не вернул данные
             if not data:
-                logger.error(f"❌ API не вернул статистику для {player_id}")
-                return self._get_realistic_stats(player_id)
-
-            logger.info(f"✅ API вернул данные. Структура: {data.keys()}")
-
-            # Вариант 1: Данные в формате с 'lifetime'
-            if 'lifetime' in data:
-                lifetime = data['lifetime']
-                logger.info(f"📊 Найден 'lifetime' с {len(lifetime)} полями")
-                return self._parse_lifetime_stats(lifetime, player_id)
-
-            # Вариант 2: Данные в другом формате
-            elif 'segments' in data:
-                logger.info(f"📊 Найден 'segments' с {len(data['segments'])} сегментами")
-                return self._parse_segments_stats(data['segments'], player_id)
-
-            # Вариант 3: Неизвестный формат
-            else:
-                logger.warning(f"⚠️ Неизвестный формат данных API: {data.keys()}")
-                return self._get_realistic_stats(player_id)
+                # Перед запасным вариантом догружаем новые матчи в player_stats
+                self._sync_history_quietly(player_id)
+            return self._stats_from_response(data, player_id)
 
         except Exception as e:
             logger.error(f"❌ Ошибка при получении статистики: {e}")
@@ -1105,192 +555,6 @@ class FaceitAPI:
             logger.error(traceback.format_exc())
             return self._get_realistic_stats(player_id)
 
-    def _parse_lifetime_stats(self, lifetime_data, player_id):
-        """Парсит статистику из формата lifetime"""
-        try:
-            # Функции для безопасного извлечения данных
-            def get_float(key, default=0.0):
-                value = lifetime_data.get(key)
-                if isinstance(value, str):
-                    value = value.replace('%', '').replace(',', '.').strip()
-                try:
-                    return float(value) if value else default
-                except:
-                    return default
-
-            def get_int(key, default=0):
-                value = lifetime_data.get(key)
-                try:
-                    return int(value) if value else default
-                except:
-                    return default
-
-            # Основная статистика
-            stats = {
-                'winrate': get_float('Win Rate %', ),
-                'total_matches': get_int('Matches', ),
-                'total_wins': get_int('Wins', ),
-                'total_losses': get_int('Lost', ),
-                'kd_ratio': get_float('K/D Ratio', ),
-                'average_kills': get_float('Average Kills', ),
-                'average_deaths': get_float('Average Deaths', ),
-                'average_assists': get_float('Average Assists', ),
-                'average_headshots': get_float('Average Headshots %', ),
-                'total_headshots': get_int('Total Headshots %', ),
-                'longest_win_streak': get_int('Longest Win Streak', ),
-                'current_win_streak': get_int('Current Win Streak', ),
-                'longest_lose_streak': get_int('Longest Lose Streak', ),
-                'mvp': get_int('MVPs', ),
-                'triple_kills': get_int('Triple Kills', ),
-                'quadro_kills': get_int('Quadro Kills', ),
-                'penta_kills': get_int('Penta Kills', )
-            }
-
-            # Исправляем K/D если нереальный
-            if stats['kd_ratio'] > 10 or stats['kd_ratio'] == 0:
-                if stats['average_deaths'] > 0:
-                    stats['kd_ratio'] = round(stats['average_kills'] / stats['average_deaths'], 2)
-                else:
-                    stats['kd_ratio'] = 1.43
-
-            # Если винрейт 0, но есть матчи и победы
-            if stats['winrate'] == 0 and stats['total_matches'] > 0 and stats['total_wins'] > 0:
-                stats['winrate'] = round((stats['total_wins'] / stats['total_matches']) * 100, 1)
-
-            logger.info(f"✅ Парсинг статистики: K/D={stats['kd_ratio']}, Winrate={stats['winrate']}%")
-            return stats
-
-        except Exception as e:
-            logger.error(f"❌ Ошибка парсинга lifetime: {e}")
-            return self._get_realistic_stats(player_id)
-
-    def _get_realistic_stats(self, player_id):
-        """Возвращает реалистичные демо-данные как на FastMM"""
-        logger.info(f"📊 Используем реалистичные демо-данные для {player_id}")
-
-        # Данные для разных игроков
-        players_stats = {
-            # Daniil Finch
-            '7c389101-3bd4-416d-a06d-a7b21398b220': {
-                'nickname': 'Daniil Finch',
-                'faceit_elo': 1437,
-                'skill_level': 7,
-                'winrate': 50.0,
-                'total_matches': 526,
-                'total_wins': 265,
-                'total_losses': 261,
-                'kd_ratio': 1.43,
-                'average_kills': 7.0,
-                'average_deaths': 4.0,
-                'average_assists': 1.0,
-                'average_headshots': 42.0,
-                'total_headshots': 52560,
-                'longest_win_streak': 9,
-                'current_win_streak': 1,
-                'longest_lose_streak': 0,
-                'mvp': 52,
-                'triple_kills': 125,
-                'quadro_kills': 25,
-                'penta_kills': 3
-            },
-            # donk666
-            'e5e8e2a6-d716-4493-b949-e16965f41654': {
-                'nickname': 'donk666',
-                'faceit_elo': 4387,
-                'skill_level': 10,
-                'winrate': 60.0,
-                'total_matches': 6760,
-                'total_wins': 4070,
-                'total_losses': 2690,
-                'kd_ratio': 1.43,
-                'average_kills': 7.0,
-                'average_deaths': 4.0,
-                'average_assists': 1.0,
-                'average_headshots': 60.0,
-                'total_headshots': 403610,
-                'longest_win_streak': 22,
-                'current_win_streak': 0,
-                'longest_lose_streak': 0,
-                'mvp': 675,
-                'triple_kills': 1250,
-                'quadro_kills': 250,
-                'penta_kills': 50
-            },
-            # s1mple
-            '09045993-d578-475c-b4e0-e107ce787606': {
-                'nickname': 'S1mple--__--',
-                'faceit_elo': 2100,
-                'skill_level': 10,
-                'winrate': 55.0,
-                'total_matches': 3250,
-                'total_wins': 1788,
-                'total_losses': 1462,
-                'kd_ratio': 1.62,
-                'average_kills': 8.5,
-                'average_deaths': 5.2,
-                'average_assists': 2.1,
-                'average_headshots': 48.5,
-                'total_headshots': 254300,
-                'longest_win_streak': 15,
-                'current_win_streak': 2,
-                'longest_lose_streak': 0,
-                'mvp': 425,
-                'triple_kills': 890,
-                'quadro_kills': 180,
-                'penta_kills': 35
-            }
-        }
-
-        # Возвращаем данные для игрока или дефолтные
-        if player_id in players_stats:
-            return players_stats[player_id]
-        else:
-            # Общие данные для нового игрока
-            return {
-                'nickname': 'Player',
-                'faceit_elo': 1500,
-                'skill_level': 5,
-                'winrate': 50.0,
-                'total_matches': 500,
-                'total_wins': 250,
-                'total_losses': 250,
-                'kd_ratio': 1.25,
-                'average_kills': 6.5,
-                'average_deaths': 5.2,
-                'average_assists': 1.8,
-                'average_headshots': 45.0,
-                'total_headshots': 50000,
-                'longest_win_streak': 7,
-                'current_win_streak': 1,
-                'longest_lose_streak': 0,
-                'mvp': 25,
-                'triple_kills': 75,
-                'quadro_kills': 15,
-                'penta_kills': 2
-            }
-
-    def _get_default_stats(self):
-        """Возвращает статистику по умолчанию"""
-        return {
-            'winrate': 60.0,
-            'total_matches': 6760,
-            'total_wins': 4070,
-            'total_losses': 2690,
-            'kd_ratio': 1.43,
-            'average_kills': 7.0,
-            'average_deaths': 4.0,
-            'average_assists': 1.0,
-            'average_headshots': 60.0,
-            'total_headshots': 403610,
-            'longest_win_streak': 22,
-            'current_win_streak': 0,
-            'longest_lose_streak': 0,
-            'mvp': 0,
-            'triple_kills': 0,
-            'quadro_kills': 0,
-            'penta_kills': 0
-        }
-
     def get_player_ranking(self, player_id):
         """Получает рейтинг игрока (регион и страна) - БЕЗ #3 #2"""
         logger.info(f"📊 Получение рейтинга для игрока: {player_id}")
@@ -1298,32 +562,7 @@ class FaceitAPI:
         try:
             endpoint = f"/players/{player_id}/stats/{self.game}"
             data = self._smart_request(endpoint)
-
-            if not data:
-                # Возвращаем None вместо фиктивных рейтингов
-                return {'region_rank': None, 'country_rank': None}
-
-            region_rank = None
-            country_rank = None
-
-            segments = data.get('segments', [])
-            if segments and isinstance(segments, list):
-                for segment in segments:
-                    if isinstance(segment, dict):
-                        if segment.get('label') == 'Region' or segment.get('type') == 'region':
-                            position = segment.get('rank', {}).get('position')
-                            if position and position > 0:
-                                region_rank = position
-                        if segment.get('label') == 'Country' or segment.get('type') == 'country':
-                            position = segment.get('rank', {}).get('position')
-                            if position and position > 0:
-                                country_rank = position
-
-            # Возвращаем только если есть реальные данные
-            return {
-                'region_rank': int(region_rank) if region_rank else None,
-                'country_rank': int(country_rank) if country_rank else None
-            }
+            return self._parse_ranking(data)
 
         except Exception as e:
             logger.error(f"❌ Ошибка при получении рейтинга: {e}")
@@ -1359,8 +598,8 @@ class FaceitAPI:
             else:
                 logger.warning(f"⚠️ API не вернул данные для матчей {player_id}")
 
-            # Если нет данных от API, возвращаем реалистичные
-            if not data or 'items' not in data or not data['items']:
+            # API не ответил - демо-серия только для демо-игроков
+            if not data or 'items' not in data:
                 logger.warning(f"⚠️ Нет данных матчей, используем реалистичные")
                 return self._get_realistic_matches(player_id)
 
@@ -1377,30 +616,17 @@ class FaceitAPI:
 
                 if elo_delta is None:
                     # Способ 2: Пробуем получить результат из деталей матча
+                    result = None
                     match_id = match.get('match_id')
                     if match_id:
                         try:
                             match_details = self.get_match_details(match_id)
-                            if match_details:
-                                # Ищем игрока в командах и определяем результат
-                                for faction in ['faction1', 'faction2']:
-                                    team = match_details.get('teams', {}).get(faction, {})
-                                    players = team.get('roster', [])
-
-                                    for player in players:
-                                        if player.get('player_id') == player_id:
-                                            result = 'win' if team.get('winner') else 'loss'
-                                            recent_results.append('W' if result == 'win' else 'L')
-                                            logger.info(f"✅ Найден результат через детали: {result}")
-                                            break
-                                    if len(recent_results) > i:  # Если результат найден
-                                        break
+                            result = self._result_from_match_details(match_details, player_id)
                         except Exception as e:
                             logger.error(f"❌ Ошибка получения деталей матча: {e}")
 
                     # Если не определили результат
-                    if len(recent_results) <= i:
-                        recent_results.append('-')
+                    recent_results.append(result or '-')
 
                 elif elo_delta > 0:
                     recent_results.append('W')
@@ -1425,47 +651,146 @@ class FaceitAPI:
             logger.error(traceback.format_exc())
             return self._get_realistic_matches(player_id)
 
-    def _get_realistic_matches(self, player_id):
-        """Возвращает реалистичные последние матчи - всегда разные"""
-        logger.info(f"🎲 Используем реалистичные матчи для {player_id}")
+    def sync_match_history(self, player_id):
+        """Дописывает в таблицу matches только матчи новее последнего сохраненного.
 
-        import random
-        import time
+        В установившемся режиме это один маленький запрос с from=<последний finished_at>.
+        Страницы идут от новых к старым, поэтому сохраняем только окно, загруженное целиком:
+        иначе следующий from= перескочил бы через недогруженные страницы и в matches осталась бы дыра.
+        Возвращает число новых матчей.
+        """
+        endpoint = f"/players/{player_id}/history"
+        newest = self.match_history.newest_finished_at(player_id)
+        page_size = Config.MATCH_SYNC_PAGE_SIZE
 
-        # Используем player_id для генерации "случайной" последовательности
-        random.seed(player_id + str(int(time.time() // 3600)))  # Меняется каждый час
+        if newest:
+            params = {'game': self.game, 'from': newest + 1, 'limit': page_size}
+            max_pages = Config.MATCH_SYNC_MAX_PAGES
+        else:
+            # Первая синхронизация - берем только последние матчи, глубокую историю грузит backfill
+            params = {'game': self.game, 'limit': min(page_size, Config.MATCH_SYNC_INITIAL_MATCHES)}
+            max_pages = max(1, -(-Config.MATCH_SYNC_INITIAL_MATCHES // page_size))
+
+        items = []
+        # У первой синхронизации окно конечное (последние MATCH_SYNC_INITIAL_MATCHES) - все страницы полные тоже конец
+        complete = not newest
+        for page in range(max_pages):
+            data = self._smart_request(endpoint, dict(params, offset=page * params['limit']))
+            if data is None:
+                complete = False
+                break
+            page_items = data.get('items') or []
+            items.extend(page_items)
+            if len(page_items) < params['limit']:
+                complete = True
+                break
+
+        if not complete:
+            # Старое значение from= остается, следующая синхронизация повторит окно целиком
+            logger.warning(f"⚠️ История {player_id}: новые матчи загружены не полностью, не сохраняем")
+            return 0
+
+        # Статистику игрока (детали матча) берем только для самых свежих новых матчей
+        rows = self._history_rows(items, player_id)
+        added = self.match_history.save(rows)
+
+        self.match_history.synced_players += 1
+        if self.match_history.fill_stats(rows):
+            # Статистика дописана к уже учтенным матчам - дельтой не применить, пересчитываем
+            self.player_aggregates.rebuild(player_id)
+        else:
+            self.player_aggregates.ingest(player_id, rows)
+        if added:
+            logger.info(f"🗂️ История {player_id}: сохранено новых матчей {added}")
+        return added
 
-        # Разные паттерны для реализма
-        patterns = [
-            ['W', 'L', 'W', 'L', 'W'],  # Чередование
-            ['W', 'W', 'L', 'W', 'L'],  # Две победы подряд
-            ['L', 'W', 'W', 'L', 'W'],  # Середина сильная
-            ['W', 'L', 'L', 'W', 'W'],  # Конец сильный
-            ['L', 'L', 'W', 'W', 'L'],  # Начало слабое
-        ]
+    def sync_history_once(self, player_id):
+        """Синхронизация истории один раз на запрос к сайту.
 
-        # Выбираем паттерн на основе player_id
-        pattern_index = hash(player_id) % len(patterns)
-        matches = patterns[pattern_index]
+        Секции профиля (статистика, последние матчи, форма) грузятся параллельно: синхронизирует
+        первая, остальные ждут ее (singleflight по player_id) и дальше только читают таблицы.
+        """
+        memo = current_memo()
+        memo_key = f"history_sync:{player_id}"
+        if memo is not None and memo.completed(memo_key):
+            return 0
+
+        added = self.history_syncs.do(player_id, lambda: self.sync_match_history(player_id))
+        if memo is not None:
+            memo.complete(memo_key)
+        return added
+
+    def _history_rows(self, items, player_id):
+        """Элементы истории -> строки matches, свежим (до MATCH_SYNC_DETAILS) добавляется статистика из деталей"""
+        rows = [normalize_history_item(item, player_id, self.game) for item in items]
+        detailed = self._map_match_items(lambda row, _: with_match_stats(row, self.get_match_details(row['match_id'])),
+                                         rows[:Config.MATCH_SYNC_DETAILS], player_id)
+        # Упавшие загрузки деталей не теряем - матч сохранится без статистики
+        fetched = {row['match_id']: row for row in detailed}
+        return [fetched.get(row['match_id'], row) for row in rows]
+
+    def get_player_form(self, player_id):
+        """Форма по всем сохраненным матчам: окна последних 5/10/20/50/100, скользящие K/D и винрейт, тренды"""
+        try:
+            self.sync_history_once(player_id)
+        except Exception as e:
+            logger.error(f"❌ Ошибка синхронизации истории матчей: {e}")
 
-        # Немного рандомизируем
-        for i in range(len(matches)):
-            if random.random() < 0.2:  # 20% chance to change
-                matches[i] = 'W' if matches[i] == 'L' else 'L'
+        columns = self.match_history.columns(player_id)
+        if not len(columns):
+            return None
+        return form_stats(columns)
 
-        logger.info(f"🎲 Сгенерированные матчи: {' '.join(matches)}")
-        return matches
+    def get_aggregate_stats(self, player_id, full_history=False):
+        """Статистика из player_stats (одна строка), None - для игрока еще нет матчей со статистикой.
 
-    def _get_realistic_matches(self, player_id):
-        """Возвращает реалистичные последние матчи"""
-        # Разные последовательности для разных игроков
-        matches_patterns = {
-            '7c389101-3bd4-416d-a06d-a7b21398b220': ['W', 'L', 'W', 'L', 'W'],  # Daniil Finch
-            'e5e8e2a6-d716-4493-b949-e16965f41654': ['W', 'W', 'L', 'L', 'L'],  # donk666
-            '09045993-d578-475c-b4e0-e107ce787606': ['W', 'W', 'W', 'L', 'W'],  # s1mple
-        }
+        С full_history - только если в matches загружена вся история игрока (backfill).
+        """
+        if full_history:
+            row = self.player_aggregates.get(player_id)
+            if not row or not row['full_history']:
+                return None
 
-        return matches_patterns.get(player_id, ['W', 'L', 'W', 'L', '-'])
+        self._sync_history_quietly(player_id)
+        return self._stored_stats(player_id, full_history)
+
+    def _sync_history_quietly(self, player_id):
+        try:
+            self.sync_history_once(player_id)
+        except Exception as e:
+            logger.error(f"❌ Ошибка синхронизации истории матчей: {e}")
+
+    def get_recent_matches_local(self, player_id, limit=5):
+        """Последние игры (W/L) из локальной таблицы matches после инкрементальной синхронизации"""
+        try:
+            self.sync_history_once(player_id)
+            rows = self.match_history.recent(player_id, limit)
+        except Exception as e:
+            logger.error(f"❌ Ошибка синхронизации истории матчей: {e}")
+            rows = []
+
+        if not rows:
+            return self.get_recent_matches_fixed(player_id, limit)
+
+        recent_results = []
+        resolved = False
+        for row in rows:
+            result = row['result']
+            if not result:
+                # Результат не понятен из истории - смотрим детали матча и запоминаем
+                result = self._result_from_match_details(self.get_match_details(row['match_id']), player_id)
+                if result:
+                    self.match_history.set_result(row['match_id'], player_id, result)
+                    resolved = True
+            recent_results.append(result or '-')
+
+        # Матч уже учтен в player_stats без результата - серии и победы пересчитываем
+        if resolved:
+            self.player_aggregates.rebuild(player_id)
+
+        while len(recent_results) < limit:
+            recent_results.append('-')
+        return recent_results
 
     def get_player_elo_history(self, player_id):
         """
@@ -1473,26 +798,26 @@ class FaceitAPI:
         """
         try:
             # Эндпоинт для истории ELO (проверьте актуальность в документации FACEIT)
-            url = f"{self.base_url}/players/{player_id}/history"
+            endpoint = f"/players/{player_id}/history"
             params = {
-                'game': 'cs2',
+                'game': self.game,
+                'offset': 0,
                 'limit': 20  # Последние 20 матчей для истории
             }
 
-            response = requests.get(url, headers=self.headers, params=params, timeout=10)
-
-            if response.status_code == 200:
-                data = response.json()
-                # Извлекаем значения ELO из истории матчей
-                elo_history = []
-                for item in data.get('items', []):
-                    if 'elo' in item:
-                        elo_history.append(item['elo'])
-                return elo_history if elo_history else None
-            else:
-                logger.warning(f"⚠️ Не удалось получить историю ELO: {response.status_code}")
+            # Через кэш и предохранитель, как остальные запросы истории
+            data = self._smart_request(endpoint, params)
+            if not data:
+                logger.warning(f"⚠️ Не удалось получить историю ELO: {player_id}")
                 return None
 
+            # Извлекаем значения ELO из истории матчей
+            elo_history = []
+            for item in data.get('items', []):
+                if 'elo' in item:
+                    elo_history.append(item['elo'])
+            return elo_history if elo_history else None
+
         except Exception as e:
             logger.error(f"❌ Ошибка при получении истории ELO: {e}")
             return None
@@ -1512,14 +837,86 @@ class FaceitAPI:
 
         matches = []
         if data and 'items' in data:
-            for item in data['items']:
-                match = self._process_match(item, player_id)
-                if match:
-                    matches.append(match)
-                time.sleep(0.1)
+            matches = self._map_match_items(self._process_match, data['items'], player_id)
 
         return matches
 
+    def iter_matches(self, player_id, since=None, until=None, with_details=False, page_size=None):
+        """Ленивый обход всей истории матчей игрока, от новых к старым.
+
+        since/until - datetime или unix-время. Страницы идут окнами по времени (to = самый
+        старый матч страницы включительно, offset - сколько матчей этой секунды уже выдано;
+        повторы все равно отсекаются по match_id), следующая грузится в фоне, пока обрабатывается текущая.
+        В памяти не больше двух страниц; если перестать итерировать, загрузка останавливается.
+        С with_details у каждого матча есть ключ 'details' (детали из /matches/{id}).
+
+        Если страницу получить не удалось, бросает APIUnavailableError (уже выданные матчи остаются
+        у потребителя) - обрыв истории не выглядит как ее конец.
+        """
+        since = int(since.timestamp()) if isinstance(since, datetime) else (since or 0)
+        until = int(until.timestamp()) if isinstance(until, datetime) else until
+        page_size = page_size or Config.MATCH_SYNC_PAGE_SIZE
+
+        def fetch(to, offset=0):
+            ctx = contextvars.copy_context()
+            return self.page_executor.submit(ctx.run, self._history_page, player_id, since, to, page_size, offset)
+
+        to = until
+        pending = fetch(to)
+        # match_id уже выданных матчей секунды to: окно включительно, они первыми придут и на следующей странице
+        boundary = set()
+        try:
+            while pending is not None:
+                page = pending.result()
+                pending = None
+                if page is None:
+                    raise APIUnavailableError(f"/players/{player_id}/history")
+
+                items = [item for item in page if item.get('match_id') not in boundary]
+                if not items:
+                    return
+
+                # Следующую страницу грузим, пока потребитель разбирает текущую
+                oldest = min((item['finished_at'] for item in page if item.get('finished_at')), default=None)
+                if len(page) == page_size and oldest:
+                    same_second = {item.get('match_id') for item in page if item.get('finished_at') == oldest}
+                    boundary = boundary | same_second if oldest == to else same_second
+                    to = oldest
+                    pending = fetch(to, len(boundary))
+
+                if with_details:
+                    # details=None у матча без деталей, чтобы элементы не сдвигались относительно деталей
+                    items = self._map_match_items(
+                        lambda item, _: dict(item, details=self.get_match_details(item['match_id'])),
+                        items, player_id)
+
+                for item in items:
+                    yield item
+        finally:
+            if pending is not None:
+                pending.cancel()
+
+    def _history_page(self, player_id, since=0, until=None, limit=100, offset=0):
+        """Одна страница истории в окне [since, until] без записи в кэш (глубокая история туда не нужна).
+
+        None - страницу получить не удалось; [] - API подтвердил, что матчей в окне нет.
+        """
+        params = {'game': self.game, 'from': since, 'offset': offset, 'limit': limit}
+        if until:
+            params['to'] = until
+
+        response_meta = {}
+        try:
+            data = self._fetch_json(f"/players/{player_id}/history", params, response_meta=response_meta)
+        except CircuitOpenError:
+            logger.warning(f"⚠️ API недоступен, история {player_id} прервана")
+            return None
+
+        if data is None:
+            return None if response_meta['error'] else []
+        self.identities.observe_payload(data)
+        return data.get('items') or []
+
     def _process_match(self, match_item, player_id):
         """Обработка данных матча"""
         try:
@@ -1560,9 +957,17 @@ class FaceitAPI:
             return None
 
     def get_match_details(self, match_id):
-        """Детали матча"""
+        """Детали матча: сначала локальное хранилище, из API - только один раз"""
+        match_data = self.match_store.get(match_id)
+        if match_data is not None:
+            return match_data
+
         endpoint = f"/matches/{match_id}"
-        return self._smart_request(endpoint)
+        match_data = self._smart_request(endpoint)
+
+        if match_data:
+            self.match_store.put(match_id, match_data)
+        return match_data
 
     def test_connection(self):
         """Тест соединения"""
@@ -0,0 +1,358 @@
+# faceit_common.py - Общее для FaceitAPI и AsyncFaceitAPI: разбор ответов API, запасные данные, TTL кэша
+import logging
+from singleflight import request_key
+from cache import endpoint_ttl, endpoint_class
+from activity import PLAYER_SCOPED_CLASSES, endpoint_player_id
+from player_aggregates import empty_aggregate, aggregate_summary
+
+logger = logging.getLogger(__name__)
+
+
+class FaceitCommon:
+    """Методы без сетевых запросов, одинаковые для синхронного и асинхронного клиента.
+
+    Клиент задает self.game, self.cache, self.activity и self.player_aggregates.
+    Методы, которые читают или пишут SQLite, асинхронный клиент вызывает через asyncio.to_thread.
+    """
+
+    def _cache_ttl(self, endpoint):
+        """TTL записи кэша: для данных игрока - по его активности, для остального - по классу endpoint'а"""
+        ttl = endpoint_ttl(endpoint)
+        if ttl and endpoint_class(endpoint) in PLAYER_SCOPED_CLASSES:
+            return self.activity.ttl_for(endpoint_player_id(endpoint), ttl)
+        return ttl
+
+    def _remember_player_payload(self, data):
+        """Полный профиль из поиска кладем в кэш /players/{id}, чтобы не запрашивать его повторно"""
+        endpoint = f"/players/{data['player_id']}"
+        ttl = self._cache_ttl(endpoint)
+        if ttl:
+            self.cache.set(request_key(endpoint, None), data, ttl)
+
+    def _pick_search_match(self, data, nickname):
+        """Выбирает из результатов поиска точное совпадение ника, иначе первое частичное"""
+        if not data or 'items' not in data or not data['items']:
+            return None
+
+        items = data['items']
+
+        for player in items:
+            if player.get('nickname', '').lower() == nickname.lower():
+                return player
+
+        for player in items:
+            if nickname.lower() in player.get('nickname', '').lower():
+                return player
+
+        return None
+
+    def _basic_player_data(self, player_data):
+        """Минимальные данные игрока из результата поиска"""
+        return {
+            'player_id': player_data.get('player_id'),
+            'nickname': player_data.get('nickname', 'Unknown'),
+            'country': player_data.get('country', ''),
+            'avatar': player_data.get('avatar', ''),
+            'skill_level': 1,
+            'faceit_elo': 1000,
+            'game': self.game,
+            'faceit_url': f"https://www.faceit.com/players/{player_data.get('nickname', '')}"
+        }
+
+    def _build_player_result(self, data):
+        """Приводит ответ /players/{id} к формату, который ждут шаблоны"""
+        games = data.get('games', {})
+        cs2_data = games.get('cs2') or games.get('csgo')
+
+        result = {
+            'player_id': data.get('player_id'),
+            'nickname': data.get('nickname', 'Unknown'),
+            'country': data.get('country', 'Unknown'),
+            'avatar': data.get('avatar', ''),
+            'steam_id_64': data.get('steam_id_64', ''),
+            'membership': data.get('membership', 'free'),
+            'verified': data.get('verified', False),
+            'faceit_url': f"https://www.faceit.com/players/{data.get('nickname', '')}",
+            'raw_data': data
+        }
+
+        if cs2_data:
+            result['faceit_elo'] = cs2_data.get('faceit_elo', 0)
+            result['skill_level'] = cs2_data.get('skill_level', 0)
+            result['game'] = 'cs2'
+            logger.info(f"✅ Установлен ELO: {result['faceit_elo']}, Уровень: {result['skill_level']}")
+        else:
+            result['faceit_elo'] = 0
+            result['skill_level'] = 0
+            result['game'] = self.game
+            logger.warning("⚠️ Не найдены данные CS2")
+
+        return result
+
+    def _parse_player_stats(self, data, player_id):
+        """Разбирает ответ /players/{id}/stats/{game}"""
+        try:
+            # Если API не вернул данные
+            if not data:
+                logger.error(f"❌ API не вернул статистику для {player_id}")
+                return self._get_realistic_stats(player_id)
+
+            logger.info(f"✅ API вернул данные. Структура: {data.keys()}")
+
+            # Вариант 1: Данные в формате с 'lifetime'
+            if 'lifetime' in data:
+                lifetime = data['lifetime']
+                logger.info(f"📊 Найден 'lifetime' с {len(lifetime)} полями")
+                return self._parse_lifetime_stats(lifetime, player_id)
+
+            # Вариант 2: Данные в другом формате
+            elif 'segments' in data:
+                logger.info(f"📊 Найден 'segments' с {len(data['segments'])} сегментами")
+                return self._parse_segments_stats(data['segments'], player_id)
+
+            # Вариант 3: Неизвестный формат
+            else:
+                logger.warning(f"⚠️ Неизвестный формат данных API: {data.keys()}")
+                return self._get_realistic_stats(player_id)
+
+        except Exception as e:
+            logger.error(f"❌ Ошибка при получении статистики: {e}")
+            import traceback
+            logger.error(traceback.format_exc())
+            return self._get_realistic_stats(player_id)
+
+    def _parse_lifetime_stats(self, lifetime_data, player_id):
+        """Парсит статистику из формата lifetime"""
+        try:
+            # Функции для безопасного извлечения данных
+            def get_float(key, default=0.0):
+                value = lifetime_data.get(key)
+                if isinstance(value, str):
+                    value = value.replace('%', '').replace(',', '.').strip()
+                try:
+                    return float(value) if value else default
+                except:
+                    return default
+
+            def get_int(key, default=0):
+                value = lifetime_data.get(key)
+                try:
+                    return int(value) if value else default
+                except:
+                    return default
+
+            # Основная статистика
+            stats = {
+                'winrate': get_float('Win Rate %', ),
+                'total_matches': get_int('Matches', ),
+                'total_wins': get_int('Wins', ),
+                'total_losses': get_int('Lost', ),
+                'kd_ratio': get_float('K/D Ratio', ),
+                'average_kills': get_float('Average Kills', ),
+                'average_deaths': get_float('Average Deaths', ),
+                'average_assists': get_float('Average Assists', ),
+                'average_headshots': get_float('Average Headshots %', ),
+                'total_headshots': get_int('Total Headshots %', ),
+                'longest_win_streak': get_int('Longest Win Streak', ),
+                'current_win_streak': get_int('Current Win Streak', ),
+                'longest_lose_streak': get_int('Longest Lose Streak', ),
+                'mvp': get_int('MVPs', ),
+                'triple_kills': get_int('Triple Kills', ),
+                'quadro_kills': get_int('Quadro Kills', ),
+                'penta_kills': get_int('Penta Kills', )
+            }
+
+            # Исправляем K/D если нереальный
+            if stats['kd_ratio'] > 10 or stats['kd_ratio'] == 0:
+                if stats['average_deaths'] > 0:
+                    stats['kd_ratio'] = round(stats['average_kills'] / stats['average_deaths'], 2)
+                else:
+                    stats['kd_ratio'] = 1.43
+
+            # Если винрейт 0, но есть матчи и победы
+            if stats['winrate'] == 0 and stats['total_matches'] > 0 and stats['total_wins'] > 0:
+                stats['winrate'] = round((stats['total_wins'] / stats['total_matches']) * 100, 1)
+
+            logger.info(f"✅ Парсинг статистики: K/D={stats['kd_ratio']}, Winrate={stats['winrate']}%")
+            return stats
+
+        except Exception as e:
+            logger.error(f"❌ Ошибка парсинга lifetime: {e}")
+            return self._get_realistic_stats(player_id)
+
+    def _get_realistic_stats(self, player_id):
+        """Статистика без API: из сохраненных матчей, для демо-игроков - демо-данные, иначе None"""
+        # Есть сохраненные матчи со статистикой - настоящие значения из player_stats (одна строка)
+        known = self.player_aggregates.get(player_id)
+        if known and known['detailed_matches']:
+            logger.info(f"📊 API недоступен, статистика {player_id} из сохраненных матчей")
+            return aggregate_summary(known)
+
+        logger.info(f"📊 Используем реалистичные демо-данные для {player_id}")
+
+        # Данные для разных игроков
+        players_stats = {
+            # Daniil Finch
+            '7c389101-3bd4-416d-a06d-a7b21398b220': {
+                'nickname': 'Daniil Finch',
+                'faceit_elo': 1437,
+                'skill_level': 7,
+                'winrate': 50.0,
+                'total_matches': 526,
+                'total_wins': 265,
+                'total_losses': 261,
+                'kd_ratio': 1.43,
+                'average_kills': 7.0,
+                'average_deaths': 4.0,
+                'average_assists': 1.0,
+                'average_headshots': 42.0,
+                'total_headshots': 52560,
+                'longest_win_streak': 9,
+                'current_win_streak': 1,
+                'longest_lose_streak': 0,
+                'mvp': 52,
+                'triple_kills': 125,
+                'quadro_kills': 25,
+                'penta_kills': 3
+            },
+            # donk666
+            'e5e8e2a6-d716-4493-b949-e16965f41654': {
+                'nickname': 'donk666',
+                'faceit_elo': 4387,
+                'skill_level': 10,
+                'winrate': 60.0,
+                'total_matches': 6760,
+                'total_wins': 4070,
+                'total_losses': 2690,
+                'kd_ratio': 1.43,
+                'average_kills': 7.0,
+                'average_deaths': 4.0,
+                'average_assists': 1.0,
+                'average_headshots': 60.0,
+                'total_headshots': 403610,
+                'longest_win_streak': 22,
+                'current_win_streak': 0,
+                'longest_lose_streak': 0,
+                'mvp': 675,
+                'triple_kills': 1250,
+                'quadro_kills': 250,
+                'penta_kills': 50
+            },
+            # s1mple
+            '09045993-d578-475c-b4e0-e107ce787606': {
+                'nickname': 'S1mple--__--',
+                'faceit_elo': 2100,
+                'skill_level': 10,
+                'winrate': 55.0,
+                'total_matches': 3250,
+                'total_wins': 1788,
+                'total_losses': 1462,
+                'kd_ratio': 1.62,
+                'average_kills': 8.5,
+                'average_deaths': 5.2,
+                'average_assists': 2.1,
+                'average_headshots': 48.5,
+                'total_headshots': 254300,
+                'longest_win_streak': 15,
+                'current_win_streak': 2,
+                'longest_lose_streak': 0,
+                'mvp': 425,
+                'triple_kills': 890,
+                'quadro_kills': 180,
+                'penta_kills': 35
+            }
+        }
+
+        # Демо-данные есть только у демо-игроков, остальным статистику не выдумываем
+        if player_id not in players_stats:
+            logger.warning(f"⚠️ Статистики {player_id} нет ни в API, ни в сохраненных матчах")
+            return None
+        stats = players_stats[player_id]
+
+        # Серии не выдумываем: только по сохраненным результатам матчей, без них - нули
+        known = known or empty_aggregate(player_id)
+        stats['longest_win_streak'] = known['longest_win_streak']
+        stats['current_win_streak'] = max(known['current_streak'], 0)
+        stats['longest_lose_streak'] = known['longest_lose_streak']
+        return stats
+
+    def _parse_ranking(self, data):
+        """Достает позиции в регионе и стране из сегментов статистики"""
+        try:
+            if not data:
+                # Возвращаем None вместо фиктивных рейтингов
+                return {'region_rank': None, 'country_rank': None}
+
+            region_rank = None
+            country_rank = None
+
+            segments = data.get('segments', [])
+            if segments and isinstance(segments, list):
+                for segment in segments:
+                    if isinstance(segment, dict):
+                        if segment.get('label') == 'Region' or segment.get('type') == 'region':
+                            position = segment.get('rank', {}).get('position')
+                            if position and position > 0:
+                                region_rank = position
+                        if segment.get('label') == 'Country' or segment.get('type') == 'country':
+                            position = segment.get('rank', {}).get('position')
+                            if position and position > 0:
+                                country_rank = position
+
+            # Возвращаем только если есть реальные данные
+            return {
+                'region_rank': int(region_rank) if region_rank else None,
+                'country_rank': int(country_rank) if country_rank else None
+            }
+
+        except Exception as e:
+            logger.error(f"❌ Ошибка при получении рейтинга: {e}")
+            # Возвращаем None вместо фиктивных значений
+            return {'region_rank': None, 'country_rank': None}
+
+    def _result_from_match_details(self, match_details, player_id):
+        """Определяет W/L игрока по деталям матча, None если игрока там нет"""
+        if not match_details:
+            return None
+
+        # Ищем игрока в командах и определяем результат
+        for faction in ['faction1', 'faction2']:
+            team = match_details.get('teams', {}).get(faction, {})
+            players = team.get('roster', [])
+
+            for player in players:
+                if player.get('player_id') == player_id:
+                    result = 'win' if team.get('winner') else 'loss'
+                    logger.info(f"✅ Найден результат через детали: {result}")
+                    return 'W' if result == 'win' else 'L'
+
+        return None
+
+    def _get_realistic_matches(self, player_id):
+        """Последние матчи демо-игроков; для остальных None - серию не выдумываем"""
+        # Разные последовательности для разных игроков
+        matches_patterns = {
+            '7c389101-3bd4-416d-a06d-a7b21398b220': ['W', 'L', 'W', 'L', 'W'],  # Daniil Finch
+            'e5e8e2a6-d716-4493-b949-e16965f41654': ['W', 'W', 'L', 'L', 'L'],  # donk666
+            '09045993-d578-475c-b4e0-e107ce787606': ['W', 'W', 'W', 'L', 'W'],  # s1mple
+        }
+
+        return matches_patterns.get(player_id)
+
+    def _stored_stats(self, player_id, full_history=False):
+        """Статистика из player_stats (одна строка), None - матчей со статистикой еще нет.
+
+        С full_history - только если в matches загружена вся история игрока (backfill).
+        """
+        row = self.player_aggregates.get(player_id)
+        if not row or not row['detailed_matches'] or (full_history and not row['full_history']):
+            return None
+        return aggregate_summary(row)
+
+    def _stats_from_response(self, data, player_id):
+        """Ответ /players/{id}/stats/{game} -> статистика; API не ответил - сохраненные матчи лучше демо-данных"""
+        if not data:
+            stats = self._stored_stats(player_id)
+            if stats:
+                return stats
+        return self._parse_player_stats(data, player_id)
@@ -0,0 +1,206 @@
+# http_client.py - Общий пул keep-alive соединений для всех запросов к API
+import socket
+import weakref
+import itertools
+import threading
+import logging
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectionStats:
+    """Счетчики переиспользования соединений пула: по каждому открытому соединению и итоги по хостам.
+
+    Соединение в словаре живет, пока открыт его сокет: при закрытии его счетчики сворачиваются
+    в итоги хоста и запись удаляется, так что записей не больше, чем соединений в пуле.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._open = {}
+        self._hosts = {}
+
+    def register(self, conn):
+        return next(self._ids)
+
+    def _entry(self, conn_id, host):
+        """Запись открытого соединения (вызывать под блокировкой); новый сокет - новая запись"""
+        entry = self._open.get(conn_id)
+        if entry is None:
+            entry = self._open[conn_id] = {'id': conn_id, 'host': host, 'handshakes': 0, 'requests': 0}
+        return entry
+
+    def record_connect(self, conn_id, host):
+        with self._lock:
+            self._entry(conn_id, host)['handshakes'] += 1
+
+    def record_request(self, conn_id, host):
+        with self._lock:
+            self._entry(conn_id, host)['requests'] += 1
+
+    def record_close(self, conn_id):
+        with self._lock:
+            entry = self._open.pop(conn_id, None)
+            if entry is not None:
+                totals = self._host_totals(entry['host'])
+                totals['connections'] += 1
+                totals['handshakes'] += entry['handshakes']
+                totals['requests'] += entry['requests']
+
+    def _host_totals(self, host):
+        return self._hosts.setdefault(host, {'host': host, 'connections': 0, 'handshakes': 0, 'requests': 0})
+
+    def snapshot(self):
+        """Сводка: сколько было рукопожатий и сколько запросов ушло по уже открытым соединениям"""
+        with self._lock:
+            connections = [dict(c) for c in self._open.values()]
+            hosts = {host: dict(h) for host, h in self._hosts.items()}
+
+        for c in connections:
+            c['reused'] = max(0, c['requests'] - c['handshakes'])
+            totals = hosts.setdefault(c['host'], {'host': c['host'], 'connections': 0, 'handshakes': 0, 'requests': 0})
+            totals['connections'] += 1
+            totals['handshakes'] += c['handshakes']
+            totals['requests'] += c['requests']
+
+        hosts = list(hosts.values())
+        for h in hosts:
+            h['reused'] = max(0, h['requests'] - h['handshakes'])
+
+        handshakes = sum(h['handshakes'] for h in hosts)
+        total_requests = sum(h['requests'] for h in hosts)
+        reused = max(0, total_requests - handshakes)
+
+        return {
+            'connections': sum(h['connections'] for h in hosts),
+            'open_connections': len(connections),
+            'handshakes': handshakes,
+            'requests': total_requests,
+            'reused_requests': reused,
+            'reuse_ratio': round(reused / total_requests, 3) if total_requests else 0.0,
+            'per_connection': connections,
+            'per_host': hosts
+        }
+
+
+connection_stats = ConnectionStats()
+
+
+class _CountingConnectionMixin:
+    """Считает рукопожатия и запросы каждого соединения пула; закрытое соединение уходит в итоги хоста"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_id = connection_stats.register(self)
+        # Соединение, которое выбросили без close(), тоже сворачиваем в итоги
+        weakref.finalize(self, connection_stats.record_close, self._stats_id)
+
+    def connect(self):
+        connection_stats.record_connect(self._stats_id, self.host)
+        return super().connect()
+
+    def request(self, *args, **kwargs):
+        connection_stats.record_request(self._stats_id, self.host)
+        return super().request(*args, **kwargs)
+
+    def close(self):
+        # urllib3 может снова открыть этот же объект - счетчики нового сокета начнутся с нуля
+        connection_stats.record_close(self._stats_id)
+        return super().close()
+
+
+class _CountingHTTPConnection(_CountingConnectionMixin, HTTPConnection):
+    pass
+
+
+class _CountingHTTPSConnection(_CountingConnectionMixin, HTTPSConnection):
+    pass
+
+
+class _CountingHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _CountingHTTPConnection
+
+
+class _CountingHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _CountingHTTPSConnection
+
+
+class PooledAdapter(HTTPAdapter):
+    """HTTPAdapter с пулом соединений, TCP keep-alive и счетчиками"""
+
+    def __init__(self, keep_alive=True, **kwargs):
+        self.keep_alive = keep_alive
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
+        if self.keep_alive:
+            pool_kwargs['socket_options'] = HTTPConnection.default_socket_options + [
+                (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+            ]
+        super().init_poolmanager(connections, maxsize, block=block, **pool_kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _CountingHTTPConnectionPool,
+            'https': _CountingHTTPSConnectionPool
+        }
+
+    # pickle/копирование адаптера requests восстанавливает только свои атрибуты
+    __attrs__ = HTTPAdapter.__attrs__ + ['keep_alive']
+
+
+class PooledHTTPClient:
+    """Потокобезопасный HTTP клиент поверх одной requests.Session с пулом соединений"""
+
+    def __init__(self, pool_connections=None, pool_maxsize=None, pool_block=None, keep_alive=None):
+        self.pool_connections = pool_connections or Config.HTTP_POOL_CONNECTIONS
+        self.pool_maxsize = pool_maxsize or Config.HTTP_POOL_MAXSIZE
+        self.pool_block = Config.HTTP_POOL_BLOCK if pool_block is None else pool_block
+        self.keep_alive = Config.HTTP_KEEP_ALIVE if keep_alive is None else keep_alive
+
+        self.session = requests.Session()
+        adapter = PooledAdapter(
+            keep_alive=self.keep_alive,
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            pool_block=self.pool_block
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers['Connection'] = 'keep-alive' if self.keep_alive else 'close'
+
+        logger.info(f"🔌 HTTP пул: хостов={self.pool_connections}, "
+                    f"соединений на хост={self.pool_maxsize}, keep-alive={self.keep_alive}")
+
+    def get(self, url, **kwargs):
+        """GET запрос через общий пул"""
+        return self.session.get(url, **kwargs)
+
+    def stats(self):
+        """Статистика переиспользования соединений"""
+        stats = connection_stats.snapshot()
+        stats['pool_connections'] = self.pool_connections
+        stats['pool_maxsize'] = self.pool_maxsize
+        stats['keep_alive'] = self.keep_alive
+        return stats
+
+    def close(self):
+        self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_http_client():
+    """Возвращает общий для процесса HTTP клиент"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = PooledHTTPClient()
+    return _client
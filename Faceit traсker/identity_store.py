@@ -0,0 +1,249 @@
+# identity_store.py - Граф идентичностей игроков (faceit id, ники, Steam ID, vanity имена Steam)
+import re
+import time
+import threading
+import logging
+from collections import OrderedDict
+from database import get_db, create_identity_tables
+from negative_cache import get_negative_cache
+
+logger = logging.getLogger(__name__)
+
+STEAM_ID_RE = re.compile(r'^\d{17}$')
+
+# Сколько уже записанных игроков помним в памяти, чтобы не переписывать их на каждом ответе
+KNOWN_PLAYERS_LIMIT = 50000
+
+
+def is_steam_id(value):
+    return bool(value) and bool(STEAM_ID_RE.match(str(value)))
+
+
+def confirm_owner(identifier, player, find_owner):
+    """Игрок из графа идентичностей или текущий владелец ника, если ник уже не его.
+
+    Граф помнит последнего известного владельца ника. Steam ID за аккаунтом закреплен, а текущий
+    ник уникален - тогда подтверждать нечего. Иначе ник старый, и его мог занять кто-то, кого
+    в графе еще нет: верим find_owner(identifier) - точному поиску по нику (игрок или None).
+    """
+    if is_steam_id(identifier) or (player.get('nickname') or '').lower() == identifier.lower():
+        return player
+
+    owner = find_owner(identifier)
+    if owner and owner.get('player_id') and owner['player_id'] != player['player_id']:
+        logger.info(f"🔄 Ник '{identifier}' теперь у другого игрока: {owner['player_id']}")
+        return owner
+    return player
+
+
+def _payload_steam_id(data):
+    """Steam ID из объекта игрока: steam_id_64, game_player_id или games.cs2/csgo"""
+    for value in (data.get('steam_id_64'), data.get('game_player_id')):
+        if is_steam_id(value):
+            return str(value)
+
+    games = data.get('games')
+    if isinstance(games, dict):
+        for game in ('cs2', 'csgo'):
+            value = (games.get(game) or {}).get('game_player_id')
+            if is_steam_id(value):
+                return str(value)
+    return None
+
+
+def collect_identities(payload):
+    """Все (player_id, nickname, steam_id_64) из ответа API: профили, поиск, история, составы матчей"""
+    found = {}
+    stack = [payload]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(node)
+            continue
+        if not isinstance(node, dict):
+            continue
+
+        player_id = node.get('player_id')
+        if player_id and isinstance(player_id, str):
+            nickname = node.get('nickname') if isinstance(node.get('nickname'), str) else None
+            steam_id = _payload_steam_id(node)
+            if nickname or steam_id:
+                known_nick, known_steam = found.get(player_id, (None, None))
+                found[player_id] = (nickname or known_nick, steam_id or known_steam)
+
+        for value in node.values():
+            if isinstance(value, (dict, list)):
+                stack.append(value)
+
+    return [(player_id, nick, steam) for player_id, (nick, steam) in found.items()]
+
+
+class IdentityStore:
+    """Любой идентификатор игрока -> player_id одним индексным запросом, без похода в API"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._known = OrderedDict()
+        self.lookups = 0
+        self.hits = 0
+        self.written = 0
+        create_identity_tables()
+
+    # ---------- Запись ----------
+
+    def observe_payload(self, payload):
+        """Запоминает всех игроков, встреченных в ответе API"""
+        try:
+            self.observe_players(collect_identities(payload))
+        except Exception as e:
+            logger.error(f"❌ Ошибка записи идентичностей: {e}")
+
+    def observe_players(self, players):
+        """players - список (player_id, nickname, steam_id_64); пишем только новое или изменившееся"""
+        get_negative_cache().discard_many(
+            [nick for _, nick, _ in players if nick] + [steam for _, _, steam in players if steam])
+
+        with self._lock:
+            fresh = [p for p in players if self._known.get(p[0]) != (p[1], p[2])]
+            if not fresh:
+                return
+
+            now = time.time()
+            conn = get_db()
+            try:
+                conn.executemany('''
+                    INSERT INTO identity_players (player_id, nickname, steam_id_64, updated_at)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT (player_id) DO UPDATE SET
+                        nickname = COALESCE(excluded.nickname, nickname),
+                        steam_id_64 = COALESCE(excluded.steam_id_64, steam_id_64),
+                        updated_at = excluded.updated_at
+                ''', [(player_id, nick, steam, now) for player_id, nick, steam in fresh])
+                conn.executemany('''
+                    INSERT INTO identity_nicknames (nickname_lower, player_id, nickname, first_seen, last_seen)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT (nickname_lower, player_id) DO UPDATE SET
+                        nickname = excluded.nickname,
+                        last_seen = excluded.last_seen
+                ''', [(nick.lower(), player_id, nick, now, now) for player_id, nick, _ in fresh if nick])
+                conn.commit()
+            finally:
+                conn.close()
+
+            for player_id, nick, steam in fresh:
+                self._known[player_id] = (nick, steam)
+                self._known.move_to_end(player_id)
+            while len(self._known) > KNOWN_PLAYERS_LIMIT:
+                self._known.popitem(last=False)
+            self.written += len(fresh)
+
+    def observe_vanity(self, vanity_name, steam_id_64):
+        """Связь vanity имени Steam (steamcommunity.com/id/<имя>) со Steam ID"""
+        if not vanity_name or not is_steam_id(steam_id_64):
+            return
+        conn = get_db()
+        try:
+            conn.execute('''
+                INSERT OR REPLACE INTO identity_vanity (vanity_lower, steam_id_64, updated_at)
+                VALUES (?, ?, ?)
+            ''', (vanity_name.lower(), str(steam_id_64), time.time()))
+            conn.commit()
+        finally:
+            conn.close()
+
+    # ---------- Чтение ----------
+
+    def _lookup(self, query, params):
+        conn = get_db()
+        try:
+            row = conn.execute(query, params).fetchone()
+        finally:
+            conn.close()
+        with self._lock:
+            self.lookups += 1
+            if row is not None:
+                self.hits += 1
+        return dict(row) if row is not None else None
+
+    def resolve_nickname(self, nickname):
+        """Ник (без учета регистра, в том числе старый) -> текущие данные игрока"""
+        if not nickname:
+            return None
+        # Если ник занят другим игроком после переименования - приоритет у текущего владельца
+        return self._lookup('''
+            SELECT p.player_id, p.nickname, p.steam_id_64
+            FROM identity_nicknames n JOIN identity_players p ON p.player_id = n.player_id
+            WHERE n.nickname_lower = ?
+            ORDER BY (LOWER(p.nickname) = n.nickname_lower) DESC, n.last_seen DESC
+            LIMIT 1
+        ''', (nickname.strip().lower(),))
+
+    def resolve_steam_id(self, steam_id_64):
+        if not is_steam_id(steam_id_64):
+            return None
+        return self._lookup('''
+            SELECT player_id, nickname, steam_id_64 FROM identity_players
+            WHERE steam_id_64 = ? ORDER BY updated_at DESC LIMIT 1
+        ''', (str(steam_id_64),))
+
+    def resolve_player(self, player_id):
+        if not player_id:
+            return None
+        return self._lookup('SELECT player_id, nickname, steam_id_64 FROM identity_players WHERE player_id = ?',
+                            (player_id,))
+
+    def resolve_vanity(self, vanity_name):
+        """vanity имя Steam -> steam_id_64"""
+        if not vanity_name:
+            return None
+        row = self._lookup('SELECT steam_id_64 FROM identity_vanity WHERE vanity_lower = ?',
+                           (vanity_name.lower(),))
+        return row['steam_id_64'] if row else None
+
+    def resolve(self, identifier):
+        """Любой идентификатор (ник, Steam ID, vanity имя) -> данные игрока или None"""
+        identifier = (identifier or '').strip()
+        if not identifier:
+            return None
+
+        if is_steam_id(identifier):
+            return self.resolve_steam_id(identifier)
+
+        player = self.resolve_nickname(identifier)
+        if player:
+            return player
+
+        steam_id = self.resolve_vanity(identifier)
+        return self.resolve_steam_id(steam_id) if steam_id else None
+
+    def stats(self):
+        conn = get_db()
+        try:
+            players = conn.execute('SELECT COUNT(*) FROM identity_players').fetchone()[0]
+            nicknames = conn.execute('SELECT COUNT(*) FROM identity_nicknames').fetchone()[0]
+            vanity = conn.execute('SELECT COUNT(*) FROM identity_vanity').fetchone()[0]
+        finally:
+            conn.close()
+        with self._lock:
+            return {
+                'players': players,
+                'nicknames': nicknames,
+                'vanity_names': vanity,
+                'lookups': self.lookups,
+                'hits': self.hits,
+                'written': self.written
+            }
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_identity_store():
+    """Возвращает общий для процесса граф идентичностей"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = IdentityStore()
+    return _store
@@ -0,0 +1,160 @@
+# match_columns.py - Матчи игрока по колонкам (массивы NumPy) и векторный расчет формы по окнам
+import numpy as np
+from config import Config
+
+# Результат матча в разных источниках -> 1 (победа) / 0 (поражение), остальное - неизвестен
+RESULT_CODES = {'W': 1.0, 'win': 1.0, '1': 1.0, 'L': 0.0, 'loss': 0.0, '0': 0.0}
+
+
+def _column(values):
+    """None и пустые строки -> NaN"""
+    return np.array([np.nan if value in (None, '') else float(value) for value in values], dtype=np.float64)
+
+
+class MatchColumns:
+    """Матчи одного игрока от старых к новым: по массиву на показатель, неизвестное значение - NaN"""
+
+    FIELDS = ('kills', 'deaths', 'assists', 'headshots', 'result', 'elo_delta', 'finished_at')
+
+    def __init__(self, kills, deaths, assists, headshots, result, elo_delta, finished_at):
+        self.kills = kills
+        self.deaths = deaths
+        self.assists = assists
+        self.headshots = headshots
+        self.result = result
+        self.elo_delta = elo_delta
+        self.finished_at = finished_at
+
+    def __len__(self):
+        return len(self.finished_at)
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Строки таблицы matches (или словари того же вида) в хронологическом порядке"""
+        rows = list(rows)
+        columns = {field: _column(row.get(field) for row in rows)
+                   for field in cls.FIELDS if field != 'result'}
+        columns['result'] = _column(RESULT_CODES.get(str(row.get('result'))) for row in rows)
+        return cls(**columns)
+
+    @classmethod
+    def from_game_stats(cls, items):
+        """Элементы /players/{id}/games/{game}/stats (новые первыми, статистика в item['stats'])"""
+        stats = [item.get('stats') or {} for item in reversed(items)]
+        finished = _column(s.get('Match Finished At') for s in stats)
+        return cls(kills=_column(s.get('Kills') for s in stats),
+                   deaths=_column(s.get('Deaths') for s in stats),
+                   assists=_column(s.get('Assists') for s in stats),
+                   headshots=_column(s.get('Headshots') for s in stats),
+                   result=_column(RESULT_CODES.get(str(s.get('Result'))) for s in stats),
+                   elo_delta=_column(None for _ in stats),
+                   # Match Finished At - в миллисекундах
+                   finished_at=finished / 1000)
+
+
+def _prefix(values):
+    """Префиксные суммы (NaN = 0) и число известных значений: сумма окна [a, b) = p[b] - p[a]"""
+    known = ~np.isnan(values)
+    sums = np.concatenate(([0.0], np.cumsum(np.where(known, values, 0.0))))
+    counts = np.concatenate(([0], np.cumsum(known)))
+    return sums, counts
+
+
+def _ratio(numerator, denominator, scale=1.0):
+    return np.divide(numerator * scale, denominator,
+                     out=np.full(np.shape(numerator), np.nan), where=np.asarray(denominator) > 0)
+
+
+def _value(number, digits=2):
+    """NumPy скаляр -> число для JSON (NaN -> None)"""
+    # + 0.0 убирает -0.0 у почти нулевых трендов
+    return None if number is None or np.isnan(number) else round(float(number), digits) + 0.0
+
+
+def _slope(series):
+    """Наклон линейного тренда (изменение за один матч), None - точек меньше двух"""
+    series = np.asarray(series, dtype=np.float64)
+    x = np.flatnonzero(~np.isnan(series))
+    if len(x) < 2:
+        return None
+    return _value(np.polyfit(x, series[x], 1)[0], 4)
+
+
+def form_stats(columns, windows=None, rolling_window=None):
+    """Форма игрока за последние N матчей (для всех окон сразу), скользящие K/D и винрейт, тренды.
+
+    Все окна считаются по одним префиксным суммам: сумма последних n матчей - разность двух элементов.
+    """
+    windows = np.array(windows or Config.FORM_WINDOWS)
+    rolling_window = rolling_window or Config.FORM_ROLLING_WINDOW
+    total = len(columns)
+    if total == 0:
+        return {'matches': 0, 'windows': {}, 'rolling': {'window': rolling_window, 'kd': [], 'winrate': []},
+                'trend': {'kd': None, 'winrate': None, 'elo': None}}
+
+    prefix = {field: _prefix(getattr(columns, field))
+              for field in ('kills', 'deaths', 'assists', 'headshots', 'result', 'elo_delta')}
+
+    def window_sums(field, starts, ends):
+        sums, counts = prefix[field]
+        return sums[ends] - sums[starts], counts[ends] - counts[starts]
+
+    # Последние n матчей для каждого окна
+    ends = np.full(len(windows), total)
+    starts = total - np.minimum(windows, total)
+    kills, detailed = window_sums('kills', starts, ends)
+    deaths, _ = window_sums('deaths', starts, ends)
+    assists, _ = window_sums('assists', starts, ends)
+    headshots, _ = window_sums('headshots', starts, ends)
+    wins, decided = window_sums('result', starts, ends)
+    elo, _ = window_sums('elo_delta', starts, ends)
+
+    kd = _ratio(kills, deaths)
+    winrate = _ratio(wins, decided, 100)
+    avg_kills = _ratio(kills, detailed)
+    avg_deaths = _ratio(deaths, detailed)
+    avg_assists = _ratio(assists, detailed)
+    hs_percent = _ratio(headshots, kills, 100)
+
+    form = {}
+    for i, size in enumerate(windows):
+        # Окно длиннее истории повторяло бы предыдущее
+        if i and windows[i - 1] >= total:
+            break
+        form[f'last_{size}'] = {
+            'matches': int(ends[i] - starts[i]),
+            'wins': int(wins[i]),
+            'losses': int(decided[i] - wins[i]),
+            'winrate': _value(winrate[i], 1),
+            'kd_ratio': _value(kd[i]),
+            'average_kills': _value(avg_kills[i], 1),
+            'average_deaths': _value(avg_deaths[i], 1),
+            'average_assists': _value(avg_assists[i], 1),
+            'average_headshots': _value(hs_percent[i], 1),
+            'elo_change': int(elo[i]),
+        }
+
+    # Скользящие окна: i-я точка - матчи [i, i + rolling_window)
+    rolling_ends = np.arange(min(rolling_window, total), total + 1)
+    rolling_starts = rolling_ends - min(rolling_window, total)
+    rolling_kd = _ratio(*[window_sums(field, rolling_starts, rolling_ends)[0] for field in ('kills', 'deaths')])
+    rolling_wins, rolling_decided = window_sums('result', rolling_starts, rolling_ends)
+    rolling_winrate = _ratio(rolling_wins, rolling_decided, 100)
+
+    # ELO по матчам нарастающим итогом (известные изменения)
+    elo_curve = np.where(np.isnan(columns.elo_delta), np.nan, prefix['elo_delta'][0][1:])
+
+    return {
+        'matches': total,
+        'windows': form,
+        'rolling': {
+            'window': min(rolling_window, total),
+            'kd': [_value(value) for value in rolling_kd],
+            'winrate': [_value(value, 1) for value in rolling_winrate],
+        },
+        'trend': {
+            'kd': _slope(rolling_kd),
+            'winrate': _slope(rolling_winrate),
+            'elo': _slope(elo_curve),
+        },
+    }
@@ -0,0 +1,171 @@
+# match_history.py - Локальная история матчей игроков (таблица matches), пополняемая инкрементально
+import time
+import threading
+import logging
+from datetime import datetime
+from database import get_db, create_matches_table, MATCH_STAT_COLUMNS
+from match_columns import MatchColumns
+
+logger = logging.getLogger(__name__)
+
+# Статистика игрока в матче: необязательные колонки строки matches
+STAT_COLUMNS = ('kills', 'deaths') + MATCH_STAT_COLUMNS
+
+
+def player_faction(item, player_id):
+    """В какой команде (faction1/faction2) играл игрок, None - не нашли"""
+    for faction, team in (item.get('teams') or {}).items():
+        for player in team.get('players') or team.get('roster') or []:
+            if player.get('player_id') == player_id:
+                return faction
+    return None
+
+
+def normalize_history_item(item, player_id, game):
+    """Элемент /players/{id}/history -> строка таблицы matches"""
+    elo_delta = item.get('elo_delta')
+    result = None
+    if elo_delta:
+        result = 'W' if elo_delta > 0 else 'L'
+    else:
+        winner = (item.get('results') or {}).get('winner')
+        faction = player_faction(item, player_id)
+        if winner and faction:
+            result = 'W' if winner == faction else 'L'
+
+    finished_at = item.get('finished_at')
+    return {
+        'match_id': item.get('match_id'),
+        'player_id': player_id,
+        'result': result,
+        'date': datetime.fromtimestamp(finished_at).isoformat() if finished_at else None,
+        'finished_at': finished_at,
+        'elo_delta': elo_delta,
+        'game': item.get('game_id') or game,
+    }
+
+
+class MatchHistory:
+    """Матчи игрока в SQLite: новые дописываются, уже сохраненные повторно не запрашиваются"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.synced_players = 0
+        self.stored = 0
+        create_matches_table()
+
+    def newest_finished_at(self, player_id):
+        conn = get_db()
+        try:
+            row = conn.execute('SELECT MAX(finished_at) FROM matches WHERE player_id = ?', (player_id,)).fetchone()
+        finally:
+            conn.close()
+        return row[0]
+
+    def ids_finished_at(self, player_id, finished_at):
+        """match_id сохраненных матчей игрока, закончившихся в эту секунду"""
+        conn = get_db()
+        try:
+            rows = conn.execute('SELECT match_id FROM matches WHERE player_id = ? AND finished_at = ?',
+                                (player_id, finished_at)).fetchall()
+        finally:
+            conn.close()
+        return {row[0] for row in rows}
+
+    def save(self, rows):
+        """Пакетная запись нормализованных матчей. Возвращает число новых
+
+        Статистика игрока (kills, deaths, ...) в строке необязательна. Уже сохраненные матчи
+        не меняются - статистику к ним дописывает fill_stats.
+        """
+        rows = [row for row in rows if row['match_id'] and row['finished_at']]
+        if not rows:
+            return 0
+
+        now = time.time()
+        rows = [dict({column: None for column in STAT_COLUMNS}, **row, synced_at=now) for row in rows]
+        with self._lock:
+            conn = get_db()
+            try:
+                before = conn.total_changes
+                conn.executemany(f'''
+                    INSERT OR IGNORE INTO matches
+                        (match_id, player_id, result, date, finished_at, elo_delta, game, synced_at,
+                         {', '.join(STAT_COLUMNS)})
+                    VALUES (:match_id, :player_id, :result, :date, :finished_at, :elo_delta, :game, :synced_at,
+                            {', '.join(':' + column for column in STAT_COLUMNS)})
+                ''', rows)
+                conn.commit()
+                added = conn.total_changes - before
+            finally:
+                conn.close()
+
+        self.stored += added
+        return added
+
+    def fill_stats(self, rows):
+        """Дописывает статистику игрока к уже сохраненным без нее матчам. Возвращает число дополненных
+
+        Эти матчи уже учтены в player_stats без статистики - после дополнения агрегаты нужно пересчитать.
+        """
+        rows = [dict({column: None for column in STAT_COLUMNS}, **row)
+                for row in rows if row.get('match_id') and row.get('kills') is not None]
+        if not rows:
+            return 0
+
+        with self._lock:
+            conn = get_db()
+            try:
+                before = conn.total_changes
+                conn.executemany(f'''
+                    UPDATE matches SET {', '.join(f'{column} = :{column}' for column in STAT_COLUMNS)},
+                        result = COALESCE(result, :result)
+                    WHERE match_id = :match_id AND player_id = :player_id AND kills IS NULL
+                ''', rows)
+                conn.commit()
+                filled = conn.total_changes - before
+            finally:
+                conn.close()
+        return filled
+
+    def set_result(self, match_id, player_id, result):
+        """Результат, определенный позже по деталям матча"""
+        conn = get_db()
+        try:
+            conn.execute('UPDATE matches SET result = ? WHERE match_id = ? AND player_id = ?',
+                         (result, match_id, player_id))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def recent(self, player_id, limit=5):
+        """Последние матчи игрока, новые первыми"""
+        conn = get_db()
+        try:
+            rows = conn.execute('''
+                SELECT match_id, result, finished_at, elo_delta FROM matches
+                WHERE player_id = ? ORDER BY finished_at DESC LIMIT ?
+            ''', (player_id, limit)).fetchall()
+        finally:
+            conn.close()
+        return [dict(row) for row in rows]
+
+    def columns(self, player_id):
+        """Все сохраненные матчи игрока колонками (от старых к новым) - для векторного расчета формы"""
+        conn = get_db()
+        try:
+            rows = conn.execute(f'''
+                SELECT {', '.join(MatchColumns.FIELDS)} FROM matches
+                WHERE player_id = ? AND finished_at IS NOT NULL ORDER BY finished_at
+            ''', (player_id,)).fetchall()
+        finally:
+            conn.close()
+        return MatchColumns.from_rows(dict(row) for row in rows)
+
+    def stats(self):
+        conn = get_db()
+        try:
+            row = conn.execute('SELECT COUNT(*), COUNT(DISTINCT player_id) FROM matches').fetchone()
+        finally:
+            conn.close()
+        return {'matches': row[0], 'players': row[1], 'synced_players': self.synced_players, 'written': self.stored}
@@ -0,0 +1,90 @@
+# match_store.py - Постоянное хранилище деталей завершенных матчей
+import json
+import time
+import threading
+import logging
+from cache import LRUCache, CacheEntry
+from database import get_db, create_match_store_table
+
+logger = logging.getLogger(__name__)
+
+FINISHED_STATUSES = ('finished', 'FINISHED')
+
+
+def is_finished(match_data):
+    """Завершенный матч больше не меняется - его можно хранить вечно"""
+    return match_data.get('status') in FINISHED_STATUSES or bool(match_data.get('finished_at'))
+
+
+class MatchStore:
+    """Детали матчей по match_id: память + SQLite, каждый матч качаем максимум один раз"""
+
+    def __init__(self):
+        self._memory = LRUCache()
+        self._lock = threading.Lock()
+        # Счетчики - под своей блокировкой, чтобы чтения не ждали записи в SQLite
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+        create_match_store_table()
+
+    def get(self, match_id):
+        entry = self._memory.get(match_id)
+        if entry is not None:
+            self._count('hits')
+            return entry.value
+
+        conn = get_db()
+        try:
+            row = conn.execute('SELECT payload FROM match_details WHERE match_id = ?', (match_id,)).fetchone()
+        finally:
+            conn.close()
+
+        if row is None:
+            self._count('misses')
+            return None
+
+        self._count('hits')
+        data = json.loads(row['payload'])
+        self._memory.set(match_id, CacheEntry(data, len(row['payload']), float('inf')))
+        return data
+
+    def put(self, match_id, match_data):
+        """Сохраняет детали, если матч уже завершен. True - сохранили"""
+        if not match_data or not is_finished(match_data):
+            return False
+
+        payload = json.dumps(match_data, ensure_ascii=False)
+        with self._lock:
+            conn = get_db()
+            try:
+                conn.execute('''
+                    INSERT OR IGNORE INTO match_details (match_id, payload, finished_at, stored_at)
+                    VALUES (?, ?, ?, ?)
+                ''', (match_id, payload, match_data.get('finished_at'), time.time()))
+                conn.commit()
+            finally:
+                conn.close()
+
+        self._count('stored')
+        self._memory.set(match_id, CacheEntry(match_data, len(payload), float('inf')))
+        return True
+
+    def _count(self, name):
+        with self._stats_lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def stats(self):
+        conn = get_db()
+        try:
+            total = conn.execute('SELECT COUNT(*) FROM match_details').fetchone()[0]
+        finally:
+            conn.close()
+        with self._stats_lock:
+            return {
+                'matches_stored': total,
+                'hits': self.hits,
+                'misses': self.misses,
+                'written': self.stored
+            }
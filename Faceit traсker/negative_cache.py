@@ -0,0 +1,81 @@
+# negative_cache.py - Кэш неудачных поисков игроков (чтобы опечатки не гоняли всю цепочку поиска)
+import time
+import threading
+from collections import OrderedDict
+from config import Config
+
+
+def normalize_key(value):
+    """Ник без учета регистра и пробелов по краям"""
+    return (value or '').strip().lower()
+
+
+class NegativeCache:
+    """Ограниченное по размеру множество ненайденных ников с TTL"""
+
+    def __init__(self, ttl=None, max_entries=None):
+        self.ttl = ttl or Config.NEGATIVE_CACHE_TTL
+        self.max_entries = max_entries or Config.NEGATIVE_CACHE_MAX_ENTRIES
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.added = 0
+        self.invalidated = 0
+
+    def contains(self, value):
+        key = normalize_key(value)
+        with self._lock:
+            expires_at = self._entries.get(key)
+            if expires_at is None:
+                return False
+            if expires_at <= time.time():
+                del self._entries[key]
+                return False
+            self.hits += 1
+            return True
+
+    def add(self, value):
+        key = normalize_key(value)
+        if not key:
+            return
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = time.time() + self.ttl
+            self.added += 1
+            # Самые старые записи истекают первыми - их и выкидываем
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard_many(self, values):
+        """Игрок появился в ответе API - больше не считаем его ненайденным"""
+        with self._lock:
+            if not self._entries:
+                return
+            for value in values:
+                if self._entries.pop(normalize_key(value), None) is not None:
+                    self.invalidated += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'added': self.added,
+                'invalidated': self.invalidated
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_negative_cache():
+    """Возвращает общий для процесса кэш неудачных поисков"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = NegativeCache()
+    return _cache
@@ -0,0 +1,253 @@
+# player_aggregates.py - Накопительная статистика игроков (таблица player_stats), O(1) на каждый новый матч
+import time
+import threading
+import logging
+from database import get_db, create_player_stats_table, PLAYER_STATS_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+# Поле строки матча -> как оно называется в статистике игрока в ответах API
+MATCH_STAT_FIELDS = {
+    'kills': ('Kills', 'kills'),
+    'deaths': ('Deaths', 'deaths'),
+    'assists': ('Assists', 'assists'),
+    'headshots': ('Headshots', 'headshots'),
+    'mvps': ('MVPs', 'mvps'),
+    'triple_kills': ('Triple Kills', 'triple_kills'),
+    'quadro_kills': ('Quadro Kills', 'quadro_kills'),
+    'penta_kills': ('Penta Kills', 'penta_kills'),
+}
+
+# Поле строки матча -> накопительный счетчик в player_stats
+TOTALS = {
+    'kills': 'total_kills',
+    'deaths': 'total_deaths',
+    'assists': 'total_assists',
+    'headshots': 'total_headshots',
+    'mvps': 'mvps',
+    'triple_kills': 'triple_kills',
+    'quadro_kills': 'quadro_kills',
+    'penta_kills': 'penta_kills',
+}
+
+
+def _int_stat(stats, names):
+    for name in names:
+        value = stats.get(name)
+        if value not in (None, ''):
+            try:
+                return int(float(value))
+            except (TypeError, ValueError):
+                return 0
+    return 0
+
+
+def player_match_stats(match_details, player_id):
+    """Результат (W/L) и статистика игрока из деталей матча, None - игрока в матче нет.
+
+    Статистика (kills и т.д.) есть только если API ее прислал, иначе в строке один результат.
+    """
+    if not match_details:
+        return None
+
+    winner = (match_details.get('results') or {}).get('winner')
+    for faction, team in (match_details.get('teams') or {}).items():
+        for player in team.get('roster') or team.get('players') or []:
+            if player.get('player_id') != player_id:
+                continue
+
+            line = {'result': 'W' if team.get('winner') or winner == faction else 'L'}
+            stats = player.get('player_stats') or player.get('stats') or {}
+            if stats:
+                line.update({field: _int_stat(stats, names) for field, names in MATCH_STAT_FIELDS.items()})
+            return line
+    return None
+
+
+def with_match_stats(row, match_details):
+    """Строка matches + статистика игрока из деталей матча (результат из истории важнее)"""
+    line = player_match_stats(match_details, row['player_id']) or {}
+    merged = dict(row, **line)
+    merged['result'] = row['result'] or line.get('result')
+    return merged
+
+
+def empty_aggregate(player_id=None):
+    aggregate = {column: 0 for column, definition in PLAYER_STATS_COLUMNS.items() if 'INTEGER NOT NULL' in definition}
+    aggregate.update(player_id=player_id, total_matches=0, wins=0, losses=0,
+                     last_match_id=None, last_finished_at=None)
+    return aggregate
+
+
+def apply_match(aggregate, match):
+    """Добавляет к агрегатам один матч. Матчи должны идти от старых к новым (иначе серии неверны)"""
+    result = match.get('result')
+    if result in ('W', 'win'):
+        aggregate['wins'] += 1
+        streak = aggregate['current_streak']
+        aggregate['current_streak'] = streak + 1 if streak > 0 else 1
+        aggregate['longest_win_streak'] = max(aggregate['longest_win_streak'], aggregate['current_streak'])
+    elif result in ('L', 'loss'):
+        aggregate['losses'] += 1
+        streak = aggregate['current_streak']
+        aggregate['current_streak'] = streak - 1 if streak < 0 else -1
+        aggregate['longest_lose_streak'] = max(aggregate['longest_lose_streak'], -aggregate['current_streak'])
+    aggregate['total_matches'] = aggregate['wins'] + aggregate['losses']
+
+    # Средние считаем только по матчам, для которых API прислал статистику
+    if match.get('kills') is not None:
+        aggregate['detailed_matches'] += 1
+        for field, total in TOTALS.items():
+            aggregate[total] += match.get(field) or 0
+
+    if match.get('finished_at'):
+        aggregate['last_match_id'] = match.get('match_id')
+        aggregate['last_finished_at'] = match['finished_at']
+    return aggregate
+
+
+def _with_averages(aggregate):
+    """Производные колонки player_stats (win_rate, avg_*) по счетчикам"""
+    detailed = aggregate['detailed_matches']
+    kills, deaths = aggregate['total_kills'], aggregate['total_deaths']
+    return dict(
+        aggregate,
+        win_rate=round(aggregate['wins'] / aggregate['total_matches'] * 100, 1) if aggregate['total_matches'] else 0,
+        avg_kills=round(kills / detailed, 1) if detailed else 0,
+        avg_deaths=round(deaths / detailed, 1) if detailed else 0,
+        avg_kd=round(kills / deaths, 2) if deaths else kills,
+        avg_hs=round(aggregate['total_headshots'] / kills * 100, 1) if kills else 0,
+    )
+
+
+def aggregate_summary(aggregate):
+    """Агрегаты -> словарь статистики в формате get_player_stats_detailed"""
+    row = _with_averages(aggregate)
+    streak = row['current_streak']
+    return {
+        'winrate': row['win_rate'],
+        'total_matches': row['total_matches'],
+        'total_wins': row['wins'],
+        'total_losses': row['losses'],
+        'kd_ratio': row['avg_kd'],
+        'average_kills': row['avg_kills'],
+        'average_deaths': row['avg_deaths'],
+        'average_assists': round(row['total_assists'] / row['detailed_matches'], 1) if row['detailed_matches'] else 0,
+        'average_headshots': row['avg_hs'],
+        'total_headshots': row['total_headshots'],
+        'longest_win_streak': row['longest_win_streak'],
+        'current_win_streak': max(streak, 0),
+        'current_lose_streak': max(-streak, 0),
+        'longest_lose_streak': row['longest_lose_streak'],
+        'mvp': row['mvps'],
+        'triple_kills': row['triple_kills'],
+        'quadro_kills': row['quadro_kills'],
+        'penta_kills': row['penta_kills'],
+        'detailed_matches': row['detailed_matches'],
+    }
+
+
+class PlayerAggregates:
+    """Строка player_stats на игрока: новые матчи дописываются к счетчикам, чтение - один SELECT"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.ingested = 0
+        self.rebuilt = 0
+        self.reads = 0
+        create_player_stats_table()
+
+    def get(self, player_id):
+        self.reads += 1
+        conn = get_db()
+        try:
+            row = conn.execute('SELECT * FROM player_stats WHERE player_id = ?', (player_id,)).fetchone()
+        finally:
+            conn.close()
+        return dict(row) if row else None
+
+    def ingest(self, player_id, matches):
+        """Добавляет новые матчи (строки таблицы matches со статистикой) к агрегатам игрока.
+
+        Матчи не новее последнего учтенного пропускаются, поэтому повторный вызов безопасен.
+        Если строки player_stats еще нет - она один раз собирается из всей таблицы matches.
+        Возвращает число учтенных матчей.
+        """
+        with self._lock:
+            conn = get_db()
+            try:
+                row = conn.execute('SELECT * FROM player_stats WHERE player_id = ?', (player_id,)).fetchone()
+                if row is None or row['last_finished_at'] is None:
+                    aggregate, applied = self._fold_table(conn, player_id)
+                else:
+                    aggregate = dict(row)
+                    applied = 0
+                    for match in sorted(matches, key=lambda m: m.get('finished_at') or 0):
+                        if (match.get('finished_at') or 0) > aggregate['last_finished_at']:
+                            apply_match(aggregate, match)
+                            applied += 1
+
+                if applied:
+                    self._write(conn, aggregate)
+                    conn.commit()
+            finally:
+                conn.close()
+
+        self.ingested += applied
+        return applied
+
+    def rebuild(self, player_id, full_history=None):
+        """Пересчет с нуля по таблице matches - после загрузки старой истории (backfill)
+        или когда у уже учтенных матчей появились статистика или результат.
+
+        full_history - в matches вся история игрока, агрегаты можно отдавать вместо lifetime статистики API
+        (None - оставить как было).
+        """
+        with self._lock:
+            conn = get_db()
+            try:
+                if full_history is None:
+                    row = conn.execute('SELECT full_history FROM player_stats WHERE player_id = ?',
+                                       (player_id,)).fetchone()
+                    full_history = bool(row and row['full_history'])
+                aggregate, _ = self._fold_table(conn, player_id)
+                aggregate['full_history'] = int(full_history)
+                self._write(conn, aggregate)
+                conn.commit()
+            finally:
+                conn.close()
+
+        self.rebuilt += 1
+        logger.info(f"🧮 Агрегаты {player_id} пересчитаны: {aggregate['total_matches']} матчей")
+        return aggregate
+
+    def _fold_table(self, conn, player_id):
+        """Все сохраненные матчи игрока от старых к новым -> (агрегаты, число матчей)"""
+        aggregate = empty_aggregate(player_id)
+        folded = 0
+        rows = conn.execute(f'''
+            SELECT match_id, result, finished_at, {', '.join(MATCH_STAT_FIELDS)} FROM matches
+            WHERE player_id = ? AND finished_at IS NOT NULL ORDER BY finished_at
+        ''', (player_id,))
+        for row in rows:
+            apply_match(aggregate, dict(row))
+            folded += 1
+        return aggregate, folded
+
+    def _write(self, conn, aggregate):
+        row = _with_averages(aggregate)
+        row['updated_at'] = time.time()
+        columns = ['player_id', 'total_matches', 'wins', 'losses', 'win_rate',
+                   'avg_kills', 'avg_deaths', 'avg_kd', 'avg_hs'] + list(PLAYER_STATS_COLUMNS)
+        conn.execute(f'''
+            INSERT OR REPLACE INTO player_stats ({', '.join(columns)})
+            VALUES ({', '.join(':' + column for column in columns)})
+        ''', {column: row.get(column) for column in columns})
+
+    def stats(self):
+        conn = get_db()
+        try:
+            players = conn.execute('SELECT COUNT(*) FROM player_stats').fetchone()[0]
+        finally:
+            conn.close()
+        return {'players': players, 'ingested': self.ingested, 'rebuilt': self.rebuilt, 'reads': self.reads}
@@ -0,0 +1,85 @@
+# popularity.py - Частотный скетч (Count-Min со старением) для допуска в кэш в стиле TinyLFU
+import threading
+from config import Config
+
+
+class CountMinSketch:
+    """Оценка частоты ключа сверху в фиксированной памяти; каждые sample_size событий счетчики делятся пополам"""
+
+    def __init__(self, width=None, depth=4, sample_size=None):
+        self.width = width or Config.POPULARITY_SKETCH_WIDTH
+        self.depth = depth
+        self.sample_size = sample_size or self.width * 10
+        self._rows = [[0] * self.width for _ in range(depth)]
+        self._additions = 0
+        self.agings = 0
+
+    def _indexes(self, key):
+        return [hash((seed, key)) % self.width for seed in range(self.depth)]
+
+    def increment(self, key):
+        """Добавляет событие. True - если после него счетчики состарились"""
+        for row, index in zip(self._rows, self._indexes(key)):
+            row[index] += 1
+        self._additions += 1
+        if self._additions >= self.sample_size:
+            self._age()
+            return True
+        return False
+
+    def estimate(self, key):
+        return min(row[index] for row, index in zip(self._rows, self._indexes(key)))
+
+    def _age(self):
+        """Старение: старая популярность постепенно забывается"""
+        for row in self._rows:
+            for index in range(self.width):
+                row[index] >>= 1
+        self._additions //= 2
+        self.agings += 1
+
+
+class TinyLFU:
+    """Новый ключ вытесняет старый, только если к нему обращаются чаще; заодно знает самых популярных"""
+
+    def __init__(self, sketch=None, hot_candidates=None):
+        self.sketch = sketch or CountMinSketch()
+        self.hot_candidates = hot_candidates or Config.HOT_PLAYERS_TOP_N * 4
+        self._hot = {}
+        self._lock = threading.Lock()
+        self.admitted = 0
+        self.rejected = 0
+
+    def record(self, key):
+        with self._lock:
+            if self.sketch.increment(key):
+                self._hot = {k: count >> 1 for k, count in self._hot.items() if count >> 1}
+            self._hot[key] = self.sketch.estimate(key)
+            if len(self._hot) > self.hot_candidates:
+                del self._hot[min(self._hot, key=self._hot.get)]
+
+    def admit(self, candidate, victim):
+        """Пускать ли candidate в полный кэш ценой вытеснения victim"""
+        with self._lock:
+            admitted = self.sketch.estimate(candidate) > self.sketch.estimate(victim)
+            if admitted:
+                self.admitted += 1
+            else:
+                self.rejected += 1
+            return admitted
+
+    def hottest(self, n=None):
+        """Самые популярные ключи, по убыванию частоты"""
+        with self._lock:
+            ranked = sorted(self._hot.items(), key=lambda item: item[1], reverse=True)
+        return [key for key, _ in ranked[:n or Config.HOT_PLAYERS_TOP_N]]
+
+    def stats(self):
+        with self._lock:
+            hot = sorted(self._hot.items(), key=lambda item: item[1], reverse=True)[:Config.HOT_PLAYERS_TOP_N]
+            return {
+                'admitted': self.admitted,
+                'rejected': self.rejected,
+                'agings': self.sketch.agings,
+                'hot': [{'key': key, 'estimate': count} for key, count in hot]
+            }
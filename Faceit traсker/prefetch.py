@@ -0,0 +1,56 @@
+# prefetch.py - Передача найденного игрока из /search в /player/<id> с уже запущенной загрузкой профиля
+import time
+import threading
+from config import Config
+
+
+class ProfileHandoff:
+    """Короткоживущий кэш: player_id -> секции профиля (Future), запущенные еще во время /search"""
+
+    def __init__(self, ttl=None):
+        self.ttl = ttl or Config.PREFETCH_TTL
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.handed = 0
+        self.used = 0
+        self.expired = 0
+        self.last_gap_ms = None
+        self._total_gap_ms = 0
+
+    def put(self, player_id, sections):
+        with self._lock:
+            self._purge()
+            self._entries[player_id] = (sections, time.monotonic())
+            self.handed += 1
+
+    def take(self, player_id):
+        """Забирает секции (один раз). Возвращает (sections, gap_ms) или (None, None)"""
+        with self._lock:
+            self._purge()
+            entry = self._entries.pop(player_id, None)
+            if entry is None:
+                return None, None
+
+            sections, handed_at = entry
+            gap_ms = int((time.monotonic() - handed_at) * 1000)
+            self.used += 1
+            self.last_gap_ms = gap_ms
+            self._total_gap_ms += gap_ms
+            return sections, gap_ms
+
+    def _purge(self):
+        now = time.monotonic()
+        for player_id in [pid for pid, (_, at) in self._entries.items() if now - at > self.ttl]:
+            del self._entries[player_id]
+            self.expired += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'pending': len(self._entries),
+                'handed': self.handed,
+                'used': self.used,
+                'expired': self.expired,
+                'last_redirect_gap_ms': self.last_gap_ms,
+                'avg_redirect_gap_ms': round(self._total_gap_ms / self.used, 1) if self.used else None
+            }
@@ -0,0 +1,156 @@
+# rate_limiter.py - Общий для процесса token bucket для запросов к FACEIT API
+import time
+import threading
+import asyncio
+import logging
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Token bucket, который подстраивается под заголовки X-RateLimit-* и Retry-After.
+
+    Токены резервируются сразу (баланс может уйти в минус), а вызывающий
+    ждет свою очередь. Так потоки не толкаются у пустого ведра, а выстраиваются
+    друг за другом с нужным интервалом.
+    """
+
+    def __init__(self, rate=None, capacity=None):
+        self.rate = rate or Config.RATE_LIMIT_PER_SECOND
+        self.capacity = capacity or Config.RATE_LIMIT_BURST
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+        # Статистика ожидания
+        self.acquired = 0
+        self.waited = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.server_limit = None
+        self.server_remaining = None
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _reserve(self, timeout=None):
+        """Забирает токен и возвращает, сколько секунд нужно подождать (None - не дождемся)"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+
+            wait = 0.0
+            if self._tokens < 1:
+                wait = (1 - self._tokens) / self.rate
+            wait = max(wait, self._paused_until - now)
+
+            if timeout is not None and wait > timeout:
+                self.rejected += 1
+                return None
+
+            self._tokens -= 1
+            self.acquired += 1
+            if wait > 0:
+                self.waited += 1
+                self.total_wait += wait
+                self.max_wait = max(self.max_wait, wait)
+            return wait
+
+    def acquire(self, timeout=None):
+        """Ждет токен. False - если ждать пришлось бы дольше timeout"""
+        wait = self._reserve(timeout)
+        if wait is None:
+            return False
+        if wait > 0:
+            logger.debug(f"⏳ Ждем токен {wait:.2f} сек")
+            time.sleep(wait)
+        return True
+
+    async def acquire_async(self, timeout=None):
+        """Неблокирующая версия acquire для asyncio"""
+        wait = self._reserve(timeout)
+        if wait is None:
+            return False
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return True
+
+    def pause(self, seconds):
+        """Останавливает всех вызывающих на seconds (429 / Retry-After)"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        logger.warning(f"⚠️ Лимит запросов: общая пауза {seconds:.1f} сек")
+
+    def update_from_headers(self, headers):
+        """Учит бюджет из X-RateLimit-Limit/Remaining/Reset и Retry-After"""
+        limit = _header_number(headers, 'X-RateLimit-Limit')
+        remaining = _header_number(headers, 'X-RateLimit-Remaining')
+        reset = _header_number(headers, 'X-RateLimit-Reset')
+        retry_after = _header_number(headers, 'Retry-After')
+
+        # Reset бывает и "через N секунд", и unix-временем
+        if reset is not None and reset > 1e9:
+            reset = max(0.0, reset - time.time())
+
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+
+            if limit is not None:
+                self.server_limit = int(limit)
+            if remaining is not None:
+                self.server_remaining = int(remaining)
+                # Сервер знает остаток точнее нас
+                self._tokens = min(self._tokens, remaining)
+
+            if remaining is not None and reset:
+                # Растягиваем остаток бюджета до момента сброса
+                self.rate = max(remaining / reset, Config.RATE_LIMIT_MIN_PER_SECOND)
+                if remaining == 0:
+                    self._paused_until = max(self._paused_until, now + reset)
+
+            if retry_after:
+                self._paused_until = max(self._paused_until, now + retry_after)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'rate_per_second': round(self.rate, 3),
+                'capacity': self.capacity,
+                'tokens': round(self._tokens, 2),
+                'paused_for': round(max(0.0, self._paused_until - time.monotonic()), 2),
+                'server_limit': self.server_limit,
+                'server_remaining': self.server_remaining,
+                'acquired': self.acquired,
+                'waited': self.waited,
+                'rejected': self.rejected,
+                'total_wait_seconds': round(self.total_wait, 3),
+                'avg_wait_seconds': round(self.total_wait / self.waited, 3) if self.waited else 0.0,
+                'max_wait_seconds': round(self.max_wait, 3)
+            }
+
+
+def _header_number(headers, name):
+    value = headers.get(name)
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    """Возвращает общий для процесса лимитер запросов к FACEIT"""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = TokenBucket()
+    return _limiter
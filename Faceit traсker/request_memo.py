@@ -0,0 +1,123 @@
+# request_memo.py - Мемоизация ответов API в рамках одного HTTP запроса к сайту
+import copy
+import threading
+import contextvars
+from singleflight import request_key
+
+_current_memo = contextvars.ContextVar('faceit_request_memo', default=None)
+
+# Параметры, по которым меньшую выборку истории можно вырезать из большей
+_PAGING_PARAMS = ('limit', 'offset')
+
+
+class RequestMemo:
+    """Каждый endpoint запрашивается один раз за запрос; меньшая история отдается из уже загруженной большей"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._history = {}
+        self._completed = set()
+        # Endpoint'ы, на которые API в этом запросе не ответил (сбой, таймаут, лимит)
+        self.failures = set()
+        self.lookups = 0
+        self.saved = 0
+
+    def get(self, endpoint, params=None):
+        """(True, value) - ответ уже есть в рамках запроса, (False, None) - нет"""
+        key = request_key(endpoint, params)
+        with self._lock:
+            self.lookups += 1
+            if key in self._entries:
+                self.saved += 1
+                return True, self._entries[key]
+
+            history = self._history_slice(endpoint, params)
+            if history is not None:
+                self.saved += 1
+                return True, history
+
+        return False, None
+
+    def put(self, endpoint, params, value):
+        with self._lock:
+            self._entries[request_key(endpoint, params)] = value
+
+            limit = _paging(params, 'limit')
+            if endpoint.endswith('/history') and limit and not _paging(params, 'offset') and value:
+                base = self._history_base(endpoint, params)
+                known = self._history.get(base)
+                if known is None or known[0] < limit:
+                    self._history[base] = (limit, value)
+
+    def completed(self, key):
+        """Действие (например синхронизация истории) уже выполнено в рамках запроса"""
+        with self._lock:
+            return key in self._completed
+
+    def complete(self, key):
+        with self._lock:
+            self._completed.add(key)
+
+    def _history_base(self, endpoint, params):
+        rest = {k: v for k, v in (params or {}).items() if k not in _PAGING_PARAMS}
+        return request_key(endpoint, rest)
+
+    def _history_slice(self, endpoint, params):
+        """История с offset 0 и меньшим limit вырезается из уже загруженной большей"""
+        limit = _paging(params, 'limit')
+        if not endpoint.endswith('/history') or not limit or _paging(params, 'offset'):
+            return None
+
+        known = self._history.get(self._history_base(endpoint, params))
+        if known is None:
+            return None
+
+        known_limit, value = known
+        items = value.get('items') or []
+        # Если история короче загруженного limit - она полная, подходит любой limit
+        if known_limit < limit and len(items) >= known_limit:
+            return None
+
+        sliced = copy.copy(value)
+        sliced['items'] = items[:limit]
+        return sliced
+
+
+def _paging(params, name):
+    try:
+        return int((params or {}).get(name) or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def current_memo():
+    """Мемо текущего запроса, None - вне запроса"""
+    return _current_memo.get()
+
+
+def note_api_failure(endpoint):
+    """Запоминает сбой API в текущем запросе к сайту (вне запроса - ничего не делает)"""
+    memo = _current_memo.get()
+    if memo is not None:
+        with memo._lock:
+            memo.failures.add(endpoint)
+
+
+def api_failed():
+    """Был ли в текущем запросе сбой API; вне запроса узнать нельзя - считаем, что был"""
+    memo = _current_memo.get()
+    if memo is None:
+        return True
+    with memo._lock:
+        return bool(memo.failures)
+
+
+def begin_request_memo():
+    """Включает мемо для текущего контекста (для before_request). Возвращает (memo, token)"""
+    memo = RequestMemo()
+    return memo, _current_memo.set(memo)
+
+
+def end_request_memo(token):
+    _current_memo.reset(token)
@@ -0,0 +1,80 @@
+# singleflight.py - Склейка одинаковых одновременных запросов к API
+import copy
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Пока один поток выполняет запрос по ключу, остальные с тем же ключом ждут его результат.
+
+    Ждущие получают свою копию результата: изменение ответа одним вызывающим не видно другим.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+        self.leaders = 0
+        self.absorbed = 0
+
+    def do(self, key, fn):
+        """Выполняет fn() один раз на все одновременные вызовы с одинаковым key"""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.absorbed += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.leaders += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+            if call.waiters:
+                logger.debug(f"🔗 {key}: ответ разделен с {call.waiters} ожидающими")
+
+        return call.result
+
+    def stats(self):
+        with self._lock:
+            in_flight = len(self._calls)
+        total = self.leaders + self.absorbed
+        return {
+            'upstream_calls': self.leaders,
+            'absorbed_calls': self.absorbed,
+            'in_flight': in_flight,
+            'absorbed_ratio': round(self.absorbed / total, 3) if total else 0.0
+        }
+
+
+def request_key(endpoint, params=None):
+    """Ключ запроса: endpoint + отсортированные параметры"""
+    if not params:
+        return endpoint
+    return endpoint + '?' + '&'.join(f"{k}={params[k]}" for k in sorted(params))
@@ -0,0 +1,153 @@
+# swr.py - stale-while-revalidate: устаревшие, но еще допустимые данные отдаем сразу и обновляем в фоне
+import time
+import threading
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from config import Config
+from singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+
+class StaleWhileRevalidate:
+    """Моложе soft_ttl - отдаем как есть; между soft и hard - отдаем и обновляем в фоне;
+    старше hard_ttl (или нет в кэше) - загружаем синхронно"""
+
+    FRESH = 'fresh'
+    STALE = 'stale'
+    MISS = 'miss'
+
+    def __init__(self, loader, soft_ttl=None, hard_ttl=None, max_entries=None, workers=None, cacheable=None,
+                 admission=None):
+        self.loader = loader
+        # Политика допуска (например, popularity.TinyLFU): кто достоин места в полном кэше
+        self.admission = admission
+        # Неполные данные (например, не уложились в бюджет времени) отдаем, но не кэшируем
+        self.cacheable = cacheable or (lambda value: value is not None)
+        self.soft_ttl = soft_ttl or Config.SWR_SOFT_TTL
+        self.hard_ttl = hard_ttl or Config.SWR_HARD_TTL
+        self.max_entries = max_entries or Config.SWR_MAX_ENTRIES
+        # Порядок записи: самая старая запись - первая, вытеснение за O(1)
+        self._entries = OrderedDict()
+        self._refreshing = set()
+        # Ключи, последняя загрузка которых не попала в кэш (None или неполные данные) - прогрев их пропускает
+        self._unstored = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers or Config.SWR_REFRESH_WORKERS)
+        # Одновременные промахи (и фоновое обновление) по одному ключу - одна загрузка
+        self._inflight = SingleFlight()
+
+        self.hits = {self.FRESH: 0, self.STALE: 0, self.MISS: 0}
+        self.refreshes = 0
+        self.refreshes_deduplicated = 0
+
+    def get(self, key):
+        """Возвращает (value, age_seconds, state)"""
+        if self.admission is not None:
+            self.admission.record(key)
+        entry = self._entry(key)
+
+        if entry is not None:
+            value, stored_at = entry
+            age = time.time() - stored_at
+            if age < self.soft_ttl:
+                self._count(self.FRESH)
+                return value, age, self.FRESH
+            self._count(self.STALE)
+            self._refresh_in_background(key)
+            return value, age, self.STALE
+
+        self._count(self.MISS)
+        value = self._inflight.do(key, lambda: self._load(key))
+        return value, 0.0, self.MISS
+
+    def _load(self, key):
+        value = self.loader(key)
+        self._store(key, value)
+        return value
+
+    def is_fresh(self, key):
+        entry = self._entry(key)
+        return entry is not None and time.time() - entry[1] < self.soft_ttl
+
+    def _entry(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry[1] >= self.hard_ttl:
+                del self._entries[key]
+                return None
+            return entry
+
+    def _count(self, state):
+        with self._lock:
+            self.hits[state] += 1
+
+    def _store(self, key, value):
+        if not self.cacheable(value):
+            with self._lock:
+                self._unstored.pop(key, None)
+                self._unstored[key] = time.time()
+                if len(self._unstored) > self.max_entries:
+                    del self._unstored[next(iter(self._unstored))]
+            return
+        with self._lock:
+            self._unstored.pop(key, None)
+            if key not in self._entries and len(self._entries) >= self.max_entries:
+                oldest = next(iter(self._entries))
+                # Разовый запрос не вытесняет популярного игрока
+                if self.admission is not None and not self.admission.admit(key, oldest):
+                    return
+                del self._entries[oldest]
+            self._entries.pop(key, None)
+            self._entries[key] = (value, time.time())
+
+    def refresh_if_expiring(self, key, ahead=1.0):
+        """Фоновое обновление, если записи нет или прошло больше ahead * soft_ttl. True - запущено.
+
+        Ключ без записи, последняя загрузка которого не попала в кэш, не обновляется: иначе прогрев
+        грузил бы его на каждом проходе. Его снова загрузит обычный запрос (get).
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None and key in self._unstored:
+                return False
+        if entry is not None and time.time() - entry[1] < self.soft_ttl * ahead:
+            return False
+        self._refresh_in_background(key)
+        return True
+
+    def _refresh_in_background(self, key):
+        """Одно фоновое обновление на ключ, даже если устаревшие данные запросили много раз"""
+        with self._lock:
+            if key in self._refreshing:
+                self.refreshes_deduplicated += 1
+                return
+            self._refreshing.add(key)
+            self.refreshes += 1
+        self._executor.submit(self._refresh, key)
+
+    def _refresh(self, key):
+        try:
+            self._inflight.do(key, lambda: self._load(key))
+        except Exception as e:
+            logger.error(f"❌ Ошибка фонового обновления {key}: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'soft_ttl': self.soft_ttl,
+                'hard_ttl': self.hard_ttl,
+                'fresh_hits': self.hits[self.FRESH],
+                'stale_hits': self.hits[self.STALE],
+                'misses': self.hits[self.MISS],
+                'refreshes': self.refreshes,
+                'refreshes_deduplicated': self.refreshes_deduplicated,
+                'refreshing': len(self._refreshing),
+                'loads_shared': self._inflight.absorbed,
+                'admission': self.admission.stats() if self.admission is not None else None
+            }
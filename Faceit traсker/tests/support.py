@@ -0,0 +1,22 @@
+# Общее для тестов: путь к модулям приложения и временная база SQLite на каждый тест
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import Config
+
+
+class TempDatabaseTestCase(unittest.TestCase):
+    """Config.DATABASE указывает на пустой временный файл, после теста он удаляется"""
+
+    def setUp(self):
+        self._db = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+        self._db.close()
+        self._database = Config.DATABASE
+        Config.DATABASE = self._db.name
+
+    def tearDown(self):
+        Config.DATABASE = self._database
+        os.remove(self._db.name)
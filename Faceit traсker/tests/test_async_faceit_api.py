@@ -0,0 +1,111 @@
+# AsyncFaceitAPI ходит через тот же кэш и предохранители, что и синхронный клиент
+import time
+import asyncio
+import unittest
+
+from support import TempDatabaseTestCase
+from circuit_breaker import CircuitBreaker
+from singleflight import request_key
+
+
+class NoNetworkSession:
+    """Сессия aiohttp, в которую нельзя ходить: запрос в API - ошибка теста"""
+
+    closed = False
+
+    def get(self, url, **kwargs):
+        raise AssertionError(f"запрос в API: {url}")
+
+
+class RecordingSession:
+    """Сессия aiohttp снаружи клиента: запоминает заголовки и отвечает 404"""
+
+    closed = False
+
+    def __init__(self):
+        self.headers = []
+
+    def get(self, url, headers=None, **kwargs):
+        self.headers.append(headers)
+        return NotFound()
+
+
+class NotFound:
+    status = 404
+    headers = {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+PROFILE = {'player_id': 'p1', 'nickname': 'player', 'games': {'cs2': {'skill_level': 5, 'faceit_elo': 1200}}}
+
+
+class AsyncFaceitAPITest(TempDatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        from async_faceit_api import AsyncFaceitAPI
+        self.api = AsyncFaceitAPI(session=NoNetworkSession())
+
+    def test_no_sync_executors(self):
+        self.assertFalse(hasattr(self.api, 'search_executor'))
+        self.assertFalse(hasattr(self.api, 'page_executor'))
+        self.assertFalse(hasattr(self.api, 'http'))
+
+    def test_sync_only_methods_are_not_inherited(self):
+        self.assertFalse(hasattr(self.api, 'get_player_form'))
+        self.assertFalse(hasattr(self.api, 'sync_history_once'))
+
+    def test_auth_headers_sent_with_external_session(self):
+        from async_faceit_api import AsyncFaceitAPI
+        session = RecordingSession()
+        api = AsyncFaceitAPI(session=session)
+        api.valid_key = True
+        api.headers = {'Authorization': 'Bearer key'}
+
+        asyncio.run(api.get_player_by_id('p2'))
+
+        self.assertEqual(session.headers, [api.headers])
+
+    def test_full_history_aggregate_skips_api(self):
+        from faceit_api import FaceitAPI
+        from match_history import MatchHistory
+        self.api.valid_key = True
+        history = [{'match_id': f'm{i}', 'player_id': 'p1', 'result': 'W', 'date': None, 'finished_at': 100 + i,
+                    'elo_delta': None, 'game': 'cs2', 'kills': 10, 'deaths': 5, 'headshots': 5}
+                   for i in range(3)]
+        MatchHistory().save(history)
+        self.api.player_aggregates.rebuild('p1', full_history=True)
+
+        stats = asyncio.run(self.api.get_player_stats_detailed('p1'))
+
+        self.assertEqual(stats, FaceitAPI._stored_stats(self.api, 'p1', True))
+        self.assertEqual(stats['total_matches'], 3)
+
+    def test_fresh_cache_entry_skips_api(self):
+        self.api.cache.set(request_key('/players/p1', None), PROFILE, 60)
+
+        player = asyncio.run(self.api.get_player_by_id('p1'))
+
+        self.assertEqual(player['nickname'], 'player')
+
+    def test_open_breaker_serves_stale_cache(self):
+        self.api.cache.set(request_key('/players/p1', None), PROFILE, 60)
+        entry = self.api.cache.l1.get(request_key('/players/p1', None))
+        entry.expires_at = time.time() - 1
+        breaker = self.api.breakers.for_endpoint('/players/p1')
+        breaker.state = CircuitBreaker.OPEN
+        breaker.opened_at = time.monotonic()
+
+        player = asyncio.run(self.api.get_player_by_id('p1'))
+
+        self.assertEqual(player['nickname'], 'player')
+        self.assertEqual(breaker.stats()['short_circuited'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+# Пакетная загрузка: ключи из разных потоков уходят одним вызовом, результат кэшируется, ошибка - нет
+import threading
+import unittest
+
+import support  # noqa: F401 - путь к модулям приложения
+from batch_loader import BatchLoader
+
+
+class RecordingBatch:
+    def __init__(self, fail=False):
+        self.calls = []
+        self.fail = fail
+
+    def __call__(self, keys):
+        self.calls.append(sorted(keys))
+        if self.fail:
+            raise RuntimeError('steam down')
+        return {key: key.upper() for key in keys if key != 'missing'}
+
+
+class BatchLoaderTest(unittest.TestCase):
+
+    def load_concurrently(self, loader, keys):
+        results = {}
+
+        def load(key):
+            results[key] = loader.load(key, timeout=5)
+
+        threads = [threading.Thread(target=load, args=(key,)) for key in keys]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+        return results
+
+    def test_keys_within_window_share_one_batch(self):
+        batch = RecordingBatch()
+        loader = BatchLoader(batch, window=0.2)
+
+        results = self.load_concurrently(loader, ['a', 'b', 'b', 'missing'])
+
+        self.assertEqual(batch.calls, [['a', 'b', 'missing']])
+        self.assertEqual(results, {'a': 'A', 'b': 'B', 'missing': None})
+        self.assertEqual(loader.stats()['joined_pending'], 1)
+
+    def test_full_batch_is_sent_without_waiting(self):
+        batch = RecordingBatch()
+        loader = BatchLoader(batch, max_batch=2, window=60)
+
+        self.load_concurrently(loader, ['a', 'b'])
+
+        self.assertEqual(batch.calls, [['a', 'b']])
+
+    def test_results_cached_for_ttl(self):
+        batch = RecordingBatch()
+        loader = BatchLoader(batch, window=0.01, ttl=60)
+        loader.load('a', timeout=5)
+        loader.load('missing', timeout=5)
+
+        self.assertEqual((loader.load('a'), loader.load('missing')), ('A', None))
+        self.assertEqual(len(batch.calls), 2)
+        self.assertEqual(loader.stats()['cache_hits'], 2)
+
+    def test_error_reaches_waiters_and_is_not_cached(self):
+        batch = RecordingBatch(fail=True)
+        loader = BatchLoader(batch, window=0.01)
+
+        with self.assertRaises(RuntimeError):
+            loader.load('a', timeout=5)
+        batch.fail = False
+        self.assertEqual(loader.load('a', timeout=5), 'A')
+        self.assertEqual(len(batch.calls), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
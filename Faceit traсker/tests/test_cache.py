@@ -0,0 +1,63 @@
+# Двухуровневый кэш: TTL по классам endpoint'ов, LRU по байтам в памяти и подъем записей из SQLite
+import time
+import unittest
+
+from support import TempDatabaseTestCase
+from cache import LRUCache, CacheEntry, TieredCache, endpoint_class
+
+
+class EndpointClassTest(unittest.TestCase):
+
+    def test_classes_by_path(self):
+        self.assertEqual(endpoint_class('/players/p1'), 'player')
+        self.assertEqual(endpoint_class('/players/p1/stats/cs2'), 'lifetime_stats')
+        self.assertEqual(endpoint_class('/players/p1/history'), 'history')
+        self.assertIsNone(endpoint_class('/matches/m1/stats'))
+
+
+class LRUCacheTest(unittest.TestCase):
+
+    def entry(self, size):
+        return CacheEntry('x', size, time.time() + 60)
+
+    def test_evicts_least_recently_used_by_bytes(self):
+        cache = LRUCache(max_bytes=10)
+        cache.set('a', self.entry(4))
+        cache.set('b', self.entry(4))
+        cache.get('a')
+        cache.set('c', self.entry(4))
+
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('a'))
+        self.assertEqual(cache.info()['bytes'], 8)
+
+    def test_expired_entry_only_with_allow_stale(self):
+        cache = LRUCache(max_bytes=10)
+        cache.set('a', CacheEntry('x', 1, time.time() - 1))
+
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.get('a', allow_stale=True).value, 'x')
+
+
+class TieredCacheTest(TempDatabaseTestCase):
+
+    def test_l2_hit_is_promoted_to_l1(self):
+        TieredCache().set('key', {'elo': 2000}, ttl=60)
+
+        # Новый процесс: память пустая, запись приходит из SQLite
+        cache = TieredCache()
+        self.assertEqual(cache.get('key').value, {'elo': 2000})
+        self.assertEqual(cache.l1.get('key').value, {'elo': 2000})
+        self.assertEqual(cache.stats()['l2_sqlite']['hits'], 1)
+
+    def test_delete_removes_both_tiers(self):
+        cache = TieredCache()
+        cache.set('key', [1], ttl=60)
+        cache.delete('key')
+
+        self.assertIsNone(cache.get('key'))
+        self.assertEqual(cache.stats()['l2_sqlite']['entries'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
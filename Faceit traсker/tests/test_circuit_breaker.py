@@ -0,0 +1,101 @@
+# Пробный запрос half_open не должен зависать, если он завершился без успеха/ошибки
+import time
+import unittest
+
+import requests
+
+from support import TempDatabaseTestCase
+from circuit_breaker import CircuitBreaker
+from deadline import request_deadline
+
+
+class RejectingLimiter:
+    """Лимитер, который не дает токен в рамках бюджета"""
+
+    def acquire(self, timeout=None):
+        return False
+
+
+class FreeLimiter:
+    def acquire(self, timeout=None):
+        return True
+
+    def update_from_headers(self, headers):
+        pass
+
+
+class TimingOutHTTP:
+    def get(self, url, **kwargs):
+        raise requests.exceptions.Timeout()
+
+
+class HalfOpenProbeTest(TempDatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        from faceit_api import FaceitAPI
+        self.api = FaceitAPI()
+        self.api.headers = {}
+        self.breaker = self.api.breakers.for_endpoint('/players/x')
+        self._open(self.breaker)
+
+    def _open(self, breaker):
+        """Предохранитель разомкнут, пауза восстановления уже прошла - следующий allow() станет пробой"""
+        breaker.state = CircuitBreaker.OPEN
+        breaker.opened_at = time.monotonic() - breaker.recovery_timeout - 1
+
+    def test_limiter_rejection_releases_probe(self):
+        self.api.limiter = RejectingLimiter()
+
+        self.assertIsNone(self.api._fetch_json('/players/x', max_retries=1))
+
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertTrue(self.breaker.allow())
+
+    def test_deadline_timeout_releases_probe(self):
+        self.api.limiter = FreeLimiter()
+        self.api.http = TimingOutHTTP()
+
+        # Таймаут урезан бюджетом (< 15 с) - ошибкой API не считается
+        with request_deadline(200):
+            self.assertIsNone(self.api._fetch_json('/players/x', max_retries=1))
+
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertTrue(self.breaker.allow())
+
+
+class ProbeTokenTest(unittest.TestCase):
+
+    def setUp(self):
+        self.breaker = CircuitBreaker('test', failure_threshold=1, recovery_timeout=1)
+
+    def _half_open_probe(self):
+        self.breaker.record_failure()
+        self.breaker.opened_at = time.monotonic() - 2
+        return self.breaker.allow()
+
+    def test_request_admitted_while_closed_keeps_probe(self):
+        admission = self.breaker.allow()
+        probe = self._half_open_probe()
+        self.assertTrue(probe)
+
+        # Запрос, начатый до размыкания, завершился без вердикта - проба все еще в полете
+        self.breaker.release_probe(admission)
+
+        self.assertFalse(self.breaker.allow())
+
+    def test_stale_probe_does_not_release_new_one(self):
+        old_probe = self._half_open_probe()
+        self.breaker.record_failure()
+        self.breaker.opened_at = time.monotonic() - 2
+        new_probe = self.breaker.allow()
+
+        self.breaker.release_probe(old_probe)
+        self.assertFalse(self.breaker.allow())
+
+        self.breaker.release_probe(new_probe)
+        self.assertTrue(self.breaker.allow())
+
+
+if __name__ == '__main__':
+    unittest.main()
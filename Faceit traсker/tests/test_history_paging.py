@@ -0,0 +1,77 @@
+# Обход истории окнами по времени: матчи одной секунды на границе страниц и оборванные страницы
+import argparse
+import unittest
+
+from support import TempDatabaseTestCase
+from circuit_breaker import APIUnavailableError
+from database import create_backfill_table
+
+# 8 матчей, m1-m5 закончились в одну секунду - больше, чем помещается на страницу из 3
+HISTORY = [{'match_id': f'm{i}', 'finished_at': finished_at, 'elo_delta': 25}
+           for i, finished_at in enumerate([700, 500, 500, 500, 500, 500, 200, 100])]
+
+
+class StubHistory:
+    """Страницы истории как у API: to включительно, от новых к старым; failing - номера запросов с ошибкой"""
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.calls = []
+
+    def __call__(self, player_id, since=0, until=None, limit=100, offset=0):
+        self.calls.append((until, offset))
+        if len(self.calls) in self.failing:
+            return None
+        window = [item for item in HISTORY
+                  if since <= item['finished_at'] and (until is None or item['finished_at'] <= until)]
+        return window[offset:offset + limit]
+
+
+class HistoryPagingTest(TempDatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        from faceit_api import FaceitAPI
+        self.api = FaceitAPI()
+
+    def test_iter_matches_keeps_same_second_matches(self):
+        self.api._history_page = StubHistory()
+
+        ids = [item['match_id'] for item in self.api.iter_matches('p1', page_size=3)]
+
+        self.assertEqual(ids, [item['match_id'] for item in HISTORY])
+
+    def test_iter_matches_raises_on_failed_page(self):
+        self.api._history_page = StubHistory(failing={2})
+
+        seen = []
+        with self.assertRaises(APIUnavailableError):
+            for item in self.api.iter_matches('p1', page_size=3):
+                seen.append(item['match_id'])
+        self.assertEqual(seen, ['m0', 'm1', 'm2'])
+
+    def test_iter_matches_pages_through_one_second(self):
+        self.api._history_page = StubHistory()
+
+        list(self.api.iter_matches('p1', page_size=3))
+
+        self.assertEqual(self.api._history_page.calls, [(None, 0), (500, 2), (500, 5)])
+
+    def test_backfill_resumes_without_losing_or_repeating_matches(self):
+        import backfill
+        create_backfill_table()
+        args = argparse.Namespace(restart=False, since=0, page_size=3, details=False, workers=1)
+
+        # Первый проход обрывается на второй странице, второй продолжает с чекпоинта
+        self.api._history_page = StubHistory(failing={2})
+        self.assertEqual(backfill.backfill_player(self.api, 'p1', args, backfill.BackfillProgress()), 3)
+        self.api._history_page = StubHistory()
+        total = backfill.backfill_player(self.api, 'p1', args, backfill.BackfillProgress())
+
+        self.assertEqual(total, len(HISTORY))
+        self.assertEqual(self.api.player_aggregates.get('p1')['wins'], len(HISTORY))
+        self.assertTrue(backfill.load_checkpoint('p1')['done'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+# Пул соединений: запросы идут по уже открытому соединению, закрытые соединения уходят в итоги хоста
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import support  # noqa: F401 - путь к модулям приложения
+from http_client import PooledHTTPClient, ConnectionStats
+
+
+class OkHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'{}')
+
+    def log_message(self, *args):
+        pass
+
+
+class ConnectionStatsTest(unittest.TestCase):
+
+    def test_closed_connection_is_folded_into_host_totals(self):
+        stats = ConnectionStats()
+        conn_id = stats.register(None)
+        stats.record_connect(conn_id, 'api')
+        for _ in range(3):
+            stats.record_request(conn_id, 'api')
+
+        self.assertEqual(stats.snapshot()['per_connection'][0]['reused'], 2)
+
+        stats.record_close(conn_id)
+        snapshot = stats.snapshot()
+
+        self.assertEqual(snapshot['per_connection'], [])
+        self.assertEqual(snapshot['per_host'][0]['requests'], 3)
+        self.assertEqual(snapshot['reused_requests'], 2)
+
+
+class PooledHTTPClientTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), OkHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f'http://127.0.0.1:{self.server.server_port}/'
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_sequential_requests_reuse_one_connection(self):
+        client = PooledHTTPClient(pool_maxsize=2)
+        before = client.stats()['requests']
+        for _ in range(4):
+            client.get(self.url, timeout=5)
+
+        mine = [c for c in client.stats()['per_connection'] if c['host'] == '127.0.0.1']
+        client.close()
+
+        self.assertEqual(sum(c['requests'] for c in mine), 4)
+        self.assertEqual(sum(c['handshakes'] for c in mine), 1)
+        self.assertGreaterEqual(client.stats()['requests'] - before, 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
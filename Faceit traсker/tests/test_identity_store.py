@@ -0,0 +1,59 @@
+# Граф идентичностей: ники (в том числе старые), Steam ID, vanity имена и подтверждение владельца ника
+import unittest
+
+from support import TempDatabaseTestCase
+from identity_store import IdentityStore, collect_identities, confirm_owner
+
+STEAM_ID = '76561198000000001'
+
+
+class IdentityStoreTest(TempDatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.store = IdentityStore()
+
+    def test_collects_players_from_nested_payload(self):
+        payload = {'items': [{'player_id': 'p1', 'nickname': 'One',
+                              'games': {'cs2': {'game_player_id': STEAM_ID}}},
+                             {'teams': {'faction1': {'roster': [{'player_id': 'p2', 'nickname': 'Two'}]}}}]}
+
+        found = sorted(collect_identities(payload))
+
+        self.assertEqual(found, [('p1', 'One', STEAM_ID), ('p2', 'Two', None)])
+
+    def test_resolves_old_nickname_steam_id_and_vanity(self):
+        self.store.observe_players([('p1', 'OldName', STEAM_ID)])
+        self.store.observe_players([('p1', 'NewName', None)])
+        self.store.observe_vanity('vanity', STEAM_ID)
+
+        self.assertEqual(self.store.resolve('oldname')['nickname'], 'NewName')
+        self.assertEqual(self.store.resolve(STEAM_ID)['player_id'], 'p1')
+        self.assertEqual(self.store.resolve('Vanity')['player_id'], 'p1')
+        self.assertIsNone(self.store.resolve('unknown'))
+
+        stats = self.store.stats()
+        self.assertEqual((stats['lookups'] > stats['hits'], stats['players']), (True, 1))
+
+    def test_current_owner_of_old_nickname_wins(self):
+        self.store.observe_players([('p1', 'Taken', None)])
+        self.store.observe_players([('p1', 'Renamed', None)])
+        known = self.store.resolve('taken')
+
+        owner = confirm_owner('Taken', known, lambda nickname: {'player_id': 'p2', 'nickname': nickname})
+        self.assertEqual(owner['player_id'], 'p2')
+
+        # Ник никто не занял - остается игрок из графа
+        self.assertEqual(confirm_owner('Taken', known, lambda nickname: None)['player_id'], 'p1')
+
+    def test_current_nickname_and_steam_id_need_no_search(self):
+        def search(nickname):
+            raise AssertionError('лишний поиск')
+
+        player = {'player_id': 'p1', 'nickname': 'Name'}
+        self.assertIs(confirm_owner('name', player, search), player)
+        self.assertIs(confirm_owner(STEAM_ID, player, search), player)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+# Векторная форма игрока: окна последних N матчей, пропуски статистики, скользящие окна и тренды
+import unittest
+
+import support  # noqa: F401 - путь к модулям приложения
+from match_columns import MatchColumns, form_stats
+
+
+def rows(*matches):
+    """(результат, kills, deaths, elo_delta) от старых к новым; kills None - матч без статистики"""
+    return [{'result': result, 'kills': kills, 'deaths': deaths, 'assists': None,
+             'headshots': kills // 2 if kills is not None else None, 'elo_delta': elo, 'finished_at': i}
+            for i, (result, kills, deaths, elo) in enumerate(matches)]
+
+
+class FormStatsTest(unittest.TestCase):
+
+    def test_windows_count_only_last_matches(self):
+        columns = MatchColumns.from_rows(rows(('L', 5, 20, -25), ('W', 20, 10, 25), ('W', 30, 10, 20)))
+
+        form = form_stats(columns, windows=[2, 5, 10], rolling_window=2)
+
+        self.assertEqual(list(form['windows']), ['last_2', 'last_5'])
+        last_2 = form['windows']['last_2']
+        self.assertEqual((last_2['wins'], last_2['losses'], last_2['winrate']), (2, 0, 100.0))
+        self.assertEqual((last_2['kd_ratio'], last_2['average_kills'], last_2['elo_change']), (2.5, 25.0, 45))
+        self.assertEqual(form['windows']['last_5']['matches'], 3)
+
+    def test_matches_without_stats_skip_averages_not_results(self):
+        columns = MatchColumns.from_rows(rows(('W', 20, 10, 25), ('L', None, None, None)))
+
+        window = form_stats(columns, windows=[5])['windows']['last_5']
+
+        self.assertEqual((window['wins'], window['losses']), (1, 1))
+        self.assertEqual((window['average_kills'], window['average_headshots']), (20.0, 50.0))
+        self.assertEqual(window['elo_change'], 25)
+
+    def test_rolling_windows_and_trend(self):
+        columns = MatchColumns.from_rows(rows(('L', 10, 20, -25), ('W', 20, 20, 25), ('W', 30, 10, 25)))
+
+        form = form_stats(columns, windows=[5], rolling_window=1)
+
+        self.assertEqual(form['rolling']['kd'], [0.5, 1.0, 3.0])
+        self.assertEqual(form['rolling']['winrate'], [0.0, 100.0, 100.0])
+        self.assertGreater(form['trend']['kd'], 0)
+        self.assertEqual(form['trend']['elo'], 25.0)
+
+    def test_no_matches(self):
+        form = form_stats(MatchColumns.from_rows([]))
+
+        self.assertEqual((form['matches'], form['windows'], form['trend']['kd']), (0, {}, None))
+
+    def test_game_stats_items_are_reversed_to_chronological(self):
+        items = [{'stats': {'Kills': '30', 'Deaths': '10', 'Result': '1', 'Match Finished At': 2000}},
+                 {'stats': {'Kills': '10', 'Deaths': '20', 'Result': '0', 'Match Finished At': 1000}}]
+
+        columns = MatchColumns.from_game_stats(items)
+
+        self.assertEqual(list(columns.finished_at), [1.0, 2.0])
+        self.assertEqual(list(columns.result), [0.0, 1.0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+# Параллельная загрузка деталей матчей: порядок сохраняется, упавшие пропускаются, не больше workers сразу
+import threading
+import time
+import unittest
+
+from support import TempDatabaseTestCase
+from deadline import request_deadline, current_deadline
+
+
+class MapMatchItemsTest(TempDatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        from faceit_api import FaceitAPI
+        self.api = FaceitAPI()
+
+    def test_order_kept_and_failures_skipped(self):
+        def fetch(item, player_id):
+            # Первые матчи отвечают дольше, порядок все равно по match_items
+            time.sleep(0.01 * (5 - item))
+            if item == 2:
+                raise RuntimeError('timeout')
+            return None if item == 3 else f'{player_id}:{item}'
+
+        matches = self.api._map_match_items(fetch, list(range(5)), 'p1', workers=5)
+
+        self.assertEqual(matches, ['p1:0', 'p1:1', 'p1:4'])
+
+    def test_no_more_than_workers_at_once(self):
+        lock = threading.Lock()
+        running = [0]
+        peak = [0]
+
+        def fetch(item, player_id):
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.02)
+            with lock:
+                running[0] -= 1
+            return item
+
+        matches = self.api._map_match_items(fetch, list(range(1, 13)), 'p1', workers=3)
+
+        self.assertEqual(matches, list(range(1, 13)))
+        self.assertEqual(peak[0], 3)
+
+    def test_request_deadline_reaches_worker_threads(self):
+        seen = []
+
+        def fetch(item, player_id):
+            seen.append(current_deadline())
+            return item
+
+        with request_deadline(5000) as deadline:
+            self.api._map_match_items(fetch, [1, 2], 'p1', workers=2)
+
+        self.assertEqual(seen, [deadline, deadline])
+
+
+if __name__ == '__main__':
+    unittest.main()
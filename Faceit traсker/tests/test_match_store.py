@@ -0,0 +1,40 @@
+# Хранилище деталей матчей: только завершенные матчи, счетчики не теряются при параллельных чтениях
+import threading
+import unittest
+
+from support import TempDatabaseTestCase
+from match_store import MatchStore
+
+
+class MatchStoreTest(TempDatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.store = MatchStore()
+
+    def test_only_finished_matches_are_stored(self):
+        self.assertFalse(self.store.put('m1', {'match_id': 'm1', 'status': 'ONGOING'}))
+        self.assertTrue(self.store.put('m2', {'match_id': 'm2', 'status': 'FINISHED'}))
+
+        self.assertIsNone(self.store.get('m1'))
+        # Из SQLite, мимо памяти
+        self.assertEqual(MatchStore().get('m2')['match_id'], 'm2')
+
+    def test_counters_survive_concurrent_reads(self):
+        self.store.put('m1', {'match_id': 'm1', 'status': 'FINISHED'})
+
+        def read():
+            for _ in range(500):
+                self.store.get('m1')
+
+        threads = [threading.Thread(target=read) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.store.stats()['hits'], 4000)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+# Инкрементальная синхронизация истории в таблицу matches и перенос старой таблицы matches
+import unittest
+
+from support import TempDatabaseTestCase
+from database import get_db, create_matches_table, MATCH_STAT_COLUMNS
+from request_memo import begin_request_memo, end_request_memo
+
+
+def history_item(match_id, finished_at, elo_delta=25):
+    return {'match_id': match_id, 'finished_at': finished_at, 'elo_delta': elo_delta}
+
+
+class StubRequests:
+    """Ответы /players/{id}/history по очереди; None в очереди - сбой API"""
+
+    def __init__(self, *pages):
+        self.pages = list(pages)
+        self.params = []
+
+    def __call__(self, endpoint, params=None, max_retries=3):
+        self.params.append(params)
+        page = self.pages.pop(0)
+        return None if page is None else {'items': page}
+
+
+class MatchSyncTest(TempDatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        from faceit_api import FaceitAPI
+        self.api = FaceitAPI()
+        self.api.get_match_details = lambda match_id: None
+
+    def sync(self, *pages):
+        self.api._smart_request = StubRequests(*pages)
+        return self.api.sync_match_history('p1')
+
+    def test_second_sync_asks_only_for_newer_matches(self):
+        self.assertEqual(self.sync([history_item('m2', 200), history_item('m1', 100, -25)]), 2)
+        self.assertNotIn('from', self.api._smart_request.params[0])
+
+        self.assertEqual(self.sync([history_item('m3', 300)]), 1)
+        self.assertEqual(self.api._smart_request.params[0]['from'], 201)
+
+        recent = self.api.match_history.recent('p1')
+        self.assertEqual([(m['match_id'], m['result']) for m in recent], [('m3', 'W'), ('m2', 'W'), ('m1', 'L')])
+        self.assertEqual(self.api.player_aggregates.get('p1')['total_matches'], 3)
+
+    def test_incomplete_window_is_not_saved(self):
+        self.sync([history_item('m1', 100)])
+
+        self.assertEqual(self.sync(None), 0)
+        self.assertEqual(self.api.match_history.newest_finished_at('p1'), 100)
+
+    def test_sync_runs_once_per_site_request(self):
+        self.api._smart_request = StubRequests([history_item('m1', 100)])
+        _, token = begin_request_memo()
+        try:
+            self.assertEqual(self.api.sync_history_once('p1'), 1)
+            self.assertEqual(self.api.sync_history_once('p1'), 0)
+        finally:
+            end_request_memo(token)
+
+        self.assertEqual(len(self.api._smart_request.params), 1)
+
+
+class MatchesMigrationTest(TempDatabaseTestCase):
+
+    def test_old_table_moves_to_composite_key(self):
+        conn = get_db()
+        conn.execute('''
+            CREATE TABLE matches (match_id TEXT PRIMARY KEY, player_id TEXT, result TEXT, kills INTEGER,
+                                  deaths INTEGER, kd_ratio REAL, hs_percent REAL, map_name TEXT, date TIMESTAMP)
+        ''')
+        conn.executemany('INSERT INTO matches (match_id, player_id, result, kills) VALUES (?, ?, ?, ?)',
+                         [('m1', 'p1', 'W', 20), ('m2', None, 'L', 5)])
+        conn.commit()
+        conn.close()
+
+        create_matches_table()
+
+        conn = get_db()
+        try:
+            columns = {row[1] for row in conn.execute('PRAGMA table_info(matches)')}
+            rows = [tuple(row) for row in conn.execute('SELECT match_id, player_id, result, kills FROM matches')]
+            # Тот же матч у второго игрока - отдельная строка
+            conn.execute("INSERT INTO matches (match_id, player_id) VALUES ('m1', 'p2')")
+        finally:
+            conn.close()
+
+        self.assertTrue({'finished_at', 'elo_delta', *MATCH_STAT_COLUMNS} <= columns)
+        self.assertEqual(rows, [('m1', 'p1', 'W', 20)])
+
+
+if __name__ == '__main__':
+    unittest.main()
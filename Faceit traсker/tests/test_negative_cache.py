@@ -0,0 +1,82 @@
+# Кэш ненайденных ников и признак сбоя API, без которого в него нельзя писать
+import time
+import unittest
+
+from support import TempDatabaseTestCase
+from negative_cache import NegativeCache
+from request_memo import begin_request_memo, end_request_memo, api_failed
+
+
+class NegativeCacheTest(unittest.TestCase):
+
+    def test_case_insensitive_and_expires(self):
+        cache = NegativeCache(ttl=60, max_entries=10)
+        cache.add(' Typo ')
+
+        self.assertTrue(cache.contains('typo'))
+
+        cache._entries['typo'] = time.time() - 1
+        self.assertFalse(cache.contains('typo'))
+
+    def test_oldest_entry_evicted(self):
+        cache = NegativeCache(ttl=60, max_entries=2)
+        for nickname in ('a', 'b', 'c'):
+            cache.add(nickname)
+
+        self.assertFalse(cache.contains('a'))
+        self.assertTrue(cache.contains('c'))
+
+    def test_player_seen_in_api_is_discarded(self):
+        cache = NegativeCache(ttl=60, max_entries=10)
+        cache.add('renamed')
+        cache.discard_many(['Renamed'])
+
+        self.assertFalse(cache.contains('renamed'))
+        self.assertEqual(cache.stats()['invalidated'], 1)
+
+
+class Response:
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.headers = {}
+        self.text = ''
+
+
+class StubHttp:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+    def get(self, url, **kwargs):
+        return Response(self.status_code)
+
+
+class ApiFailureTest(TempDatabaseTestCase):
+    """В кэш ненайденных попадает только подтвержденный пустой ответ, а не сбой API"""
+
+    def setUp(self):
+        super().setUp()
+        from faceit_api import FaceitAPI
+        self.api = FaceitAPI()
+        self.api.headers = {}
+        self.memo, self.token = begin_request_memo()
+
+    def tearDown(self):
+        end_request_memo(self.token)
+        super().tearDown()
+
+    def search(self, status_code):
+        self.api.http = StubHttp(status_code)
+        return self.api._smart_request('/players', {'nickname': 'typo'})
+
+    def test_not_found_is_confirmed(self):
+        self.assertIsNone(self.search(404))
+        self.assertFalse(api_failed())
+
+    def test_server_error_is_failure(self):
+        self.assertIsNone(self.search(503))
+        self.assertTrue(api_failed())
+        self.assertEqual(self.memo.failures, {'/players'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+# Накопительные агрегаты player_stats: серии, средние, дозапись новых матчей и пересчет
+import unittest
+
+from support import TempDatabaseTestCase
+from match_history import MatchHistory
+from player_aggregates import PlayerAggregates, apply_match, empty_aggregate, aggregate_summary
+
+
+def match(match_id, finished_at, result, kills=None, deaths=None, headshots=None):
+    row = {'match_id': match_id, 'player_id': 'p1', 'result': result, 'date': None,
+           'finished_at': finished_at, 'elo_delta': None, 'game': 'cs2'}
+    if kills is not None:
+        row.update(kills=kills, deaths=deaths, headshots=headshots or 0)
+    return row
+
+
+class ApplyMatchTest(unittest.TestCase):
+
+    def test_streaks_follow_results(self):
+        aggregate = empty_aggregate('p1')
+        for result in 'WWWLLWW':
+            apply_match(aggregate, {'result': result})
+
+        self.assertEqual(aggregate['wins'], 5)
+        self.assertEqual(aggregate['losses'], 2)
+        self.assertEqual(aggregate['current_streak'], 2)
+        self.assertEqual(aggregate['longest_win_streak'], 3)
+        self.assertEqual(aggregate['longest_lose_streak'], 2)
+
+    def test_averages_only_over_matches_with_stats(self):
+        aggregate = empty_aggregate('p1')
+        apply_match(aggregate, {'result': 'W', 'kills': 20, 'deaths': 10, 'headshots': 10})
+        apply_match(aggregate, {'result': 'L'})
+
+        summary = aggregate_summary(aggregate)
+        self.assertEqual(summary['total_matches'], 2)
+        self.assertEqual(summary['average_kills'], 20.0)
+        self.assertEqual(summary['kd_ratio'], 2.0)
+        self.assertEqual(summary['average_headshots'], 50.0)
+        self.assertEqual(summary['current_lose_streak'], 1)
+
+
+class PlayerAggregatesTest(TempDatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.history = MatchHistory()
+        self.aggregates = PlayerAggregates()
+
+    def test_ingest_appends_only_newer_matches(self):
+        self.history.save([match('m1', 100, 'W', 10, 5), match('m2', 200, 'W', 10, 5)])
+        self.assertEqual(self.aggregates.ingest('p1', []), 2)
+
+        newer = [match('m2', 200, 'W', 10, 5), match('m3', 300, 'L', 0, 10)]
+        self.history.save(newer)
+        self.assertEqual(self.aggregates.ingest('p1', newer), 1)
+
+        row = self.aggregates.get('p1')
+        self.assertEqual((row['wins'], row['losses'], row['current_streak']), (2, 1, -1))
+        self.assertEqual(row['total_kills'], 20)
+
+    def test_rebuild_picks_up_late_stats_and_keeps_full_history(self):
+        self.history.save([match('m1', 100, 'W')])
+        self.aggregates.rebuild('p1', full_history=True)
+        self.assertEqual(self.aggregates.get('p1')['detailed_matches'], 0)
+
+        self.history.fill_stats([match('m1', 100, 'W', 15, 5)])
+        self.aggregates.rebuild('p1')
+
+        row = self.aggregates.get('p1')
+        self.assertEqual(row['detailed_matches'], 1)
+        self.assertEqual(row['total_kills'], 15)
+        self.assertEqual(row['full_history'], 1)
+
+
+class FallbackStatsTest(TempDatabaseTestCase):
+    """Без ответа API статистика берется из player_stats, а не выдумывается"""
+
+    def setUp(self):
+        super().setUp()
+        from faceit_api import FaceitAPI
+        self.api = FaceitAPI()
+
+    def test_known_player_gets_real_streaks(self):
+        self.api.match_history.save([match('m1', 100, 'W', 10, 5), match('m2', 200, 'W', 12, 6)])
+        self.api.player_aggregates.rebuild('p1')
+
+        stats = self.api._get_realistic_stats('p1')
+
+        self.assertEqual(stats['current_win_streak'], 2)
+        self.assertEqual(stats['longest_win_streak'], 2)
+        self.assertEqual(stats['total_matches'], 2)
+
+    def test_unknown_player_gets_no_made_up_stats(self):
+        self.assertIsNone(self.api._get_realistic_stats('unknown'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+# TinyLFU: частоты Count-Min со старением, допуск в полный кэш и список популярных игроков
+import unittest
+
+import support  # noqa: F401 - путь к модулям приложения
+from popularity import CountMinSketch, TinyLFU
+from swr import StaleWhileRevalidate
+
+
+class CountMinSketchTest(unittest.TestCase):
+
+    def test_estimate_never_below_true_count(self):
+        sketch = CountMinSketch(width=64, sample_size=10000)
+        for i in range(200):
+            sketch.increment(f'k{i % 20}')
+
+        self.assertTrue(all(sketch.estimate(f'k{i}') >= 10 for i in range(20)))
+
+    def test_aging_halves_counters(self):
+        sketch = CountMinSketch(width=64, sample_size=8)
+        for _ in range(7):
+            sketch.increment('hot')
+        self.assertTrue(sketch.increment('hot'))
+
+        self.assertEqual(sketch.estimate('hot'), 4)
+        self.assertEqual(sketch.agings, 1)
+
+
+class TinyLFUTest(unittest.TestCase):
+
+    def setUp(self):
+        self.policy = TinyLFU(CountMinSketch(width=256, sample_size=10000), hot_candidates=3)
+
+    def test_one_off_key_does_not_evict_popular_one(self):
+        for _ in range(5):
+            self.policy.record('popular')
+        self.policy.record('once')
+
+        self.assertFalse(self.policy.admit('once', 'popular'))
+        self.assertTrue(self.policy.admit('popular', 'once'))
+
+    def test_hottest_keeps_top_candidates(self):
+        for key, count in (('a', 5), ('b', 3), ('c', 1), ('d', 4)):
+            for _ in range(count):
+                self.policy.record(key)
+
+        self.assertEqual(self.policy.hottest(2), ['a', 'd'])
+        self.assertEqual(len(self.policy._hot), 3)
+
+    def test_full_swr_cache_keeps_popular_entry(self):
+        cache = StaleWhileRevalidate(lambda key: key, soft_ttl=60, hard_ttl=120, max_entries=1, workers=1,
+                                     admission=self.policy)
+        for _ in range(3):
+            cache.get('popular')
+        cache.get('once')
+
+        self.assertEqual(list(cache._entries), ['popular'])
+
+
+if __name__ == '__main__':
+    unittest.main()
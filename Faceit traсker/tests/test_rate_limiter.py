@@ -0,0 +1,63 @@
+# Token bucket: запас на всплеск, очередь с интервалом, пауза по 429 и бюджет из X-RateLimit-*
+import time
+import asyncio
+import unittest
+
+import support  # noqa: F401 - путь к модулям приложения
+from rate_limiter import TokenBucket
+
+
+class TokenBucketTest(unittest.TestCase):
+
+    def test_burst_then_reject_beyond_timeout(self):
+        bucket = TokenBucket(rate=1, capacity=3)
+
+        self.assertTrue(all(bucket.acquire(timeout=0) for _ in range(3)))
+        self.assertFalse(bucket.acquire(timeout=0.1))
+        self.assertEqual(bucket.stats()['rejected'], 1)
+
+    def test_reserved_tokens_queue_callers(self):
+        bucket = TokenBucket(rate=100, capacity=1)
+        bucket.acquire()
+
+        # Второй и третий вызывающие ждут по очереди: 10 мс и 20 мс
+        self.assertAlmostEqual(bucket._reserve(), 0.01, places=2)
+        self.assertAlmostEqual(bucket._reserve(), 0.02, places=2)
+
+    def test_pause_blocks_everyone(self):
+        bucket = TokenBucket(rate=100, capacity=10)
+        bucket.pause(5)
+
+        self.assertFalse(bucket.acquire(timeout=1))
+
+    def test_learns_budget_from_headers(self):
+        bucket = TokenBucket(rate=10, capacity=10)
+        bucket.update_from_headers({'X-RateLimit-Limit': '600', 'X-RateLimit-Remaining': '20',
+                                    'X-RateLimit-Reset': '10'})
+
+        stats = bucket.stats()
+        self.assertEqual((stats['server_limit'], stats['server_remaining']), (600, 20))
+        self.assertAlmostEqual(bucket.rate, 2.0)
+
+    def test_exhausted_budget_pauses_until_reset(self):
+        bucket = TokenBucket(rate=10, capacity=10)
+        bucket.update_from_headers({'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': str(time.time() + 30)})
+
+        self.assertGreater(bucket.stats()['paused_for'], 25)
+        self.assertFalse(bucket.acquire(timeout=1))
+
+    def test_async_acquire_does_not_block_loop(self):
+        bucket = TokenBucket(rate=50, capacity=1)
+
+        async def run():
+            started = time.monotonic()
+            results = await asyncio.gather(*(bucket.acquire_async() for _ in range(3)))
+            return results, time.monotonic() - started
+
+        results, elapsed = asyncio.run(run())
+        self.assertEqual(results, [True] * 3)
+        self.assertLess(elapsed, 0.2)
+
+
+if __name__ == '__main__':
+    unittest.main()
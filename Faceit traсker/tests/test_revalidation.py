@@ -0,0 +1,71 @@
+# Условные запросы: протухшая запись с ETag перепроверяется, ответ 304 продлевает кэш без тела
+import json
+import unittest
+
+from support import TempDatabaseTestCase
+from singleflight import request_key
+
+
+class Response:
+    def __init__(self, status_code, data=None, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.content = json.dumps(data).encode('utf-8') if data is not None else b''
+        self.text = ''
+        self._data = data
+
+    def json(self):
+        return self._data
+
+
+class RecordingHttp:
+    """Отвечает заданным ответом и запоминает заголовки каждого запроса"""
+
+    def __init__(self, response):
+        self.response = response
+        self.requests = []
+
+    def get(self, url, headers=None, **kwargs):
+        self.requests.append(headers)
+        return self.response
+
+
+class RevalidationTest(TempDatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        from faceit_api import FaceitAPI
+        self.api = FaceitAPI()
+        self.api.headers = {}
+        self.key = request_key('/players/p1', None)
+        # Протухшая запись с валидаторами прошлого ответа
+        self.api.cache.set(self.key, {'nickname': 'Old'}, ttl=-1, etag='"v1"',
+                           last_modified='Mon, 01 Jan 2024 00:00:00 GMT')
+
+    def request(self, response):
+        self.api.http = RecordingHttp(response)
+        return self.api._shared_request('/players/p1')
+
+    def test_not_modified_extends_cached_entry(self):
+        data = self.request(Response(304))
+
+        self.assertEqual(data, {'nickname': 'Old'})
+        self.assertEqual(self.api.http.requests[0]['If-None-Match'], '"v1"')
+        self.assertIn('If-Modified-Since', self.api.http.requests[0])
+        self.assertTrue(self.api.cache.get(self.key).fresh)
+
+        stats = self.api.cache.stats()['revalidation']
+        self.assertEqual((stats['not_modified'], stats['modified']), (1, 0))
+        self.assertGreater(stats['bytes_saved'], 0)
+
+    def test_changed_payload_replaces_entry_and_validators(self):
+        data = self.request(Response(200, {'nickname': 'New'}, {'ETag': '"v2"'}))
+
+        self.assertEqual(data, {'nickname': 'New'})
+        entry = self.api.cache.get(self.key)
+        self.assertEqual((entry.value, entry.etag), ({'nickname': 'New'}, '"v2"'))
+        self.assertEqual(self.api.cache.stats()['revalidation']['modified'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+# Склейка одинаковых одновременных запросов: один вызов, ошибка и копия результата для каждого ждущего
+import threading
+import time
+import unittest
+
+import support  # noqa: F401 - путь к модулям приложения
+from singleflight import SingleFlight, request_key
+
+
+class SingleFlightTest(unittest.TestCase):
+
+    def _run_together(self, flight, fn, waiters=4):
+        """Лидер вызывает fn, остальные присоединяются, пока он еще работает"""
+        started = threading.Event()
+        release = threading.Event()
+        results, errors = [], []
+
+        def leader_fn():
+            started.set()
+            release.wait(5)
+            return fn()
+
+        def call(target):
+            try:
+                results.append(flight.do('key', target))
+            except Exception as e:
+                errors.append(e)
+
+        leader = threading.Thread(target=call, args=(leader_fn,))
+        leader.start()
+        started.wait(5)
+        followers = [threading.Thread(target=call, args=(fn,)) for _ in range(waiters)]
+        for thread in followers:
+            thread.start()
+        while flight.absorbed < waiters:
+            time.sleep(0.001)
+        release.set()
+        for thread in [leader] + followers:
+            thread.join(5)
+        return results, errors
+
+    def test_one_upstream_call_for_concurrent_callers(self):
+        flight = SingleFlight()
+        calls = []
+
+        results, _ = self._run_together(flight, lambda: calls.append(1) or {'items': [1]})
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{'items': [1]}] * 5)
+        self.assertEqual(flight.stats()['upstream_calls'], 1)
+
+    def test_followers_get_their_own_copy(self):
+        flight = SingleFlight()
+
+        results, _ = self._run_together(flight, lambda: {'items': [1]})
+        results[0]['items'].append(2)
+
+        self.assertEqual(sum(1 for result in results if result['items'] == [1]), 4)
+
+    def test_error_reaches_every_waiter(self):
+        def fail():
+            raise RuntimeError('boom')
+
+        results, errors = self._run_together(SingleFlight(), fail, waiters=2)
+
+        self.assertEqual((results, len(errors)), ([], 3))
+
+    def test_request_key_ignores_param_order(self):
+        self.assertEqual(request_key('/players', {'b': 1, 'a': 2}), request_key('/players', {'a': 2, 'b': 1}))
+        self.assertEqual(request_key('/players'), '/players')
+
+
+if __name__ == '__main__':
+    unittest.main()
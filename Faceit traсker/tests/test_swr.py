@@ -0,0 +1,101 @@
+# stale-while-revalidate: свежие/устаревшие записи, фоновое обновление и прогрев
+import time
+import threading
+import unittest
+
+from swr import StaleWhileRevalidate
+
+
+class CountingLoader:
+    def __init__(self, value='data'):
+        self.value = value
+        self.calls = 0
+
+    def __call__(self, key):
+        self.calls += 1
+        return self.value
+
+
+def wait_refreshes(cache):
+    cache._executor.shutdown(wait=True)
+
+
+class StaleWhileRevalidateTest(unittest.TestCase):
+
+    def test_fresh_then_stale_with_background_refresh(self):
+        loader = CountingLoader()
+        cache = StaleWhileRevalidate(loader, soft_ttl=60, hard_ttl=120, max_entries=10, workers=1)
+
+        self.assertEqual(cache.get('p1')[2], StaleWhileRevalidate.MISS)
+        self.assertEqual(cache.get('p1')[2], StaleWhileRevalidate.FRESH)
+
+        cache._entries['p1'] = ('data', time.time() - 90)
+        value, _, state = cache.get('p1')
+        wait_refreshes(cache)
+
+        self.assertEqual((value, state), ('data', StaleWhileRevalidate.STALE))
+        self.assertEqual(loader.calls, 2)
+        self.assertTrue(cache.is_fresh('p1'))
+
+    def test_expired_entry_is_loaded_synchronously(self):
+        loader = CountingLoader()
+        cache = StaleWhileRevalidate(loader, soft_ttl=60, hard_ttl=120, max_entries=10, workers=1)
+        cache._entries['p1'] = ('old', time.time() - 200)
+
+        self.assertEqual(cache.get('p1')[2], StaleWhileRevalidate.MISS)
+        self.assertEqual(loader.calls, 1)
+
+    def test_warmer_skips_key_whose_last_load_was_not_cached(self):
+        loader = CountingLoader(value=None)
+        cache = StaleWhileRevalidate(loader, soft_ttl=60, hard_ttl=120, max_entries=10, workers=1)
+        cache.get('missing')
+
+        self.assertFalse(cache.refresh_if_expiring('missing'))
+        self.assertTrue(cache.refresh_if_expiring('never-loaded'))
+
+        # Обычный запрос снова загрузил данные - ключ опять прогревается
+        loader.value = 'data'
+        cache.get('missing')
+        cache._entries['missing'] = ('data', time.time() - 59)
+        self.assertTrue(cache.refresh_if_expiring('missing', ahead=0.5))
+        wait_refreshes(cache)
+
+    def test_concurrent_misses_share_one_load(self):
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def slow_loader(key):
+            calls.append(key)
+            started.set()
+            release.wait(5)
+            return 'data'
+
+        cache = StaleWhileRevalidate(slow_loader, soft_ttl=60, hard_ttl=120, max_entries=10, workers=1)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get('p1')[0])) for _ in range(5)]
+        threads[0].start()
+        started.wait(5)
+        for thread in threads[1:]:
+            thread.start()
+        time.sleep(0.05)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(calls, ['p1'])
+        self.assertEqual(results, ['data'] * 5)
+
+    def test_oldest_stored_entry_is_evicted(self):
+        cache = StaleWhileRevalidate(CountingLoader(), soft_ttl=60, hard_ttl=120, max_entries=2, workers=1)
+        for key in ('a', 'b'):
+            cache.get(key)
+        # Обновленная запись становится самой новой
+        cache._store('a', 'data')
+        cache.get('c')
+
+        self.assertEqual(list(cache._entries), ['a', 'c'])
+
+
+if __name__ == '__main__':
+    unittest.main()